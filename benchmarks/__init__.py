@@ -0,0 +1,35 @@
+""" Benchmarks of optimized code paths against the ones they replaced, each module printing its measurements from main().
+
+    Go to project directory and run all of them with
+
+        python -m benchmarks
+
+    or some of them by module name, e.g.
+
+        python -m benchmarks update_fundamentals
+"""
+from contextlib import contextmanager
+import os.path
+import time
+
+from fa.database.models import db, export
+
+
+FIXTURE_DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "miner", "fixture_data")
+
+def measure(func, *args, **kwargs):
+    """ Returns the seconds taken by func(*args, **kwargs). """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+@contextmanager
+def memory_database():
+    """ Initializes the database in memory with all tables, closed on exit. """
+    db.init(":memory:")
+    db.create_tables(export)
+
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,30 @@
+import importlib
+import sys
+
+
+# modules run by default, in the order they were added
+BENCHMARKS = [
+    "update_fundamentals",
+    "concurrent_get",
+    "scrape_html",
+    "load_fundamental_data",
+    "connection_profiles",
+    "narrow_table",
+    "csv_ingestion",
+    "data_quality_scan",
+    "rolling_outliers",
+    "backtest_sweep",
+    "parameter_sweep",
+    "derived_metrics",
+    "enrichment",
+    "http_cache",
+]
+
+def main(names):
+    for name in names or BENCHMARKS:
+        print("{0}:".format(name))
+        importlib.import_module("benchmarks." + name).main()
+        print()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
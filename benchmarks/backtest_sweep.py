@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from fa.backtest import calc_future_returns, run_backtest
+from benchmarks import measure
+
+
+""" Benchmark of a sweep of buy thresholds over a universe: one backtest per strategy and symbol vs. all at once """
+
+NO_OF_SYMBOLS = 50
+NO_OF_DAYS = 2500  # about 10 years of daily prices
+THRESHOLDS = np.linspace(-0.2, 0.3, 100)
+
+def make_prices():
+    dates = pd.bdate_range("2005-01-03", periods=NO_OF_DAYS)
+    values = np.exp(np.cumsum(np.random.randn(NO_OF_DAYS, NO_OF_SYMBOLS) / 50, axis=0))
+    return pd.DataFrame(values, index=dates, columns=["S{0:03d}".format(i) for i in range(NO_OF_SYMBOLS)])
+
+def run_one_by_one(prices, future_returns):
+    for threshold in THRESHOLDS:
+        for symbol in prices.columns:
+            amounts = (future_returns[[symbol]].values >= threshold)
+            run_backtest(prices[[symbol]], amounts, distribution_yield=0.03)
+
+def run_at_once(prices, future_returns):
+    amounts = future_returns.values >= THRESHOLDS[:, np.newaxis, np.newaxis]
+    run_backtest(prices, amounts, distribution_yield=0.03, strategies=THRESHOLDS)
+
+def main():
+    prices = make_prices()
+    future_returns = calc_future_returns(prices, 365)
+
+    for name, run in (("one by one", run_one_by_one), ("at once", run_at_once)):
+        rate = len(THRESHOLDS) * NO_OF_SYMBOLS / measure(run, prices, future_returns)
+        print("{0:>10}: {1:,.0f} backtests/sec".format(name, rate))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+import threading
+import time
+
+from fa.miner.http import strict_get, concurrent_get
+from benchmarks import measure
+
+
+""" Benchmark of downloading from a local stub HTTP server: serial strict_get vs. concurrent_get """
+
+NO_OF_URLS = 64
+LATENCY = 0.02  # seconds, simulated server response time
+BODY = ("Date,Open,High,Low,Close,Volume,Adj Close\n" + "2014-12-12,3.0,3.1,2.9,3.0,1000,3.0\n" * 7500).encode()
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    urls = ["http://127.0.0.1:{0}/table.csv?s={1}".format(server.server_port, i) for i in range(NO_OF_URLS)]
+
+    get_funcs = (
+        ("serial strict_get", lambda urls: [strict_get(url) for url in urls]),
+        ("concurrent_get, 8 workers", lambda urls: concurrent_get(urls, max_workers=8, max_workers_per_host=8)),
+    )
+
+    for name, get_func in get_funcs:
+        print("{0:>26}: {1:,.1f} urls/sec".format(name, len(urls) / measure(get_func, urls)))
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+import os.path
+import shutil
+import tempfile
+import time
+
+from fa.database.models import db, export, Symbol
+from fa.database.query import update_fundamentals, get_fundamentals
+
+
+""" Benchmark of update_fundamentals and get_fundamentals on a database file, under different connection profiles """
+
+NO_OF_SYMBOLS = 200
+NO_OF_RECORDS = 2000    # about 8 years of daily prices
+FIELD_NAMES = ["date", "open", "high", "low", "close", "volume", "adj_close"]
+
+NO_OF_NEW_RECORDS = 5   # of a nightly incremental update
+
+def make_records(symbol, start, n):
+    return [
+        {"symbol_obj": symbol, "date": start + timedelta(days=i), "open": 1.0, "high": 1.2, "low": 0.9, "close": 1.1, "volume": 1000 + i, "adj_close": 1.1}
+        for i in range(n)
+    ]
+
+def measure_writes(symbols, start, n):
+    """ one transaction per symbol, as in examples/update_price_data.py """
+    records = {s: make_records(s, start, n) for s in symbols}
+
+    start = time.perf_counter()
+    for s in symbols:
+        update_fundamentals("price", s, records[s], datetime(2014, 12, 15))
+    return len(symbols) * n / (time.perf_counter() - start)
+
+def measure_reads(symbols):
+    start = time.perf_counter()
+    no_of_rows = sum(len(list(get_fundamentals("price", s, FIELD_NAMES))) for s in symbols)
+    return no_of_rows / (time.perf_counter() - start)
+
+def main():
+    symbols = ["S{0:04d}.SI".format(i) for i in range(NO_OF_SYMBOLS)]
+    path = tempfile.mkdtemp()
+
+    try:
+        for write_profile, read_profile in (("default", "default"), ("bulk-load", "analysis")):
+            db_path = os.path.join(path, write_profile + ".db")
+
+            db.init(db_path, profile=write_profile)
+            db.create_tables(export)
+            Symbol.insert_many([{"symbol": s} for s in symbols]).execute()
+            rows_per_sec = measure_writes(symbols, datetime(2006, 1, 1), NO_OF_RECORDS)
+            print("update_fundamentals, full history, {0:>9}: {1:,.0f} rows/sec".format(write_profile, rows_per_sec))
+
+            rows_per_sec = measure_writes(symbols, datetime(2006, 1, 1) + timedelta(days=NO_OF_RECORDS), NO_OF_NEW_RECORDS)
+            print("update_fundamentals, new days,     {0:>9}: {1:,.0f} rows/sec".format(write_profile, rows_per_sec))
+            db.close()
+
+            db.init(db_path, profile=read_profile)
+            rows_per_sec = measure_reads(symbols)
+            db.close()
+            print("   get_fundamentals,                 {0:>9}: {1:,.0f} rows/sec".format(read_profile, rows_per_sec))
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == "__main__":
+    main()
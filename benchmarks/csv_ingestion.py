@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+import time
+import tracemalloc
+
+from fa.database.models import Symbol, Price
+from fa.database.query import update_fundamentals, update_fundamentals_from_columns
+from fa.piping import csv_string_to_records, csv_lines_to_column_chunks
+from benchmarks import memory_database
+
+
+""" Benchmark of writing a downloaded price csv to database: records from the whole csv string vs. streamed column chunks """
+
+NO_OF_ROWS = 7500   # about 30 years of daily prices
+SYMBOL = "C6L.SI"
+
+def make_lines(n):
+    start = datetime(1986, 1, 1)
+    yield "Date,Open,High,Low,Close,Volume,Adj Close"
+    for i in range(n):
+        yield "{0:%Y-%m-%d},1.0,1.2,0.9,1.1,{1},1.1".format(start + timedelta(days=i), 1000 + i)
+
+def ingest_records(lines):
+    csv_string = '\n'.join(lines)  # as from strict_get
+    update_fundamentals("price", SYMBOL, csv_string_to_records(SYMBOL, csv_string), datetime(2014, 12, 15), delete_old=True)
+
+def ingest_column_chunks(lines):
+    update_fundamentals_from_columns("price", SYMBOL, csv_lines_to_column_chunks(lines), datetime(2014, 12, 15), delete_old=True)
+
+def measure(ingest):
+    tracemalloc.start()
+    start = time.perf_counter()
+    ingest(make_lines(NO_OF_ROWS))
+    rows_per_sec = NO_OF_ROWS / (time.perf_counter() - start)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rows_per_sec, peak
+
+def main():
+    with memory_database():
+        Symbol.create(symbol=SYMBOL)
+
+        for name, ingest in (("records", ingest_records), ("column chunks", ingest_column_chunks)):
+            rows_per_sec, peak = measure(ingest)
+            assert Price.select().count() == NO_OF_ROWS
+            print("{0:>13}: {1:,.0f} rows/sec, peak memory {2:,.0f} KB".format(name, rows_per_sec, peak / 1024))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from fa.analysis import sanity
+from fa.analysis.audit import scan_frame, DEFAULT_CHECKS
+from benchmarks import measure
+
+
+""" Benchmark of price data quality checks: sanity checks symbol by symbol vs. checks vectorized across symbols """
+
+NO_OF_SYMBOLS = 200
+NO_OF_DAYS = 2500  # about 10 years of daily prices
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Adj Close"]
+
+def make_frame():
+    dates = pd.bdate_range(datetime(2005, 1, 3), periods=NO_OF_DAYS)
+    symbols = ["S{0:04d}".format(i) for i in range(NO_OF_SYMBOLS)]
+    index = pd.MultiIndex.from_arrays([np.repeat(symbols, NO_OF_DAYS), np.tile(dates, NO_OF_SYMBOLS)], names=["Symbol", "Date"])
+    values = np.random.lognormal(size=(NO_OF_SYMBOLS * NO_OF_DAYS, len(COLUMNS)))
+    return pd.DataFrame(values, index=index, columns=COLUMNS)
+
+def check_symbol_by_symbol(df, checks):
+    for symbol, frame in df.groupby(level="Symbol"):
+        frame = frame.reset_index(level="Symbol", drop=True)
+        sanity.check_for_missing_date(frame, checks["missing_date"])
+        sanity.check_for_missing_value(frame)
+        sanity.is_outlier(frame, checks["outlier"])
+        sanity.check_for_discontinuity(frame, checks["discontinuity"])
+
+def check_vectorized(df, checks):
+    scan_frame("price", df, checks)
+
+def main():
+    df = make_frame()
+
+    for name, check in (("symbol by symbol", check_symbol_by_symbol), ("vectorized", check_vectorized)):
+        print("{0:>16}: {1:,.0f} symbols/sec".format(name, NO_OF_SYMBOLS / measure(check, df, DEFAULT_CHECKS["price"])))
+
+if __name__ == "__main__":
+    main()
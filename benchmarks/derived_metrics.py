@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from fa.database.models import db, Symbol, Price, IncomeStatement
+from fa.analysis.derived import refresh_derived_metrics
+from fa.analysis.finance import UniverseMetric
+from fa.analysis.io import load_fundamental_data_as_of
+from benchmarks import measure, memory_database
+
+
+""" Benchmark of screening all symbols by P/E ratio: recalculated from archive vs. read from precomputed DerivedMetric """
+
+NO_OF_SYMBOLS = 200
+NO_OF_DAYS = 2500  # about 7 years of daily prices
+NO_OF_YEARS = 7
+NO_OF_ROUNDS = 3
+SCREEN_DATE = datetime(2014, 12, 15)
+
+def make_data(symbols):
+    start_date = SCREEN_DATE - timedelta(days=NO_OF_DAYS)
+
+    with db.transaction():
+        for s in symbols:
+            Symbol.create(symbol=s, price_updated_at=SCREEN_DATE, income_statement_updated_at=SCREEN_DATE)
+            Price.insert_many(
+                {"symbol_obj": s, "date": start_date + timedelta(days=i), "open": 1, "high": 1, "low": 1, "close": 1,
+                 "volume": 1, "adj_close": 10 + i % 50}
+                for i in range(NO_OF_DAYS)
+            ).execute()
+            IncomeStatement.insert_many(
+                {"symbol_obj": s, "date": datetime(2007 + year, 12, 31), "sales_revenue": 100 + year, "net_income": 10,
+                 "eps_basic_": 1 + year}
+                for year in range(NO_OF_YEARS)
+            ).execute()
+
+def screen_recalculated(symbols):
+    pe_ratios = UniverseMetric.from_archive(symbols).calc_pe_ratio()
+    return pe_ratios.iloc[-1] <= 15
+
+def screen_precomputed(symbols):
+    pe_ratios = load_fundamental_data_as_of("derived_metric", SCREEN_DATE, ["P/E Ratio"])["P/E Ratio"]
+    return pe_ratios <= 15
+
+def screen_rounds(screen, symbols):
+    for _ in range(NO_OF_ROUNDS):
+        screen(symbols)
+
+def main():
+    with memory_database():
+        symbols = ["S{0:04d}.SI".format(i) for i in range(NO_OF_SYMBOLS)]
+        make_data(symbols)
+
+        print("{0:>12}: {1:.2f} s, once after data updates".format("refresh", measure(refresh_derived_metrics)))
+
+        for name, screen in (("recalculated", screen_recalculated), ("precomputed", screen_precomputed)):
+            print("{0:>12}: {1:.1f} ms per screen".format(name, measure(screen_rounds, screen, symbols) / NO_OF_ROUNDS * 1000))
+
+if __name__ == "__main__":
+    main()
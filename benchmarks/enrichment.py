@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from fa.database.models import db, enrichment_export, Symbol, IncomeStatement
+from fa.database.enrichment import enrich
+from fa.database.query import create_enrichment_triggers, update_fundamentals
+from benchmarks import measure, memory_database
+
+
+""" Benchmark of calculating the operating income of IncomeStatement: the UPDATE of every null row formerly in
+    examples/enrich.py vs. enrich, on all rows and after an update of a few rows, and of the cost of the triggers
+    recording rows to enrich on update_fundamentals
+"""
+
+NO_OF_SYMBOLS = 2000
+NO_OF_YEARS = 20
+
+def make_data(symbols, years):
+    with db.transaction():
+        for s in symbols:
+            Symbol.get_or_create(symbol=s)
+            IncomeStatement.insert_many(
+                {"symbol_obj": s, "date": datetime(1990 + year, 12, 31), "sales_revenue": 100 + year,
+                 "gross_income": 40, "sg_a_expense": 10, "other_operating_expense": 5}
+                for year in years
+            ).execute()
+
+def enrich_all_null():
+    IncomeStatement \
+        .update(operating_income=(
+            IncomeStatement.gross_income -
+            IncomeStatement.sg_a_expense -
+            IncomeStatement.other_operating_expense
+        )) \
+        .where(IncomeStatement.operating_income >> None) \
+        .execute()
+
+def enrich_pending():
+    enrich("income_statement")
+
+def update_all(symbols):
+    records = {
+        s: [{"symbol_obj": s, "date": datetime(1990 + year, 12, 31), "sales_revenue": 100 + year, "gross_income": 40}
+            for year in range(NO_OF_YEARS)]
+        for s in symbols
+    }
+
+    def update():
+        for s in symbols:
+            update_fundamentals("income_statement", s, records[s], datetime(2014, 12, 15))
+
+    return measure(update)
+
+def main():
+    symbols = ["S{0:04d}.SI".format(i) for i in range(NO_OF_SYMBOLS)]
+
+    for name, run in (("all null", enrich_all_null), ("pending", enrich_pending)):
+        with memory_database():
+            # early years without SG&A expense, of which operating income cannot be calculated
+            make_data(symbols, range(NO_OF_YEARS))
+            IncomeStatement.update(sg_a_expense=None).where(IncomeStatement.date < datetime(1995, 1, 1)).execute()
+            full = measure(run)
+
+            # a new year of a few symbols
+            make_data(symbols[:20], [NO_OF_YEARS])
+            incremental = measure(run)
+
+            print("{0:>8}: {1:.0f} ms all rows, {2:.1f} ms after an update".format(name, full * 1000, incremental * 1000))
+
+    for triggers in (False, True):
+        with memory_database():
+            Symbol.insert_many([{"symbol": s} for s in symbols]).execute()
+            if triggers:
+                db.create_tables(enrichment_export)
+                create_enrichment_triggers("income_statement")
+
+            rows_per_sec = NO_OF_SYMBOLS * NO_OF_YEARS / update_all(symbols)
+            print("update_fundamentals, {0:>16}: {1:,.0f} rows/sec".format("with triggers" if triggers else "without triggers", rows_per_sec))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from unittest.mock import MagicMock
+import glob
+import os
+import os.path
+import shutil
+import tempfile
+
+from fa.miner import wsj
+from fa.miner.cache import cache
+from fa.miner.http import strict_get
+from benchmarks import FIXTURE_DATA_DIR, measure
+
+
+""" Benchmark of replaying saved WSJ pages from the response cache in offline mode: pages/sec and size on disk """
+
+NO_OF_PAGES = 500
+
+def get_size(path):
+    return sum(os.path.getsize(os.path.join(d, name)) for d, _, names in os.walk(path) for name in names)
+
+def fill_cache(pages):
+    """ keeps <pages> in the cache through strict_get, as if downloaded """
+    for url, html in pages.items():
+        session = MagicMock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.url = url
+        session.get.return_value.text = html
+        session.get.return_value.headers = {"Content-Type": "text/html"}
+        strict_get(url, session=session)
+
+def replay(urls, parse):
+    for url in urls:
+        html = strict_get(url, wsj._test_for_not_found)
+        if parse:
+            wsj._scrape_html(html)
+
+def main():
+    with open(glob.glob(os.path.join(FIXTURE_DATA_DIR, "*.html"))[0]) as f:
+        html = f.read()
+
+    # different texts, so that each is kept
+    pages = {
+        "http://quotes.wsj.com/SG/XSES/S{0:04d}/financials/annual/balance-sheet".format(i): html + "<!-- {0} -->".format(i)
+        for i in range(NO_OF_PAGES)
+    }
+    path = tempfile.mkdtemp()
+
+    try:
+        cache.init(path)
+        fill_cache(pages)
+        cache.init(path, offline=True)
+
+        raw_size = sum(len(html.encode("utf-8")) for html in pages.values())
+        print("{0:>16}: {1:.0f} KB per page, {2:.0f} KB raw".format("size on disk", get_size(path) / NO_OF_PAGES / 1024, raw_size / NO_OF_PAGES / 1024))
+        print("{0:>16}: {1:,.0f} pages/sec".format("replay", NO_OF_PAGES / measure(replay, list(pages), False)))
+        print("{0:>16}: {1:,.0f} pages/sec".format("replay & scrape", NO_OF_PAGES / measure(replay, list(pages), True)))
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == "__main__":
+    main()
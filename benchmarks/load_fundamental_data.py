@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from fa.database.models import Symbol, get_numerical_column_names
+from fa.database.query import update_fundamentals
+from fa.analysis.io import load_fundamental_data
+from fa.util import to_pythonic_name
+from benchmarks import measure, memory_database
+
+
+""" Benchmark of loading full 100-column BalanceSheet data with load_fundamental_data: peewee tuples vs. typed arrays """
+
+NO_OF_SYMBOLS = 200
+NO_OF_YEARS = 30
+NO_OF_ROUNDS = 3
+
+def make_records(symbol):
+    field_names = [to_pythonic_name(c) for c in get_numerical_column_names("BalanceSheet")]
+    return [
+        dict({name: float(year * i) for i, name in enumerate(field_names)}, symbol_obj=symbol, date=datetime(1985 + year, 4, 1))
+        for year in range(NO_OF_YEARS)
+    ]
+
+def load_all(symbols, **kwargs):
+    for _ in range(NO_OF_ROUNDS):
+        for s in symbols:
+            load_fundamental_data("balance_sheet", s, **kwargs)
+
+def main():
+    with memory_database():
+        symbols = ["S{0:04d}.SI".format(i) for i in range(NO_OF_SYMBOLS)]
+        for s in symbols:
+            Symbol.create(symbol=s)
+            update_fundamentals("balance_sheet", s, make_records(s), datetime(2014, 12, 15))
+
+        for name, kwargs in (("peewee tuples", {}), ("typed arrays", {"fast": True})):
+            seconds = measure(load_all, symbols, **kwargs) / (NO_OF_ROUNDS * len(symbols))
+            print("{0:>13}: {1:.2f} ms per symbol".format(name, seconds * 1000))
+
+if __name__ == "__main__":
+    main()
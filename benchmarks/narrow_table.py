@@ -0,0 +1,56 @@
+from datetime import datetime
+import os.path
+import shutil
+import tempfile
+import time
+
+from fa.database.models import db, export, Symbol, get_numerical_column_names
+from fa.database.query import update_fundamentals, migrate_to_narrow_table
+from fa.analysis.io import load_fundamental_data
+from fa.util import to_pythonic_name
+
+
+""" Benchmark of loading 2 of the ~100 BalanceSheet columns with load_fundamental_data: wide table vs. narrow table """
+
+NO_OF_SYMBOLS = 500
+NO_OF_YEARS = 30
+NO_OF_ROUNDS = 3
+COLUMNS = ["Total Liabilities / Total Assets", "Inventories"]
+
+def make_records(symbol):
+    field_names = [to_pythonic_name(c) for c in get_numerical_column_names("BalanceSheet")]
+    return [
+        dict({name: float(year * i) for i, name in enumerate(field_names)}, symbol_obj=symbol, date=datetime(1985 + year, 4, 1))
+        for year in range(NO_OF_YEARS)
+    ]
+
+def measure(symbols, storage):
+    start = time.perf_counter()
+    for _ in range(NO_OF_ROUNDS):
+        for s in symbols:
+            load_fundamental_data("balance_sheet", s, COLUMNS, storage=storage)
+    return (time.perf_counter() - start) / (NO_OF_ROUNDS * len(symbols))
+
+def main():
+    path = tempfile.mkdtemp()
+
+    try:
+        db.init(os.path.join(path, "narrow.db"))
+        db.create_tables(export)
+
+        symbols = ["S{0:04d}.SI".format(i) for i in range(NO_OF_SYMBOLS)]
+        for s in symbols:
+            Symbol.create(symbol=s)
+            update_fundamentals("balance_sheet", s, make_records(s), datetime(2014, 12, 15))
+
+        migrate_to_narrow_table(["balance_sheet"])
+
+        for name, storage in (("wide table", "database"), ("narrow table", "narrow")):
+            print("{0:>12}: {1:.2f} ms per symbol".format(name, measure(symbols, storage) * 1000))
+
+        db.close()
+    finally:
+        shutil.rmtree(path)
+
+if __name__ == "__main__":
+    main()
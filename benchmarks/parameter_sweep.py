@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fa.backtest import to_arrays, study_valuation
+from fa.sweep import get_grid, run_sweep
+from benchmarks import measure
+
+
+""" Benchmark of a parameter sweep in a process pool: arrays pickled for every task vs. shared through memory maps """
+
+NO_OF_SYMBOLS = 100
+NO_OF_DAYS = 7500   # about 30 years of daily prices
+GRID = {"valuation_threshold": np.linspace(0, 0.3, 16), "horizon": [182, 365]}
+MAX_WORKERS = 4
+
+def make_arrays():
+    dates = pd.bdate_range("1986-01-01", periods=NO_OF_DAYS)
+    values = np.exp(np.cumsum(np.random.randn(NO_OF_DAYS, NO_OF_SYMBOLS) / 50, axis=0))
+    return to_arrays(pd.DataFrame(values, index=dates, columns=["S{0:03d}".format(i) for i in range(NO_OF_SYMBOLS)]))
+
+def run_pickled(arrays):
+    with ProcessPoolExecutor(MAX_WORKERS) as executor:
+        futures = [executor.submit(study_valuation, arrays, **params) for params in get_grid(GRID)]
+        return [f.result() for f in futures]
+
+def run_shared(arrays):
+    return run_sweep(study_valuation, GRID, arrays, max_workers=MAX_WORKERS)
+
+def main():
+    arrays = make_arrays()
+    no_of_combinations = len(get_grid(GRID))
+
+    for name, run in (("pickled", run_pickled), ("shared", run_shared)):
+        print("{0:>8}: {1:.1f} combinations/sec".format(name, no_of_combinations / measure(run, arrays)))
+
+if __name__ == "__main__":
+    main()
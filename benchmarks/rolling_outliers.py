@@ -0,0 +1,45 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fa.analysis import sanity
+from benchmarks import measure
+
+
+""" Benchmark of rolling outlier tests of the derivative of a long daily price series: time by window size,
+    and peak memory of checking the whole series at once vs. chunk by chunk
+"""
+
+NO_OF_DAYS = 100000     # a long series, to make the memory used visible
+CHUNK_SIZE = 8192
+TOLERANCE = 6
+
+def make_frame():
+    dates = pd.date_range("1700-01-01", periods=NO_OF_DAYS)
+    return pd.DataFrame({"Adj Close": np.exp(np.cumsum(np.random.randn(NO_OF_DAYS) / 100))}, index=dates)
+
+def measure_memory(check):
+    tracemalloc.start()
+    check()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    df = make_frame()
+
+    for robust in (False, True):
+        for window in (21, 63, 252):
+            rows_per_sec = NO_OF_DAYS / measure(sanity.check_for_rolling_discontinuity, df, TOLERANCE, window, robust)
+            print("{0:>7}, window {1:>3}: {2:,.0f} rows/sec".format("robust" if robust else "z-score", window, rows_per_sec))
+
+    chunks = lambda: (df.iloc[i : i + CHUNK_SIZE] for i in range(0, NO_OF_DAYS, CHUNK_SIZE))
+    for name, check in (
+        ("whole", lambda: sanity.check_for_rolling_discontinuity(df, TOLERANCE, 63)),
+        ("chunked", lambda: list(sanity.iter_rolling_discontinuities(chunks(), TOLERANCE, 63))),
+    ):
+        print("{0:>7}: peak memory {1:,.0f} KB".format(name, measure_memory(check) / 1024))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+from multiprocessing import Process, Queue
+import glob
+import os.path
+import resource
+import time
+
+from fa.miner import wsj
+from benchmarks import FIXTURE_DATA_DIR
+
+
+""" Benchmark of the scraper backends of wsj._scrape_html over saved WSJ pages: pages/sec and peak memory """
+
+NO_OF_ROUNDS = 20
+
+def measure(backend, pages, queue):
+    """ runs in a fresh process, so that the peak memory of each backend is measured separately """
+    start_maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+
+    for _ in range(NO_OF_ROUNDS):
+        for html in pages:
+            wsj._scrape_html(html, backend)
+
+    pages_per_sec = NO_OF_ROUNDS * len(pages) / (time.perf_counter() - start)
+    maxrss_increase = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_maxrss
+    queue.put((pages_per_sec, maxrss_increase))
+
+def main():
+    pages = []
+    for filename in glob.glob(os.path.join(FIXTURE_DATA_DIR, "*.html")):
+        with open(filename) as f:
+            pages.append(f.read())
+
+    for backend in sorted(wsj.SCRAPER_BACKENDS):
+        if backend == "lxml" and not wsj.lxml_html:
+            continue
+
+        queue = Queue()
+        p = Process(target=measure, args=(backend, pages, queue))
+        p.start()
+        pages_per_sec, maxrss_increase = queue.get()
+        p.join()
+
+        print("{0:>5}: {1:,.1f} pages/sec, peak memory +{2:,} KiB".format(backend, pages_per_sec, maxrss_increase))
+
+if __name__ == "__main__":
+    main()
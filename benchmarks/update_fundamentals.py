@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from fa.database.models import db, Symbol, Price
+from fa.database import query
+from benchmarks import measure, memory_database
+
+
+""" Benchmark of inserting price records with update_fundamentals: per-row Model.create vs. bulk insert """
+
+NO_OF_RECORDS = 7500    # about 30 years of daily prices
+SYMBOL = "C6L.SI"
+
+def make_records(n):
+    start = datetime(1986, 1, 1)
+    return [
+        {"symbol_obj": SYMBOL, "date": start + timedelta(days=i), "open": 1.0, "high": 1.2, "low": 0.9, "close": 1.1, "volume": 1000 + i, "adj_close": 1.1}
+        for i in range(n)
+    ]
+
+def update_fundamentals_per_row(data_type, symbol, records, end_date, delete_old=False):
+    """ the previous implementation of update_fundamentals, for comparison """
+    Model = query.get_Model(data_type)
+
+    with db.transaction():
+        if delete_old:
+            Model.delete().where(Model.symbol_obj == symbol).execute()
+
+        for rec in records:
+            Model.create(**rec)
+
+        Symbol.update(**{data_type + "_updated_at": end_date}).where(Symbol.symbol == symbol).execute()
+
+def main():
+    with memory_database():
+        Symbol.create(symbol=SYMBOL)
+        records = make_records(NO_OF_RECORDS)
+
+        for name, update_func in (("per-row create", update_fundamentals_per_row), ("bulk insert", query.update_fundamentals)):
+            rows_per_sec = len(records) / measure(update_func, "price", SYMBOL, records, datetime(2014, 12, 15), delete_old=True)
+            assert Price.select().count() == NO_OF_RECORDS
+            print("{0:>15}: {1:,.0f} rows/sec".format(name, rows_per_sec))
+
+if __name__ == "__main__":
+    main()
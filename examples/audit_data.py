@@ -0,0 +1,15 @@
+import logging
+
+from fa.analysis.audit import scan_database
+
+import initialize
+
+
+""" Run data quality checks on all data in database, findings are written to table of QualityFinding """
+
+initialize.init()
+logger = logging.getLogger(__name__)
+
+logger.info("Will run data quality checks on all data.")
+no_of_findings = scan_database()
+logger.info("Finished data quality checks with {0} findings.".format(no_of_findings))
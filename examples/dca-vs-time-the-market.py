@@ -1,99 +1,55 @@
 import numpy as np
-import pandas as pd
 
-from fa.analysis.io import load_fundamental_data
+from fa.backtest import load_prices, calc_future_returns, run_backtest
 
 import initialize
 
 
-initialize.init()
+initialize.init("analysis")
 
 # average annual dividends per $ share price
 # figure comes from http://www.spdrs.com.sg/etf/fund/fund_detail_STTF.html
 DISTRIBUTION_YIELD = 0.0272
 
-def get_valuation(return_in_one_year):
-    if return_in_one_year < 0.10:
-        return "O"  # over-valued
-    else:
-        return "U"  # under-valued
+# a stock is under-valued if it returns at least this much in one year
+UNDER_VALUATION_RETURN = 0.10
 
-def calc_future_return(price, no_of_days):
-    """ returns the return after <no_of_days> days
-        if one bought at respective prices at respective dates in <price>
-    """
-    # if the stock market is not open on the sell day,
-    # sell the stock on the morning of the next available day.
-    future_price = price.asfreq('1D', method='pad')
-    future_price.index = future_price.index - pd.offsets.Day(no_of_days)
-    return (future_price / price).dropna() - 1
-
-def get_hold_period(sell_date, dataset):
-    buy_date = pd.Series(dataset.index, index=dataset.index)
-    return sell_date - buy_date
-
-def study_strategy(amount_invested, dataset, sell_date, sell_price):
-    total_amount_invested = amount_invested.sum()
-    print("total dollar invested = {0}".format(total_amount_invested))
-
-    units_bought = amount_invested / dataset["Close"]
-    total_units_bought = units_bought.sum()
-    print("total units bought = {0:.4f}".format(total_units_bought))
-
-    cash_flow_period = (dataset.index[-1] - dataset.index[0]).days / 365
-    print("period investing money = {0:.1f} years".format(cash_flow_period))
+def study_strategy(name, result, symbol, investing_period):
+    print("Studying {0} strategy".format(name))
+    print("total dollar invested = {0}".format(result.amount_invested[symbol]))
+    print("total units bought = {0:.4f}".format(result.units_bought[symbol]))
+    print("period investing money = {0:.1f} years".format(investing_period))
     print("sell the investment one year after the period,")
+    print("average holding period = {0:.1f} years".format(result.average_hold_period[symbol]))
 
     # not reinvesting the dividends
-    hold_period_years = get_hold_period(sell_date, dataset) / np.timedelta64(365, 'D')
-    dividend_payout = amount_invested * hold_period_years * DISTRIBUTION_YIELD
-    total_dividend_payout = dividend_payout.sum()
-    print("estimated total dividend payout = {0:.0f}".format(total_dividend_payout))
-
-    capital_gain = total_units_bought * sell_price - total_amount_invested
-    print("capital gain = {0:.0f}".format(capital_gain))
+    print("estimated total dividend payout = {0:.0f}".format(result.dividend_payout[symbol]))
+    print("capital gain = {0:.0f}".format(result.capital_gain[symbol]))
+    print("total return = {0:.0f}% after {1:.1f} years.".format(result.total_return[symbol] * 100, investing_period + 1))
 
-    total_gain = capital_gain + total_dividend_payout
-    total_return = total_gain / total_amount_invested
-    print("total return = {0:.0f}% after {1:.1f} years.".format(total_return * 100, cash_flow_period + 1))
-
-    dividend_payout_proportion = total_dividend_payout / total_gain
-    print("dividend payout comprises {0:.0f}%".format(dividend_payout_proportion * 100))
-
-    all_return = ((units_bought * sell_price + dividend_payout) / amount_invested - 1).replace(np.inf, np.nan)
-    annual_return = all_return / hold_period_years
-    print("average annual return = {0:.1f}%".format(annual_return.mean() * 100))
+    total_gain = result.capital_gain[symbol] + result.dividend_payout[symbol]
+    print("dividend payout comprises {0:.0f}%".format(result.dividend_payout[symbol] / total_gain * 100))
+    print("average annual return = {0:.1f}%".format(result.annual_return[symbol] * 100))
 
 if __name__ == "__main__":
     symbol = "^STI"
 
-    historical_data = load_fundamental_data("price", symbol)
-    price = historical_data["Close"]
-
-    return_in_1yr = calc_future_return(price, 365)
-    valuation = return_in_1yr.map(get_valuation)
-    valuation.index.name = "Date"
-    valuation.name = "Valuation"
-
-    # main working dataset for the study
-    dataset = pd.concat([price, valuation], axis=1).dropna()
-
-    # with open("output.csv", 'w') as f:
-    #     dataset.to_csv(f)
+    prices = load_prices([symbol])
+    return_in_1yr = calc_future_returns(prices, 365).values
 
-    # one year after the last investment
-    sell_date = price.index[-1]
-    sell_price = price[-1]
+    # invest only in dates of which the return in one year is known, sell on the last date
+    can_invest = ~np.isnan(return_in_1yr)
+    invest_dates = prices.index[can_invest[:, 0]]
+    investing_period = (invest_dates[-1] - invest_dates[0]).days / 365
 
-    print("Studying Dollar Cost Averaging strategy")
-    amount_invested_dca = dataset.apply(lambda r: 1, axis=1)
-    amount_invested_dca.name = "Invest"
-    study_strategy(amount_invested_dca, dataset, sell_date, sell_price)
+    strategies = {
+        "Dollar Cost Averaging": can_invest,
 
-    print()
+        # God is always able to predict stock market downturn correctly and invest at the right time
+        "God": can_invest & (return_in_1yr >= UNDER_VALUATION_RETURN),
+    }
 
-    print("Studying God strategy")
-    # God is always able to predict stock market downturn correctly and invest at the right time
-    amount_invested_god = (dataset["Valuation"] == "U").map(np.int)
-    amount_invested_god.name = "Invest"
-    study_strategy(amount_invested_god, dataset, sell_date, sell_price)
+    for name, amounts in strategies.items():
+        result = run_backtest(prices, amounts, distribution_yield=DISTRIBUTION_YIELD)
+        study_strategy(name, result, symbol, investing_period)
+        print()
@@ -1,16 +1,10 @@
-from fa.database.models import IncomeStatement
+from fa.database.enrichment import enrich, ENRICHMENTS
 import initialize
 
 
-""" Enrich financial data with extra data columns calculated from existing columns """
+""" Enrich financial data with extra data columns calculated from existing columns, declared in ENRICHMENTS """
 
 initialize.init()
 
-IncomeStatement \
-    .update(operating_income=(
-        IncomeStatement.gross_income -
-        IncomeStatement.sg_a_expense -
-        IncomeStatement.other_operating_expense
-    )) \
-    .where(IncomeStatement.operating_income >> None) \
-    .execute()
+for data_type in ENRICHMENTS:
+    enrich(data_type)
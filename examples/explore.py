@@ -5,8 +5,9 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
-from fa.analysis.finance import Metric, PROFIT_MARGIN_KINDS
+from fa.analysis.finance import UniverseMetric, PROFIT_MARGIN_KINDS
 from fa.analysis.measurement import get_first_commonly_available_year
+from fa.analysis.io import load_fundamental_data_of_symbols, split_by_symbol
 
 import initialize
 from plot_util import print_point_labels
@@ -15,7 +16,7 @@ from settings import end_date
 
 """ Explore value investing fundamental analysis methods """
 
-initialize.init()
+initialize.init("analysis")
 
 symbols = OrderedDict([
     ("C6L.SI", "Singapore Airlines"),
@@ -28,8 +29,12 @@ symbols = OrderedDict([
     ("B2F.SI", "M1"),
 ])
 
-metrics = [Metric.from_archive(s) for s in symbols]
-pe_ratios_list = [m.calc_pe_ratio() for m in metrics]
+universe_metric = UniverseMetric.from_archive(list(symbols))
+pe_ratios_df = universe_metric.calc_pe_ratio()
+# keep each symbol to the dates of its own reports, NaN included, as Metric.calc_pe_ratio does
+eps_list = split_by_symbol(load_fundamental_data_of_symbols("income_statement", list(symbols), ["EPS (Basic)"]), symbols)
+lag = universe_metric.financial_report_preparation_lag
+pe_ratios_list = [pe_ratios_df[s].reindex(eps_list[s].index + lag) for s in symbols]
 
 # figure 1
 fig = plt.figure(figsize=(12, 10))
@@ -37,7 +42,7 @@ fig = plt.figure(figsize=(12, 10))
 title = "P/E Ratio of stocks over Date\n"
 xticks = reduce(lambda a, b: a | b, [ts.index for ts in pe_ratios_list])
 
-with pd.plot_params.use('x_compat', True):
+with pd.plotting.plot_params.use('x_compat', True):
     for series, label in zip(pe_ratios_list, symbols.values()):
         graph = series.plot(label=label, legend=True, title=title, xticks=xticks)
         graph.set_xlabel("Date")
@@ -49,18 +54,19 @@ pe_ratios_at_buy_year_list = [ts.loc[str(buy_year)] for ts in pe_ratios_list]
 buy_dates = [ser.index[0] for ser in pe_ratios_at_buy_year_list]
 pe_ratios = [ser.iat[0] for ser in pe_ratios_at_buy_year_list]
 
-dated_metrics = [m.at(buy_date) for m, buy_date in zip(metrics, buy_dates)]
+# value of each symbol at its buy date
+at_buy_dates = lambda df: [df.at[buy_date, symbol] for symbol, buy_date in zip(symbols, buy_dates)]
 
 sell_date = pd.Timestamp(end_date) - np.timedelta64(1, 'D')
-percentage_annual_returns = [dm.calc_annual_return(sell_date) * 100 for dm in dated_metrics]
+percentage_annual_returns = list(universe_metric.calc_annual_return(buy_dates, sell_date) * 100)
 
 profit_margin_labels = [k.title() + " Profit Margin (%)" for k in PROFIT_MARGIN_KINDS]
 profit_margins = {
-    label: [dm.calc_profit_margin(kind) * 100 for dm in dated_metrics]
+    label: at_buy_dates(universe_metric.calc_profit_margin(kind) * 100)
     for label, kind in zip(profit_margin_labels, PROFIT_MARGIN_KINDS)
 }
 
-debt_ratios = [dm.calc_debt_to_asset_ratio() * 100 for dm in dated_metrics]
+debt_ratios = at_buy_dates(universe_metric.calc_debt_to_asset_ratio() * 100)
 
 graph_data = {
     "Symbol": list(symbols.keys()),
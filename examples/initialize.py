@@ -1,21 +1,28 @@
 import logging
 
 from fa.database.models import db
+from fa.database.columnar import store as columnar_store
+from fa.miner.cache import cache as http_cache
 
-from settings import db_path, log_file_path, log_level
+from settings import db_path, columnar_store_path, http_cache_path, http_cache_ttl, http_cache_offline, log_file_path, log_level
 
 
 """ Initialization """
 
-def init():
-    # connect to database
-    db.init(db_path)
+def init(profile="default"):
+    """ profile: connection profile in fa.database.connection.PROFILES,
+        e.g. "bulk-load" for writing lots of data, "analysis" for reading only.
+    """
+    # connect to database, with foreign key constraints enforced in every profile
+    # http://stackoverflow.com/questions/9937713/does-sqlite3-not-support-foreign-key-constraints
+    db.init(db_path, profile=profile)
     db.connect()
 
-    # http://stackoverflow.com/questions/9937713/does-sqlite3-not-support-foreign-key-constraints
-    # In SQLite 3.x, you have to make the following query every time you connect to an SQLite database
-    # Otherwise SQLite will ignore all foreign key constraints.
-    db.execute_sql("PRAGMA foreign_keys = ON")
+    # kept in sync by update_fundamentals
+    columnar_store.init(columnar_store_path)
+
+    # downloaded pages are kept in and read from the cache
+    http_cache.init(http_cache_path, http_cache_ttl, http_cache_offline)
 
     # set up logging
     logging.basicConfig(
@@ -0,0 +1,11 @@
+from fa.database.query import migrate_to_narrow_table
+
+import initialize
+
+
+""" Copy financial report data into the narrow table, so that it can be loaded column by column
+    with load_fundamental_data(..., storage="narrow"), kept up to date by update_fundamentals after that.
+"""
+
+initialize.init("bulk-load")
+migrate_to_narrow_table()
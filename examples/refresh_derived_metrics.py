@@ -0,0 +1,15 @@
+import logging
+
+from fa.analysis.derived import refresh_derived_metrics
+
+import initialize
+
+
+""" Recalculate derived metrics (P/E ratio, profit margins, growth) of symbols of which data has been updated """
+
+initialize.init()
+logger = logging.getLogger(__name__)
+
+logger.info("Will refresh derived metrics of symbols updated since the last refresh.")
+symbols = refresh_derived_metrics()
+logger.info("Finished refreshing derived metrics of {0} symbols.".format(len(symbols)))
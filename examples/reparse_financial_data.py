@@ -0,0 +1,45 @@
+import logging
+
+from fa.miner import wsj
+from fa.miner.cache import cache as http_cache
+from fa.miner.exceptions import MinerException
+from fa.database.models import Symbol
+from fa.database.query import update_fundamentals
+from fa.piping import csv_rows_to_records
+from fa.pipeline import run_pipeline
+
+import initialize
+from settings import *
+
+
+""" Parse the financial report pages kept in the cache again, e.g. after a fix of the scraper, without network """
+
+logger = logging.getLogger(__name__)
+
+def store(data, symbol, timeframe, report_type):
+    """ writes parsed <data> to database, runs in the main thread only """
+    data_type = report_type.replace('-', '_')
+    records = csv_rows_to_records(symbol, iter(data))
+
+    # records that already exist are replaced by the ones parsed again
+    update_fundamentals(data_type, symbol, records, end_date, on_conflict="replace")
+
+if __name__ == "__main__":
+    initialize.init("bulk-load")
+    http_cache.init(http_cache_path, http_cache_ttl, offline=True)
+
+    symbols = [s.symbol for s in Symbol.select(Symbol.symbol).where(Symbol.category == "stock")]
+    args_list = [(symbol, "annual", report_type) for report_type in wsj.FINANCIAL_REPORT_TYPES for symbol in symbols]
+
+    logger.info("Will parse {0} cached financial report pages again.".format(len(args_list)))
+
+    # pages not in the cache are skipped
+    run_pipeline(
+        args_list,
+        wsj.fetch_financial_data,
+        wsj.parse_financial_data,
+        store,
+        skipped_exceptions=(MinerException,)
+    )
+
+    logger.info("Finished parsing financial data again.")
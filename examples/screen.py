@@ -0,0 +1,15 @@
+from fa.analysis.io import load_fundamental_data_as_of
+
+import initialize
+from settings import end_date
+
+
+""" Screen all symbols by their latest derived metrics, precomputed by refresh_derived_metrics.py """
+
+initialize.init("analysis")
+
+df = load_fundamental_data_as_of("derived_metric", end_date, ["P/E Ratio", "Net Profit Margin", "Sales/Revenue Growth"])
+
+# cheap, profitable and growing
+screened = df[(df["P/E Ratio"] > 0) & (df["P/E Ratio"] <= 15) & (df["Net Profit Margin"] > 0.1) & (df["Sales/Revenue Growth"] > 0)]
+print(screened)
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 
 
@@ -7,6 +7,18 @@ import logging
 # path to sqlite database
 db_path = "/home/kakarukeys/Documents/plan/projects/Fundamental Analysis project/algo-fa.db"
 
+# path to directory of columnar store of price data (fa.database.columnar), None to disable
+columnar_store_path = None
+
+# path to directory of the cache of downloaded pages (fa.miner.cache), None to disable
+http_cache_path = None
+
+# how long a page is used from the cache without asking the server again
+http_cache_ttl = timedelta(days=7)
+
+# True to read pages from the cache only, e.g. to parse them again without network
+http_cache_offline = False
+
 # path to log file
 log_file_path = "/home/kakarukeys/Documents/plan/projects/Fundamental Analysis project/algo-fa.log"
 log_level = logging.INFO
@@ -0,0 +1,37 @@
+import numpy as np
+
+from fa.analysis.io import load_fundamental_data_of_symbols
+from fa.backtest import load_prices, to_arrays, study_valuation, study_pe_ratio
+from fa.database.models import Symbol
+from fa.sweep import run_sweep
+
+import initialize
+
+
+""" Sweep parameters of strategies over all stocks, each parameter combination studied in a process pool """
+
+if __name__ == "__main__":
+    initialize.init("analysis")
+
+    symbols = [s.symbol for s in Symbol.select(Symbol.symbol).where(Symbol.category == "stock")]
+    prices = load_prices(symbols)
+    arrays = to_arrays(prices, load_fundamental_data_of_symbols("income_statement", symbols, ["EPS (Basic)"]))
+
+    # invest when under-valued in hindsight
+    valuation_results = run_sweep(study_valuation, {
+        "valuation_threshold": np.linspace(0, 0.3, 31),
+        "distribution_yield": [0, 0.0272],
+        "horizon": [91, 182, 365, 730],
+    }, arrays)
+
+    # invest when P/E ratio is low
+    pe_ratio_results = run_sweep(study_pe_ratio, {
+        "pe_threshold": range(5, 31),
+        "distribution_yield": [0, 0.0272],
+        "financial_report_preparation_lag": [np.timedelta64(days, 'D') for days in (0, 30, 60, 90)],
+    }, arrays)
+
+    for results in (valuation_results, pe_ratio_results):
+        parameters = list(results.columns[:list(results.columns).index("Symbol")])
+        print(results.groupby(parameters)[["total_return", "annual_return"]].median())
+        print()
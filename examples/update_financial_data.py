@@ -2,8 +2,9 @@ import logging
 
 from fa.miner import wsj
 from fa.miner.exceptions import MinerException
-from fa.database.query import get_outdated_symbols, get_record_dates, update_fundamentals
+from fa.database.query import get_outdated_symbols, update_fundamentals
 from fa.piping import csv_rows_to_records
+from fa.pipeline import run_pipeline
 
 import initialize
 from settings import *
@@ -11,32 +12,34 @@ from settings import *
 
 """ Download data from internet to database """
 
-initialize.init()
 logger = logging.getLogger(__name__)
 
-for report_type in wsj.FINANCIAL_REPORT_TYPES:
-    logger.info("Will update {0} data of all symbols not up to date on {1}.".format(report_type, end_date))
-
+def store(data, symbol, timeframe, report_type):
+    """ writes parsed <data> to database, runs in the main thread only """
     data_type = report_type.replace('-', '_')
-    symbol_update_dates = {s.symbol: s.updated_at for s in get_outdated_symbols(data_type, end_date, "stock")}
-
-    for symbol in symbol_update_dates:
-        try:
-            data = wsj.get_financial_data(symbol, "annual", report_type)
-        except MinerException as e:
-            logger.warning("Could not find updated {0} data of {1} due to {2}. Skip.".format(report_type, symbol, e.__class__.__name__))
-            continue
-        else:
-            records = list(csv_rows_to_records(symbol, data))
-
-            if symbol_update_dates[symbol]:
-                logger.info("Filter out {0} records of {1} that already exist".format(report_type, symbol))
-                existing_record_dates = set(r.date for r in get_record_dates(data_type, symbol))
-                records = [r for r in records if r["date"] not in existing_record_dates]
-
-            if records:
-                update_fundamentals(data_type, symbol, records, end_date)
-            else:
-                logger.info("No new {0} data for {1}.".format(report_type, symbol))
-
-    logger.info("Finished updating {0} data.".format(report_type))
+    records = csv_rows_to_records(symbol, iter(data))
+
+    # records that already exist are left as they are
+    update_fundamentals(data_type, symbol, records, end_date, on_conflict="ignore")
+
+if __name__ == "__main__":
+    # the scraping processes only need the functions above
+    initialize.init("bulk-load")
+    args_list = []
+
+    for report_type in wsj.FINANCIAL_REPORT_TYPES:
+        logger.info("Will update {0} data of all symbols not up to date on {1}.".format(report_type, end_date))
+
+        data_type = report_type.replace('-', '_')
+        args_list += [(s.symbol, "annual", report_type) for s in get_outdated_symbols(data_type, end_date, "stock")]
+
+    # downloading, scraping and writing to database of different reports overlap
+    run_pipeline(
+        args_list,
+        wsj.fetch_financial_data,
+        wsj.parse_financial_data,
+        store,
+        skipped_exceptions=(MinerException,)
+    )
+
+    logger.info("Finished updating financial data.")
@@ -1,10 +1,15 @@
+from collections import defaultdict
+from datetime import timedelta
 import csv
 import logging
 
+import requests
+
 from fa.miner import yahoo
-from fa.piping import csv_string_to_records
+from fa.miner.exceptions import GetError
+from fa.piping import csv_string_to_records, csv_lines_to_column_chunks
 from fa.util import partition
-from fa.database.query import get_outdated_symbols, update_fundamentals
+from fa.database.query import get_outdated_symbols, update_fundamentals_from_columns, update_fundamentals_incrementally
 
 import initialize
 from settings import *
@@ -12,25 +17,57 @@ from settings import *
 
 """ Download data from internet to database """
 
-initialize.init()
+initialize.init("bulk-load")
 logger = logging.getLogger(__name__)
 
+# how far back before the last update to download again, to detect price adjustment for splits and dividends
+overlap_window = timedelta(days=14)
+
+def get_records(symbols, fetch_start_date):
+    """ Yields (symbol, records) of historical prices of <symbols> from <fetch_start_date> to end_date """
+    # do the download in chunks of size 32, each chunk downloaded concurrently,
+    # with the number of requests in flight and the request rate limited to prevent overloading servers
+    for chunk in partition(symbols, 32):
+        data = yahoo.get_historical_data(chunk, fetch_start_date, end_date, max_workers=8, rate_limit=10)
+
+        for symbol, csv_string in data.items():
+            if csv_string:
+                try:
+                    yield symbol, list(csv_string_to_records(symbol, csv_string, strict=True))
+                except csv.Error as e:
+                    logger.exception(e)
+                    logger.error("csv of {0} is malformed.".format(symbol))
+            else:
+                logger.warning("Could not find updated historical prices of {0}. Skip.".format(symbol))
+
 logger.info("Will update historical prices of all symbols not up to date on {0}.".format(end_date))
-all_symbols = [s.symbol for s in get_outdated_symbols("price", end_date)]
-
-# do the download in chunks of size 8 to prevent overloading servers
-for symbols in partition(all_symbols, 8):
-    data = yahoo.get_historical_data(symbols, start_date, end_date)
-
-    for symbol, csv_string in data.items():
-        if csv_string:
-            try:
-                records = csv_string_to_records(symbol, csv_string, strict=True)
-                update_fundamentals("price", symbol, records, end_date, delete_old=True)
-            except csv.Error as e:
-                logger.exception(e)
-                logger.error("csv of {0} is malformed.".format(symbol))
-        else:
-            logger.warning("Could not find updated historical prices of {0}. Skip.".format(symbol))
+
+# {date to download from: symbols}, symbols never updated get full history
+symbols_by_fetch_start_date = defaultdict(list)
+for s in get_outdated_symbols("price", end_date):
+    symbols_by_fetch_start_date[s.updated_at - overlap_window if s.updated_at else start_date].append(s.symbol)
+
+symbols_to_reload = symbols_by_fetch_start_date.pop(start_date, [])
+
+# only new days are downloaded and written, unless past prices have been adjusted
+for fetch_start_date, symbols in sorted(symbols_by_fetch_start_date.items()):
+    for symbol, records in get_records(symbols, fetch_start_date):
+        if not update_fundamentals_incrementally("price", symbol, records, end_date):
+            logger.info("Prices of {0} have been adjusted, will reload all.".format(symbol))
+            symbols_to_reload.append(symbol)
+
+# full history is streamed into database chunk by chunk, one symbol at a time, over one keep-alive connection
+session = requests.Session()
+
+for symbol in symbols_to_reload:
+    try:
+        lines = yahoo.stream_historical_data(symbol, start_date, end_date, session=session)
+        column_chunks = csv_lines_to_column_chunks(lines, strict=True)
+        update_fundamentals_from_columns("price", symbol, column_chunks, end_date, delete_old=True)
+    except GetError:
+        logger.warning("Could not find updated historical prices of {0}. Skip.".format(symbol))
+    except csv.Error as e:
+        logger.exception(e)
+        logger.error("csv of {0} is malformed.".format(symbol))
 
 logger.info("Finished updating historical prices.")
@@ -0,0 +1,123 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from fa.analysis import sanity
+from fa.analysis.io import iter_fundamental_data, load_fundamental_data_of_symbols
+from fa.database.models import db, audit_export, Symbol
+from fa.database.query import update_quality_findings
+from fa.util import partition
+
+
+logger = logging.getLogger(__name__)
+
+# {data_type: {check: tolerance}} of the checks run on each data type by default,
+# financial reports are annual and have many columns legitimately left empty
+DEFAULT_CHECKS = {
+    "price": {
+        "missing_date": np.timedelta64(7, 'D'),
+        "missing_value": None,
+        "outlier": 6,
+        "discontinuity": 6,
+    },
+    "balance_sheet": {"missing_date": np.timedelta64(400, 'D'), "outlier": 6, "discontinuity": 6},
+    "cash_flow": {"missing_date": np.timedelta64(400, 'D'), "outlier": 6, "discontinuity": 6},
+    "income_statement": {"missing_date": np.timedelta64(400, 'D'), "outlier": 6, "discontinuity": 6},
+}
+
+# {check: function(df, tolerance) returning findings}, see fa.analysis.sanity
+CHECK_FUNCTIONS = {
+    "missing_date": sanity.find_missing_dates,
+    "missing_value": lambda df, tolerance: sanity.find_missing_values(df),
+    "outlier": sanity.find_outliers,
+    "discontinuity": sanity.find_discontinuities,
+}
+
+def scan_frame(data_type, df, checks):
+    """ Runs <checks> ({check: tolerance}) on <df>, <data_type> data of many symbols as returned by
+        fa.analysis.io.load_fundamental_data_of_symbols, and returns the findings as records (dicts) of
+        QualityFinding fields.
+    """
+    records = []
+
+    for check, tolerance in sorted(checks.items()):
+        findings = CHECK_FUNCTIONS[check](df, tolerance)
+        dates = pd.DatetimeIndex(findings["Date"]).to_pydatetime()
+
+        records += [
+            {"symbol_obj": symbol, "data_type": data_type, "check": check, "date": date, "column": column}
+            for symbol, date, column in zip(findings["Symbol"].tolist(), dates, findings["Column"].tolist())
+        ]
+
+    return records
+
+def find_bad_ticks(symbol, columns=("Adj Close",), tolerance=6, window=63, robust=True, chunk_size=65536):
+    """ Returns findings of bad ticks in price data of <symbol> as records (dicts) of QualityFinding fields, the values
+        of <columns> at which the first-order derivative deviates from the <window> derivatives before it by more than
+        <tolerance> * sigma (or scaled MAD if <robust>), see fa.analysis.sanity.check_for_rolling_discontinuity.
+
+        The data is loaded and checked <chunk_size> rows at a time, so that the memory used does not grow
+        with the length of the series.
+    """
+    frames = iter_fundamental_data("price", symbol, columns, chunk_size)
+    records = []
+
+    for result in sanity.iter_rolling_discontinuities(frames, tolerance, window, robust):
+        is_found = result.notnull().values
+        rows, cols = np.nonzero(is_found)
+
+        records += [
+            {"symbol_obj": symbol, "data_type": "price", "check": "bad_tick", "date": date, "column": column}
+            for date, column in zip(result.index[rows].to_pydatetime(), result.columns.values[cols].tolist())
+        ]
+
+    return records
+
+def scan_database(data_types=None, symbols=None, checks=None, chunk_size=256, max_workers=None):
+    """ Runs data quality checks on <data_types> data of <symbols> in the database and replaces their findings
+        in QualityFinding table (created if not exists). Returns the number of findings.
+
+        The data is loaded <chunk_size> symbols at a time with one query, and the checks are vectorized across
+        the symbols of a chunk, run in a pool of <max_workers> processes (default: None - as many as CPUs)
+        while the next chunks are loaded. Findings are written in the calling thread only.
+
+        data_types: names of *_updated_at fields in Symbol model without _updated_at, default: None - all in <checks>.
+        symbols: default: None - all symbols in the database.
+        checks: {data_type: {check: tolerance}}, check being a key of CHECK_FUNCTIONS, default: DEFAULT_CHECKS.
+    """
+    checks = checks or DEFAULT_CHECKS
+    data_types = data_types or sorted(checks)
+    symbols = sorted(symbols if symbols is not None else (s.symbol for s in Symbol.select(Symbol.symbol)))
+
+    # loading runs ahead of the checks by at most one chunk per worker
+    max_pending = max_workers or os.cpu_count() or 1
+    pending = deque()
+    no_of_findings = 0
+
+    db.create_tables(audit_export, safe=True)
+
+    def store_next():
+        data_type, chunk, future = pending.popleft()
+        findings = future.result()
+
+        update_quality_findings(data_type, chunk, findings)
+        logger.info("Found {0} problems in {1} data of {2} symbols.".format(len(findings), data_type, len(chunk)))
+        return len(findings)
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        for data_type in data_types:
+            for chunk in partition(symbols, chunk_size):
+                df = load_fundamental_data_of_symbols(data_type, chunk)
+                pending.append((data_type, chunk, executor.submit(scan_frame, data_type, df, checks[data_type])))
+
+                if len(pending) > max_pending:
+                    no_of_findings += store_next()
+
+        while pending:
+            no_of_findings += store_next()
+
+    return no_of_findings
@@ -0,0 +1,105 @@
+from collections import OrderedDict, namedtuple
+import threading
+
+from fa.analysis import io
+from fa.database import query
+
+
+CacheInfo = namedtuple("CacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+class LRUCache(object):
+    def __init__(self, maxsize):
+        """ Returns a mapping of at most <maxsize> items, which discards the least recently used item when full.
+            It is safe to use from multiple threads.
+        """
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key, create):
+        """ Returns the value of <key>, creates it by calling <create>() and stores it if <key> is not found.
+            If <key> is not hashable, e.g. with a list in it, the value is created and not stored.
+        """
+        try:
+            hash(key)
+        except TypeError:
+            with self._lock:
+                self.misses += 1
+            return create()
+
+        with self._lock:
+            if key in self._items:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return self._items[key]
+
+            self.misses += 1
+
+        value = create()    # the lock is not held here, so that <create> can use other caches
+
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+        return value
+
+    def invalidate(self, predicate):
+        """ Discards all items which key satisfies <predicate>. """
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                del self._items[key]
+
+    def clear(self):
+        """ Discards all items and resets the statistics. """
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+    def info(self):
+        """ Returns hit/miss statistics and size of the cache. """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._items))
+
+# DataFrame objects returned by load_fundamental_data, keyed by
+# (data_type, symbol, columns, date of last update, other arguments)
+frame_cache = LRUCache(256)
+
+# objects returned by <class>.from_cached_archive, keyed by
+# (class, symbol, dates of last update, constructor arguments)
+metric_cache = LRUCache(64)
+
+def _freeze(kwargs):
+    """ Returns the items of <kwargs> in a tuple, sorted if their keys can be compared """
+    try:
+        return tuple(sorted(kwargs.items()))
+    except TypeError:
+        return tuple(kwargs.items())
+
+def load_fundamental_data(data_type, symbol, columns=None, **kwargs):
+    """ Same as fa.analysis.io.load_fundamental_data, but the DataFrame object is returned from frame_cache
+        if the data of <symbol> has not been updated since it was loaded. It must not be modified.
+    """
+    updated_at = query.get_update_markers(symbol).get(data_type)
+    key = (data_type, symbol, None if columns is None else tuple(columns), updated_at, _freeze(kwargs))
+
+    return frame_cache.get(key, lambda: io.load_fundamental_data(data_type, symbol, columns, **kwargs))
+
+def get_metric(cls, symbol, args, kwargs, create):
+    """ Returns the object created by <create>() from metric_cache, if no data of <symbol> has been updated since
+        it was created, with <cls>, <args> and <kwargs> being the rest of the cache key. It must not be modified.
+    """
+    markers = query.get_update_markers(symbol)
+    key = (cls, symbol, _freeze(markers), args, _freeze(kwargs))
+
+    return metric_cache.get(key, create)
+
+def _invalidate(data_type, symbol):
+    """ discards the cached items of <symbol> once its <data_type> data is updated """
+    frame_cache.invalidate(lambda key: key[:2] == (data_type, symbol))
+    metric_cache.invalidate(lambda key: key[1] == symbol)
+
+query.update_listeners.append(_invalidate)
@@ -0,0 +1,49 @@
+import logging
+
+import pandas as pd
+
+from fa.analysis.finance import calc_derived_metrics, PROFIT_MARGIN_KINDS
+from fa.analysis.io import load_fundamental_data_of_symbols
+from fa.database.models import db, derived_export
+from fa.database.query import get_symbols_to_refresh, replace_derived_metrics
+from fa.util import partition, to_pythonic_name
+
+
+logger = logging.getLogger(__name__)
+
+def _to_records(metrics):
+    """ Returns records (dicts) of DerivedMetric fields of <metrics> as returned by calc_derived_metrics """
+    field_names = ["symbol_obj", "date"] + [to_pythonic_name(c) for c in metrics.columns]
+    values = metrics.values.astype(object)
+    values[pd.isnull(metrics.values)] = None
+
+    return [
+        dict(zip(field_names, (symbol, date.to_pydatetime()) + tuple(row)))
+        for (symbol, date), row in zip(metrics.index, values)
+    ]
+
+def refresh_derived_metrics(symbols=None, chunk_size=256, price_column="Adj Close"):
+    """ Recalculates derived metrics (DerivedMetric table, created if not exists) of every symbol (or of <symbols>)
+        of which price, balance sheet or income statement data has been updated since its last refresh,
+        <chunk_size> symbols at a time, with calc_derived_metrics. Returns the symbols refreshed.
+
+        price_column: the column to get prices of P/E Ratio, default: "Adj Close".
+    """
+    db.create_tables(derived_export, safe=True)
+    markers = get_symbols_to_refresh(symbols)
+
+    # only the columns needed by calc_derived_metrics
+    columns = [
+        ("price", [price_column]),
+        ("balance_sheet", ["Total Liabilities / Total Assets"]),
+        ("income_statement", ["Sales/Revenue", "EPS (Basic)"] + [kind.title() + " Income" for kind in PROFIT_MARGIN_KINDS]),
+    ]
+
+    for chunk in partition(list(markers), chunk_size):
+        frames = [load_fundamental_data_of_symbols(data_type, chunk, data_columns) for data_type, data_columns in columns]
+        metrics = calc_derived_metrics(*frames, price_column=price_column)
+
+        replace_derived_metrics({symbol: markers[symbol] for symbol in chunk}, _to_records(metrics))
+        logger.info("Refreshed derived metrics of {0} symbols.".format(len(chunk)))
+
+    return list(markers)
@@ -1,6 +1,11 @@
+from collections import OrderedDict
+
 import numpy as np
-from fa.calculator import translate_index
-from fa.analysis.io import load_fundamental_data
+import pandas as pd
+from fa.calculator import translate_index, fill_indexer, asof_indexer
+from fa.analysis.io import load_fundamental_data, load_fundamental_data_of_symbols, split_by_symbol
+from fa.analysis import cache
+from fa.database.models import get_numerical_column_names
 
 
 PROFIT_MARGIN_KINDS = ("gross", "operating", "pretax", "net")
@@ -25,13 +30,6 @@ class Metric(object):
         self.cash_flow = cash_flow
         self.financial_report_preparation_lag = financial_report_preparation_lag
 
-        if historical is not None:
-            # historical data with missing dates filled in, with values from future
-            self.historical_fillforward = historical.resample('1D', fill_method="ffill")
-
-            # historical data with missing dates filled in, with values from past
-            self.historical_fillbackward = historical.resample('1D', fill_method="bfill")
-
         # financial reports with the lag in information release factored in
         if balance_sheet is not None:
             self.balance_sheet_lagged = translate_index(balance_sheet, self.financial_report_preparation_lag)
@@ -50,25 +48,97 @@ class Metric(object):
             symbol: e.g. "C6L.SI"
             Any extra arguments will be passed on to the constructor.
         """
+        return cls._from_archive(load_fundamental_data, symbol, *args, **kwargs)
+
+    @classmethod
+    def _from_archive(cls, load, symbol, *args, **kwargs):
         kwargs.update({
-            "historical": load_fundamental_data("price", symbol),
-            "balance_sheet": load_fundamental_data("balance_sheet", symbol),
-            "income_statement": load_fundamental_data("income_statement", symbol),
-            "cash_flow": load_fundamental_data("cash_flow", symbol),
+            "historical": load("price", symbol),
+            "balance_sheet": load("balance_sheet", symbol),
+            "income_statement": load("income_statement", symbol),
+            "cash_flow": load("cash_flow", symbol),
         })
 
         return cls(*args, **kwargs)
 
+    @classmethod
+    def from_cached_archive(cls, symbol, *args, **kwargs):
+        """ Same as from_archive, but the object is returned from fa.analysis.cache.metric_cache
+            if the data of <symbol> has not been updated since it was created (data loaded are cached as well).
+            The object may be shared, it must not be modified.
+        """
+        create = lambda: cls._from_archive(cache.load_fundamental_data, symbol, *args, **kwargs)
+        return cache.get_metric(cls, symbol, args, kwargs, create)
+
+    @classmethod
+    def from_archive_of_symbols(cls, symbols, *args, **kwargs):
+        """ Returns {symbol: object that is capable of calculating various metrics of the stock} for each of <symbols>,
+            with data of all symbols loaded from archive together, one query per data type.
+
+            symbols: e.g. ["C6L.SI", "J7X.SI"]
+            Any extra arguments will be passed on to the constructor.
+        """
+        data_types = OrderedDict([
+            ("historical", "price"),
+            ("balance_sheet", "balance_sheet"),
+            ("income_statement", "income_statement"),
+            ("cash_flow", "cash_flow"),
+        ])
+
+        frames = {
+            name: split_by_symbol(load_fundamental_data_of_symbols(data_type, symbols), symbols)
+            for name, data_type in data_types.items()
+        }
+
+        metrics = OrderedDict()
+        for s in symbols:
+            kw = dict(kwargs)
+            kw.update({name: frames[name][s] for name in data_types})
+            metrics[s] = cls(*args, **kw)
+
+        return metrics
+
     def at(self, date):
         """ Fixes the internal date to <date> (pd.Timestamp object) to be used for calculation of metrics. """
         dm = DatedMetric(date)
         dm.__dict__.update(self.__dict__)   # bring over all attributes
         return dm
 
+    def at_dates(self, dates, as_of=False):
+        """ Fixes the internal dates to <dates> (a sequence of pd.Timestamp objects) to be used for calculation
+            of metrics at all of them at once, see BatchedDatedMetric for <as_of>.
+        """
+        bdm = BatchedDatedMetric(dates, as_of)
+        bdm.__dict__.update(self.__dict__)   # bring over all attributes
+        return bdm
+
+    def _get_prices(self, dates, price_column, method):
+        """ Returns an array of prices in <price_column> at <dates>, as if the historical data were resampled daily
+            and missing dates filled in by <method> ("ffill" or "bfill"), NaN for dates out of the range of the data.
+        """
+        positions = fill_indexer(self.historical.index, dates, method)
+        found = positions >= 0
+
+        prices = np.empty(len(positions))
+        prices[~found] = np.nan
+        prices[found] = self.historical[price_column].values[positions[found]]
+        return prices
+
+    def _get_price(self, date, price_column, method):
+        """ Returns the price in <price_column> at <date>, same as _get_prices,
+            but raises KeyError if <date> is out of the range of the data.
+        """
+        position = fill_indexer(self.historical.index, [date], method)[0]
+
+        if position < 0:
+            raise KeyError(date)
+
+        return self.historical[price_column].iat[position]
+
     def _calc_return(self, buy_date, sell_date, price_column):
         # use fillbackward here because a market order is executed as soon as a price is available
-        buy_price = self.historical_fillbackward.at[buy_date, price_column]
-        sell_price = self.historical_fillbackward.at[sell_date, price_column]
+        buy_price = self._get_price(buy_date, price_column, "bfill")
+        sell_price = self._get_price(sell_date, price_column, "bfill")
         return sell_price / buy_price - 1
 
     def calc_return(self, buy_date, sell_date, price_column="Adj Close"):
@@ -95,7 +165,8 @@ class Metric(object):
             eps_columm: the column to get EPS, default: "EPS (Basic)"
         """
         eps = self.income_statement_lagged[eps_column]
-        pps = self.historical_fillforward.loc[eps.index, price_column]  # use fillforward here to avoid peeking into future
+        # use fillforward here to avoid peeking into future
+        pps = pd.Series(self._get_prices(eps.index, price_column, "ffill"), index=eps.index, name=price_column)
         return pps / eps
 
     def calc_profit_margin(self, kind):
@@ -140,7 +211,7 @@ class DatedMetric(Metric):
             eps_columm: the column to get EPS, default: "EPS (Basic)"
         """
         eps = self.income_statement_lagged.at[self.date, eps_column]
-        pps = self.historical_fillforward.at[self.date, price_column]
+        pps = self._get_price(self.date, price_column, "ffill")
         return pps / eps
 
     def calc_profit_margin(self, kind):
@@ -155,3 +226,342 @@ class DatedMetric(Metric):
     def calc_debt_to_asset_ratio(self):
         """ Returns the Debt/Asset Ratio of the stock at the internal date."""
         return self.balance_sheet_lagged.at[self.date, "Total Liabilities / Total Assets"]
+
+class BatchedDatedMetric(Metric):
+    def __init__(self, dates, as_of=False, **kwargs):
+        """ Returns an object that is capable of calculating various metrics of the stock at each of <dates>
+            (a sequence of pd.Timestamp objects) in one call, the same as DatedMetric at each date,
+            except that NaN is given where DatedMetric would raise KeyError.
+            as_of: whether to use the latest financial report known at each date, instead of only one released at the date.
+                default: False.
+            Takes arguments of Metric constructor as extra keyword arguments.
+        """
+        super(BatchedDatedMetric, self).__init__(**kwargs)
+        self.dates = pd.DatetimeIndex(dates)
+        self.as_of = as_of
+
+    def _to_dates(self, date):
+        """ Returns an array of dates, one for each of the internal dates, from <date>,
+            a pd.Timestamp object or a sequence of them.
+        """
+        return np.broadcast_to(np.asarray(date, dtype="datetime64[ns]"), self.dates.shape)
+
+    def _get_report_values(self, frame, column):
+        """ Returns an array of values in <column> of <frame> at the internal dates, NaN where there is no report """
+        if self.as_of:
+            return join_as_of(frame[[column]], self.dates)[column].values
+
+        return frame[column].reindex(self.dates).values
+
+    def _calc_return(self, sell_date, price_column):
+        # use fillbackward here because a market order is executed as soon as a price is available
+        buy_prices = self._get_prices(self.dates, price_column, "bfill")
+        sell_prices = self._get_prices(self._to_dates(sell_date), price_column, "bfill")
+        return sell_prices / buy_prices - 1
+
+    def calc_return(self, sell_date, price_column="Adj Close"):
+        """ Returns a Series object of the return of the stock if a buy market order is made on each of the internal dates
+            and a sell market order is made on <sell_date>, indexed by the internal dates.
+            sell_date: pd.Timestamp object, or a sequence of them, one for each of the internal dates
+            price_column: the column to get prices, default: "Adj Close".
+        """
+        return pd.Series(self._calc_return(sell_date, price_column), index=self.dates)
+
+    def calc_annual_return(self, sell_date, price_column="Adj Close"):
+        """ Returns a Series object of the annualized return of the stock if a buy market order is made on each of
+            the internal dates and a sell market order is made on <sell_date>, indexed by the internal dates.
+            sell_date: pd.Timestamp object, or a sequence of them, one for each of the internal dates
+            price_column: the column to get prices, default: "Adj Close".
+        """
+        ret = self._calc_return(sell_date, price_column)
+        conversion_factor = np.timedelta64(365, 'D') / (self._to_dates(sell_date) - self.dates.values)
+        return pd.Series(ret * conversion_factor, index=self.dates)
+
+    def calc_pe_ratio(self, price_column="Adj Close", eps_column="EPS (Basic)"):
+        """ Returns a Series object of the P/E Ratio of the stock at the internal dates.
+            price_column: the column to get prices, default: "Adj Close".
+            eps_columm: the column to get EPS, default: "EPS (Basic)"
+        """
+        eps = self._get_report_values(self.income_statement_lagged, eps_column)
+        pps = self._get_prices(self.dates, price_column, "ffill")
+        return pd.Series(pps / eps, index=self.dates)
+
+    def calc_profit_margin(self, kind):
+        """ Returns a Series object of the Profit Margin of the stock at the internal dates.
+            kind: a string in PROFIT_MARGIN_KINDS
+        """
+        profit = self._get_report_values(self.income_statement_lagged, kind.title() + " Income")
+        revenue = self._get_report_values(self.income_statement_lagged, "Sales/Revenue")
+
+        return pd.Series(profit / revenue, index=self.dates)
+
+    def calc_debt_to_asset_ratio(self):
+        """ Returns a Series object of the Debt/Asset Ratio of the stock at the internal dates."""
+        debt_ratio = self._get_report_values(self.balance_sheet_lagged, "Total Liabilities / Total Assets")
+        return pd.Series(debt_ratio, index=self.dates)
+
+def join_as_of(frame, dates, symbols=None, lag=None):
+    """ Returns a DataFrame object of the latest row of <frame> known as of each of <dates>, i.e. the row with the greatest
+        Date at or before the date, all NaN if there is none, by merging instead of resampling <frame> daily.
+
+        frame: a DataFrame object indexed by Date, or by Symbol and Date as returned by load_fundamental_data_of_symbols
+        dates: a sequence of pd.Timestamp objects
+        symbols: a sequence of symbols, one for each of <dates>, required if <frame> is indexed by Symbol and Date
+        lag (np.timedelta64 object): added to Date of <frame> before joining,
+            e.g. financial_report_preparation_lag for financial reports. Default: None - no lag.
+
+        The result is indexed by <dates>, or by <symbols> and <dates>.
+    """
+    if symbols is None:
+        frame_dates, frame_symbols = frame.index, None
+        index = pd.DatetimeIndex(dates, name="Date")
+    else:
+        frame_dates, frame_symbols = frame.index.get_level_values("Date"), frame.index.get_level_values("Symbol")
+        index = pd.MultiIndex.from_arrays([list(symbols), pd.DatetimeIndex(dates)], names=["Symbol", "Date"])
+
+    if lag is not None:
+        frame_dates = frame_dates + lag
+
+    positions = asof_indexer(frame_dates, dates, frame_symbols, symbols)
+
+    # position -1 is not in the index, so it gets a row of NaN
+    joined = frame.reset_index(drop=True).reindex(positions)
+    joined.index = index
+    return joined
+
+def _lag_dates(df, lag):
+    """ Returns a copy of <df>, indexed by Symbol and Date, with <lag> added to Date """
+    df = df.copy()
+    df.index = pd.MultiIndex.from_arrays(
+        [df.index.get_level_values("Symbol"), df.index.get_level_values("Date") + lag],
+        names=["Symbol", "Date"]
+    )
+    return df
+
+def _calc_growth(series):
+    """ Returns the growth of each value of <series>, indexed by Symbol and Date and sorted,
+        from the previous value of the same symbol, NaN for the first value of a symbol.
+    """
+    values = series.values.astype(np.float64)
+    symbols = np.asarray(series.index.get_level_values("Symbol"))
+
+    growth = np.full(len(values), np.nan)
+    is_same_symbol = symbols[1:] == symbols[:-1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth[1:][is_same_symbol] = values[1:][is_same_symbol] / values[:-1][is_same_symbol] - 1
+
+    return pd.Series(growth, index=series.index)
+
+def calc_derived_metrics(historical, balance_sheet, income_statement,
+        financial_report_preparation_lag=np.timedelta64(30, 'D'), price_column="Adj Close", eps_column="EPS (Basic)"):
+    """ Returns a DataFrame object of the metrics of Metric at the release dates of the financial reports of many symbols
+        at once, indexed by Symbol and Date (date of report + <financial_report_preparation_lag>),
+        with the columns of DerivedMetric model:
+
+        P/E Ratio: as calc_pe_ratio
+        <Kind> Profit Margin: as calc_profit_margin for each kind in PROFIT_MARGIN_KINDS
+        Debt/Asset Ratio: as calc_debt_to_asset_ratio
+        Sales/Revenue Growth, EPS (Basic) Growth: growth from the previous income statement
+
+        historical, balance_sheet, income_statement: DataFrame objects of the symbols as returned by
+            load_fundamental_data_of_symbols.
+        price_column, eps_column: see calc_pe_ratio.
+    """
+    income_statement = _lag_dates(income_statement, financial_report_preparation_lag)
+    balance_sheet = _lag_dates(balance_sheet, financial_report_preparation_lag)
+
+    symbols = income_statement.index.get_level_values("Symbol")
+    dates = income_statement.index.get_level_values("Date")
+
+    # use fillforward here to avoid peeking into future, NaN after the last date with a price as in Metric
+    prices = join_as_of(historical[[price_column]], dates, symbols)[price_column].values
+    last_dates = pd.Series(historical.index.get_level_values("Date"), index=historical.index.get_level_values("Symbol"))
+    last_dates = last_dates.groupby(level=0).max().reindex(symbols).values
+    prices = np.where(dates.values < last_dates + np.timedelta64(1, 'D'), prices, np.nan)
+
+    metrics = pd.DataFrame({"P/E Ratio": prices / income_statement[eps_column].values}, index=income_statement.index)
+
+    for kind in PROFIT_MARGIN_KINDS:
+        metrics[kind.title() + " Profit Margin"] = income_statement[kind.title() + " Income"] / income_statement["Sales/Revenue"]
+
+    for column in ("Sales/Revenue", "EPS (Basic)"):
+        metrics[column + " Growth"] = _calc_growth(income_statement[column])
+
+    debt_to_asset_ratio = balance_sheet[["Total Liabilities / Total Assets"]]
+    debt_to_asset_ratio.columns = ["Debt/Asset Ratio"]
+
+    metrics = pd.concat([metrics, debt_to_asset_ratio], axis=1)
+    return metrics.reindex(columns=get_numerical_column_names("DerivedMetric")).replace([np.inf, -np.inf], np.nan)
+
+def _align(df, symbols):
+    """ Returns a DataFrame object indexed by Date with columns (column, symbol) for each column of <df> and each of <symbols>,
+        taken from <df>, a DataFrame object returned by load_fundamental_data_of_symbols,
+        and a 2-D boolean array (dates x symbols) telling which symbol has a row at which date.
+    """
+    columns = pd.MultiIndex.from_product([df.columns, symbols], names=[None, "Symbol"])
+    wide = df.unstack("Symbol").reindex(columns=columns)
+    wide.index = pd.DatetimeIndex(wide.index, name="Date")
+
+    present = pd.Series(True, index=df.index).unstack("Symbol").reindex(index=wide.index, columns=symbols)
+    return wide, present.notnull().values
+
+def _fill_rows(present, method):
+    """ Returns a 2-D array of the same shape as <present>, of the row position of the last row at or before ("ffill")
+        or the first row at or after ("bfill") each row, in which the symbol has a row, -1 if there is none.
+    """
+    rows = np.arange(len(present))[:, np.newaxis]
+
+    if method == "ffill":
+        return np.maximum.accumulate(np.where(present, rows, -1), axis=0)
+
+    filled = np.minimum.accumulate(np.where(present, rows, len(present))[::-1], axis=0)[::-1]
+    return np.where(filled < len(present), filled, -1)
+
+class UniverseMetric(object):
+    def __init__(self,
+            symbols,
+            historical=None,
+            balance_sheet=None,
+            income_statement=None,
+            cash_flow=None,
+            financial_report_preparation_lag=np.timedelta64(30, 'D')
+        ):
+        """ Returns an object that is capable of calculating various metrics of all <symbols> at once,
+            with the data of all symbols aligned in 2-D arrays (dates x symbols), so that each metric is calculated
+            for all symbols and dates in single vectorized operations.
+
+            symbols: e.g. ["C6L.SI", "J7X.SI"]
+            historical, balance_sheet, income_statement, cash_flow: respective DataFrame objects indexed by Symbol and Date,
+                as returned by load_fundamental_data_of_symbols, default: None
+            financial_report_preparation_lag (np.timedelta64 object):
+                how long does it take to release the financial report after the end of fiscal year?
+                default: 30 days.
+        """
+        self.symbols = pd.Index(symbols, name="Symbol")
+        self.financial_report_preparation_lag = financial_report_preparation_lag
+
+        if historical is not None:
+            self.historical, present = _align(historical, self.symbols)
+            self._filled_rows = {method: _fill_rows(present, method) for method in ("ffill", "bfill")}
+
+            # range of days of the data of each symbol, out of which prices are not filled in
+            days = self.historical.index.values.astype("datetime64[D]")
+            self._first_days = np.full(len(self.symbols), np.datetime64("NaT"), dtype="datetime64[ns]")
+            self._end_days = self._first_days.copy()
+
+            if len(days):
+                first_rows = self._filled_rows["bfill"][0]
+                last_rows = self._filled_rows["ffill"][-1]
+                has_data = first_rows >= 0
+                self._first_days[has_data] = days[first_rows[has_data]]
+                self._end_days[has_data] = days[last_rows[has_data]] + np.timedelta64(1, 'D')
+
+        # financial reports with the lag in information release factored in
+        if balance_sheet is not None:
+            self.balance_sheet_lagged = translate_index(_align(balance_sheet, self.symbols)[0], financial_report_preparation_lag)
+
+        if income_statement is not None:
+            self.income_statement_lagged = translate_index(_align(income_statement, self.symbols)[0], financial_report_preparation_lag)
+
+        if cash_flow is not None:
+            self.cash_flow_lagged = translate_index(_align(cash_flow, self.symbols)[0], financial_report_preparation_lag)
+
+    @classmethod
+    def from_archive(cls, symbols, *args, **kwargs):
+        """ Returns an object that is capable of calculating various metrics of all <symbols> at once,
+            with data of all symbols loaded from archive together, one query per data type.
+
+            symbols: e.g. ["C6L.SI", "J7X.SI"]
+            Any extra arguments will be passed on to the constructor.
+        """
+        kwargs.update({
+            "historical": load_fundamental_data_of_symbols("price", symbols),
+            "balance_sheet": load_fundamental_data_of_symbols("balance_sheet", symbols),
+            "income_statement": load_fundamental_data_of_symbols("income_statement", symbols),
+            "cash_flow": load_fundamental_data_of_symbols("cash_flow", symbols),
+        })
+
+        return cls(symbols, *args, **kwargs)
+
+    def _get_prices(self, dates, price_column, method):
+        """ Returns a 2-D array of prices in <price_column> of all symbols at <dates>, as if the historical data were
+            resampled daily and missing dates filled in by <method> ("ffill" or "bfill"),
+            NaN for dates out of the range of the data of the symbol.
+
+            dates: a 2-D array of dates broadcastable to (number of dates, number of symbols),
+                e.g. of shape (number of dates, 1) for the same dates for all symbols.
+        """
+        index = self.historical.index.values
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        dates, columns = np.broadcast_arrays(dates, np.arange(len(self.symbols)))
+        prices = np.full(dates.shape, np.nan)
+
+        if not len(index):
+            return prices
+
+        if method == "ffill":
+            rows = index.searchsorted(dates, side="right") - 1
+        else:
+            rows = index.searchsorted(dates, side="left")
+
+        in_index = (rows >= 0) & (rows < len(index))
+        positions = np.where(in_index, self._filled_rows[method][np.where(in_index, rows, 0), columns], -1)
+        found = (positions >= 0) & (dates >= self._first_days[columns]) & (dates < self._end_days[columns])
+
+        prices[found] = self.historical[price_column].values[positions[found], columns[found]]
+        return prices
+
+    def _to_symbol_dates(self, date):
+        """ Returns a 2-D array of dates of shape (1, number of symbols) from <date>,
+            a pd.Timestamp object for all symbols or a sequence of them, one for each symbol.
+        """
+        return np.broadcast_to(np.asarray(date, dtype="datetime64[ns]"), (1, len(self.symbols)))
+
+    def _calc_return(self, buy_date, sell_date, price_column):
+        # use fillbackward here because a market order is executed as soon as a price is available
+        buy_prices = self._get_prices(self._to_symbol_dates(buy_date), price_column, "bfill")[0]
+        sell_prices = self._get_prices(self._to_symbol_dates(sell_date), price_column, "bfill")[0]
+        return sell_prices / buy_prices - 1
+
+    def calc_return(self, buy_date, sell_date, price_column="Adj Close"):
+        """ Returns a Series object of the return of each stock if a buy market order is made on <buy_date>
+            and a sell market order is made on <sell_date>, NaN if there is no price.
+            buy_date, sell_date: pd.Timestamp object, or a sequence of them, one for each symbol
+            price_column: the column to get prices, default: "Adj Close".
+        """
+        return pd.Series(self._calc_return(buy_date, sell_date, price_column), index=self.symbols)
+
+    def calc_annual_return(self, buy_date, sell_date, price_column="Adj Close"):
+        """ Returns a Series object of the annualized return of each stock if a buy market order is made on <buy_date>
+            and a sell market order is made on <sell_date>, NaN if there is no price.
+            buy_date, sell_date: pd.Timestamp object, or a sequence of them, one for each symbol
+            price_column: the column to get prices, default: "Adj Close".
+        """
+        ret = self._calc_return(buy_date, sell_date, price_column)
+        holding_period = self._to_symbol_dates(sell_date)[0] - self._to_symbol_dates(buy_date)[0]
+        conversion_factor = np.timedelta64(365, 'D') / holding_period
+        return pd.Series(ret * conversion_factor, index=self.symbols)
+
+    def calc_pe_ratio(self, price_column="Adj Close", eps_column="EPS (Basic)"):
+        """ Returns a DataFrame object of the P/E Ratio of the stocks, indexed by Date with a column for each symbol.
+            price_column: the column to get prices, default: "Adj Close".
+            eps_columm: the column to get EPS, default: "EPS (Basic)"
+        """
+        eps = self.income_statement_lagged[eps_column]
+        # use fillforward here to avoid peeking into future
+        pps = self._get_prices(eps.index.values[:, np.newaxis], price_column, "ffill")
+        return pd.DataFrame(pps / eps.values, index=eps.index, columns=self.symbols)
+
+    def calc_profit_margin(self, kind):
+        """ Returns a DataFrame object of the Profit Margin of the stocks, indexed by Date with a column for each symbol.
+            kind: a string in PROFIT_MARGIN_KINDS
+        """
+        profit = self.income_statement_lagged[kind.title() + " Income"]
+        revenue = self.income_statement_lagged["Sales/Revenue"]
+
+        return profit / revenue
+
+    def calc_debt_to_asset_ratio(self):
+        """ Returns a DataFrame object of the Debt/Asset Ratio of the stocks, indexed by Date with a column for each symbol. """
+        return self.balance_sheet_lagged["Total Liabilities / Total Assets"]
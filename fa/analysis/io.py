@@ -1,25 +1,143 @@
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
-from fa.database.models import get_numerical_column_names
-from fa.database.query import get_fundamentals
+from fa.database.models import get_numerical_column_names, get_Model
+from fa.database.query import get_fundamentals, get_fundamentals_array, get_fundamentals_narrow, get_fundamentals_of_symbols, get_column_dtype, \
+    iter_fundamentals_arrays, get_fundamentals_as_of
+from fa.database.columnar import store as columnar_store
 from fa.util import to_pythonic_name
 
 
-def load_fundamental_data(data_type, symbol, columns=None):
+def _get_columns(data_type, columns):
+    if columns is None:
+        model_name = data_type.replace('_', '')
+        columns = get_numerical_column_names(model_name)
+
+    return ["Date"] + list(columns)
+
+def _load_columnar_data(data_type, symbol, columns, field_names):
+    if not columnar_store.is_tracking(data_type):
+        raise ValueError("{0} data is not kept in columnar store.".format(data_type))
+
+    # e.g. the last update failed before it was written to the store
+    if columnar_store.is_stale(data_type, symbol):
+        return _load_array_data(data_type, symbol, columns, field_names)
+
+    arrays = columnar_store.read(data_type, symbol, field_names)
+
+    if arrays is None:
+        return pd.DataFrame([], columns=columns).set_index("Date")
+
+    index = pd.DatetimeIndex(arrays[0], name="Date")
+    return pd.DataFrame(dict(zip(columns[1:], arrays[1:])), index=index, columns=columns[1:])
+
+def _load_array_data(data_type, symbol, columns, field_names):
+    dates, values = get_fundamentals_array(data_type, symbol, field_names[1:])
+    return _array_to_frame(data_type, dates, values, columns, field_names)
+
+def _array_to_frame(data_type, dates, values, columns, field_names):
+    df = pd.DataFrame(values, index=pd.DatetimeIndex(dates, name="Date"), columns=columns[1:])
+
+    # e.g. volume
+    Model = get_Model(data_type)
+    for column, field_name in zip(columns[1:], field_names[1:]):
+        dtype = get_column_dtype(getattr(Model, field_name))
+        if dtype != np.float64:
+            df[column] = df[column].astype(dtype)
+
+    return df
+
+def _load_narrow_data(data_type, symbol, columns, field_names):
+    records = list(get_fundamentals_narrow(data_type, symbol, field_names[1:]))
+    return pd.DataFrame.from_records(records, columns=columns, index="Date")
+
+def load_fundamental_data(data_type, symbol, columns=None, storage="database", fast=False):
     """ Returns a DataFrame object containing <data_type> fundamental data of <symbol> with <columns>.
 
         data_type: name of *_updated_at fields in Symbol model without _updated_at
         symbol: e.g. 'C6L.SI'
         columns: a sequence of column names as defined in fa.database.*_numerical_columns modules.
             Default: None - include all.
+        storage: where to load the data from, "database", "narrow" (narrow table of financial report values in database,
+            which <data_type> data must have been migrated to, only dates with any value of <columns> are included)
+            or "columnar" (fa.database.columnar.store, which must be keeping <data_type> data, read from database
+            while marked stale). The columns are read from memory maps without parsing, but copied into the DataFrame:
+            use fa.database.columnar.store.read for arrays that are not copied. Default: "database".
+        fast: whether to load from database through the sqlite3 cursor into typed arrays,
+            without creating Python objects for every value. Default: False.
     """
-    if columns is None:
-        model_name = data_type.replace('_', '')
-        columns = get_numerical_column_names(model_name)
+    columns = _get_columns(data_type, columns)
+    field_names = [to_pythonic_name(c) for c in columns]
 
-    columns = ["Date"] + list(columns)
+    if storage == "columnar":
+        return _load_columnar_data(data_type, symbol, columns, field_names)
+    elif storage == "narrow":
+        return _load_narrow_data(data_type, symbol, columns, field_names)
+    elif fast:
+        return _load_array_data(data_type, symbol, columns, field_names)
 
-    field_names = [to_pythonic_name(c) for c in columns]
     records = list(get_fundamentals(data_type, symbol, field_names))
 
     return pd.DataFrame.from_records(records, columns=columns, index="Date")
+
+def iter_fundamental_data(data_type, symbol, columns=None, chunk_size=65536):
+    """ Yields DataFrame objects of consecutive chunks of <chunk_size> rows of <data_type> fundamental data of <symbol>
+        with <columns>, loaded as by load_fundamental_data with fast=True, so that a series longer than memory
+        can be processed chunk by chunk.
+
+        data_type, symbol, columns: see load_fundamental_data
+    """
+    columns = _get_columns(data_type, columns)
+    field_names = [to_pythonic_name(c) for c in columns]
+
+    for dates, values in iter_fundamentals_arrays(data_type, symbol, field_names[1:], chunk_size):
+        yield _array_to_frame(data_type, dates, values, columns, field_names)
+
+def load_fundamental_data_of_symbols(data_type, symbols, columns=None):
+    """ Returns a DataFrame object containing <data_type> fundamental data of all <symbols> with <columns>,
+        indexed by Symbol and Date, loaded with one query (per 999 symbols).
+        The data of one symbol is df.loc[symbol], see also split_by_symbol.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+        symbols: a sequence of symbols e.g. ['C6L.SI', 'J7X.SI']
+        columns: a sequence of column names as defined in fa.database.*_numerical_columns modules.
+            Default: None - include all.
+    """
+    columns = _get_columns(data_type, columns)
+    field_names = [to_pythonic_name(c) for c in columns]
+    records = list(get_fundamentals_of_symbols(data_type, symbols, field_names))
+
+    if not records:
+        # from_records would not build the index of levels out of no records
+        index = pd.MultiIndex.from_arrays([pd.Index([], dtype=object), pd.DatetimeIndex([])], names=["Symbol", "Date"])
+        return pd.DataFrame(index=index, columns=columns[1:], dtype=np.float64)
+
+    return pd.DataFrame.from_records(records, columns=["Symbol"] + columns, index=["Symbol", "Date"])
+
+def load_fundamental_data_as_of(data_type, date, columns=None, symbols=None):
+    """ Returns a DataFrame object indexed by Symbol, containing the latest <data_type> fundamental data at or before
+        <date> of every symbol (or of <symbols>) with Date and <columns>, e.g. for screening stocks by derived metrics.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at, or "derived_metric"
+        date: datetime object
+        columns: a sequence of column names as defined in fa.database.*_numerical_columns modules.
+            Default: None - include all.
+        symbols: a sequence of symbols e.g. ['C6L.SI', 'J7X.SI'], default: None - all symbols.
+    """
+    columns = _get_columns(data_type, columns)
+    field_names = [to_pythonic_name(c) for c in columns]
+    records = list(get_fundamentals_as_of(data_type, date, field_names, symbols))
+
+    return pd.DataFrame.from_records(records, columns=["Symbol"] + columns, index="Symbol")
+
+def split_by_symbol(df, symbols):
+    """ Returns {symbol: DataFrame object indexed by Date} for each of <symbols>, taken from <df>,
+        a DataFrame object returned by load_fundamental_data_of_symbols.
+        A symbol without data gets an empty DataFrame object.
+    """
+    frames = {symbol: frame.reset_index(level="Symbol", drop=True) for symbol, frame in df.groupby(level="Symbol")}
+    empty_frame = df.iloc[:0].reset_index(level="Symbol", drop=True)
+
+    return OrderedDict((symbol, frames.get(symbol, empty_frame)) for symbol in symbols)
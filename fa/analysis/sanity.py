@@ -1,7 +1,8 @@
 import numpy as np
-from pandas.tseries.index import DatetimeIndex
+import pandas as pd
+from pandas import DatetimeIndex
 
-from fa.calculator import backward_delta, derivative, get_deviations
+from fa.calculator import backward_delta, derivative, get_deviations, get_rolling_deviations, get_robust_deviations
 
 
 def check_for_missing_date(frame, tolerance):
@@ -25,13 +26,18 @@ def is_outlier(frame, tolerance):
     """
     return np.abs(get_deviations(frame)) > tolerance
 
-def check_for_discontinuity(df, tolerance):
-    """ Returns a DataFrame object containing only rows and columns with values of <df>
-        at which there is an outlier first-order partial derivative along row axis.
-        Normal values are set to NaN.
-
-        tolerance: used in outlier test for first-order derivative, how many sigmas?
+def is_rolling_outlier(frame, tolerance, window, robust=False):
+    """ Tests whether each value of <frame> deviates from the <window> values before it in the column
+        by more than <tolerance> * sigma, so that a value is judged against recent values only.
+        frame: Series or DataFrame object
+        robust: whether to measure the deviation from the median in scaled MADs instead of from the mean in sigmas,
+            so that one bad value does not hide the next, at a cost growing with <window> (see get_robust_deviations).
+            Default: False.
     """
+    deviations = get_robust_deviations(frame, window) if robust else get_rolling_deviations(frame, window)
+    return np.abs(deviations) > tolerance
+
+def _get_derivative(df):
     if isinstance(df.index, DatetimeIndex):
         # doesn't matter what value, this is just for allowing the division to occur
         # result of is_outlier does not depend on index_unit
@@ -39,5 +45,148 @@ def check_for_discontinuity(df, tolerance):
     else:
         index_unit = 1
 
-    der = derivative(df, index_unit)
+    return derivative(df, index_unit)
+
+def check_for_discontinuity(df, tolerance):
+    """ Returns a DataFrame object containing only rows and columns with values of <df>
+        at which there is an outlier first-order partial derivative along row axis.
+        Normal values are set to NaN.
+
+        tolerance: used in outlier test for first-order derivative, how many sigmas?
+    """
+    der = _get_derivative(df)
     return df[is_outlier(der, tolerance)].dropna(axis=0, how="all").dropna(axis=1, how="all")
+
+def check_for_rolling_discontinuity(df, tolerance, window, robust=False):
+    """ check_for_discontinuity with the outlier test of each first-order derivative done against
+        the <window> derivatives before it, see is_rolling_outlier.
+    """
+    der = _get_derivative(df)
+    return df[is_rolling_outlier(der, tolerance, window, robust)].dropna(axis=0, how="all").dropna(axis=1, how="all")
+
+def _iter_with_history(frames, no_of_rows):
+    """ Yields (frame, n) for each of <frames>, consecutive chunks of a series, with up to <no_of_rows> last rows of
+        the chunks before prepended to it, n being the number of rows prepended.
+    """
+    history = None
+
+    for frame in frames:
+        n = 0 if history is None else len(history)
+
+        if n:
+            frame = pd.concat([history, frame])
+
+        history = frame.iloc[-no_of_rows:]
+        yield frame, n
+
+def iter_rolling_outliers(frames, tolerance, window, robust=False):
+    """ is_rolling_outlier on a series longer than memory: yields the outlier test of each of <frames>,
+        consecutive chunks of the series (e.g. from fa.analysis.io.iter_fundamental_data),
+        with the windows spanning the chunks.
+    """
+    for frame, n in _iter_with_history(frames, window):
+        yield is_rolling_outlier(frame, tolerance, window, robust).iloc[n:]
+
+def iter_rolling_discontinuities(frames, tolerance, window, robust=False):
+    """ check_for_rolling_discontinuity on a series longer than memory: yields its result for each of <frames>,
+        consecutive chunks of the series (e.g. from fa.analysis.io.iter_fundamental_data),
+        with the windows spanning the chunks.
+        The derivative at the last row of a chunk needs the next chunk, so its result comes with the next chunk.
+    """
+    for frame, n in _iter_with_history(frames, window + 1):
+        result = check_for_rolling_discontinuity(frame, tolerance, window, robust)
+
+        # rows before the last row of the previous chunk have been checked with the previous chunk
+        yield result[result.index >= frame.index[n - 1]] if n else result
+
+#------------------------------
+# the checks above, vectorized across symbols, on a DataFrame object indexed by Symbol and Date
+# sorted by symbol and date (see fa.analysis.io.load_fundamental_data_of_symbols)
+#------------------------------
+
+FINDING_COLUMNS = ["Symbol", "Date", "Column"]
+
+def _get_group_codes(df):
+    """ Returns an integer array numbering the symbol of each row of <df>, 0 for the first symbol, 1 for the next... """
+    symbols = np.asarray(df.index.get_level_values("Symbol"))
+    return np.concatenate([[0], np.cumsum(symbols[1:] != symbols[:-1])]) if len(symbols) else np.zeros(0, dtype=int)
+
+def _get_group_deviations(values, codes):
+    """ Returns how many sigmas does each value of 2-D array <values> deviate from the mean of its column
+        among the rows of the same group, as numbered by <codes> (the rows of a group being contiguous). NaNs are ignored.
+    """
+    if not len(values):
+        return np.empty_like(values)
+
+    # positions of the first rows of groups, and the group of each row by that numbering
+    starts = np.flatnonzero(np.concatenate([[True], codes[1:] != codes[:-1]]))
+    groups = np.cumsum(np.concatenate([[False], codes[1:] != codes[:-1]]))
+
+    is_valid = ~np.isnan(values)
+
+    # groups of less than 2 values get NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        counts = np.add.reduceat(is_valid.astype(float), starts, axis=0)
+        means = np.add.reduceat(np.where(is_valid, values, 0), starts, axis=0) / counts
+        errors = values - means[groups]
+        stds = np.sqrt(np.add.reduceat(np.where(is_valid, errors ** 2, 0), starts, axis=0) / (counts - 1))
+
+        return errors / stds[groups]
+
+def _to_findings(df, rows, cols=None):
+    """ Returns a DataFrame object of findings at positions <rows> (and <cols>, None if the finding is of a whole row) of <df> """
+    symbols = np.asarray(df.index.get_level_values("Symbol"))[rows]
+
+    # an object array of None: a scalar None would be broadcast as NaN by some pandas versions
+    return pd.DataFrame({
+        "Symbol": symbols,
+        "Date": np.asarray(df.index.get_level_values("Date"))[rows],
+        "Column": df.columns.values[cols] if cols is not None else np.full(len(symbols), None, dtype=object),
+    }, columns=FINDING_COLUMNS)
+
+def find_missing_dates(df, tolerance):
+    """ check_for_missing_date across symbols, returns findings (Symbol, Date, Column) where the diff of Date with
+        previous date of the same symbol is greater than <tolerance>, a numpy.timedelta64 object. Column is None.
+    """
+    dates = np.asarray(df.index.get_level_values("Date"), dtype="datetime64[ns]")
+    codes = _get_group_codes(df)
+
+    is_gap = (codes[1:] == codes[:-1]) & (np.diff(dates) > tolerance)
+    return _to_findings(df, np.flatnonzero(is_gap) + 1)
+
+def find_missing_values(df):
+    """ check_for_missing_value across symbols, returns findings (Symbol, Date, Column) of missing values. """
+    rows, cols = np.nonzero(np.isnan(df.values.astype(float)))
+    return _to_findings(df, rows, cols)
+
+def find_outliers(df, tolerance):
+    """ is_outlier across symbols, returns findings (Symbol, Date, Column) of values that deviate from the mean of
+        the column of the same symbol by more than <tolerance> * sigma.
+    """
+    deviations = _get_group_deviations(df.values.astype(float), _get_group_codes(df))
+    rows, cols = np.nonzero(np.abs(deviations) > tolerance)
+
+    return _to_findings(df, rows, cols)
+
+def find_discontinuities(df, tolerance):
+    """ check_for_discontinuity across symbols, returns findings (Symbol, Date, Column) of values at which
+        the first-order derivative along Date, to the next date of the same symbol, is an outlier among
+        the derivatives of the same symbol.
+
+        tolerance: used in outlier test for first-order derivative, how many sigmas?
+    """
+    values = df.values.astype(float)
+    dates = np.asarray(df.index.get_level_values("Date"), dtype="datetime64[ns]")
+    codes = _get_group_codes(df)
+
+    # rows having a next date of the same symbol, as the index of the derivative in check_for_discontinuity
+    rows = np.flatnonzero(codes[1:] == codes[:-1])
+    # doesn't matter what unit, result of outlier test does not depend on it
+    delta_index = (dates[rows + 1] - dates[rows]) / np.timedelta64(365, 'D')
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        der = (values[rows + 1] - values[rows]) / delta_index[:, np.newaxis]
+    der[~np.isfinite(der)] = np.nan
+
+    der_rows, cols = np.nonzero(np.abs(_get_group_deviations(der, codes[rows])) > tolerance)
+    return _to_findings(df, rows[der_rows], cols)
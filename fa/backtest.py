@@ -0,0 +1,197 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from fa.analysis.io import load_fundamental_data_of_symbols
+from fa.calculator import asof_indexer, fill_indexer
+
+
+# results of run_backtest, for each strategy and symbol:
+# amount_invested: total amount invested, in dates with a price only
+# units_bought: total units bought
+# average_hold_period: average number of years the amounts are held until sold, weighted by amount
+# dividend_payout: total dividends received, not reinvested
+# capital_gain: value of units bought when sold, less amount invested
+# total_return: capital gain and dividends per amount invested
+# annual_return: average annual return of the purchases (of every date with an amount invested)
+BacktestResult = namedtuple("BacktestResult", [
+    "amount_invested",
+    "units_bought",
+    "average_hold_period",
+    "dividend_payout",
+    "capital_gain",
+    "total_return",
+    "annual_return",
+])
+
+def load_prices(symbols, column="Close"):
+    """ Returns a DataFrame object indexed by Date with <column> of price data of <symbols> (columns), loaded from
+        archive with one query, NaN at dates at which a symbol has no price.
+    """
+    df = load_fundamental_data_of_symbols("price", symbols, [column])
+    prices = df[column].unstack("Symbol").reindex(columns=symbols)
+    prices.index = pd.DatetimeIndex(prices.index, name="Date")
+    return prices
+
+def calc_future_returns(prices, no_of_days):
+    """ Returns a DataFrame object of the same shape as <prices>, of the return after <no_of_days> days
+        if one bought at respective prices at respective dates. The price sold at is the last price at or before
+        the sell date. NaN if the sell date is after the last date.
+
+        prices: DataFrame object indexed by Date, one column per symbol, e.g. from load_prices
+    """
+    sell_dates = prices.index + pd.offsets.Day(no_of_days)
+    rows = fill_indexer(prices.index, sell_dates, "ffill")
+
+    future_prices = np.where(rows[:, np.newaxis] >= 0, prices.values[rows], np.nan)
+    return pd.DataFrame(future_prices, index=prices.index, columns=prices.columns) / prices - 1
+
+def _get_sell_prices(prices, sell_row):
+    """ Returns the last price at or before row <sell_row> of 2-D array <prices> (dates x symbols) of each symbol """
+    rows = np.where(np.isnan(prices[: sell_row + 1]), -1, np.arange(sell_row + 1)[:, np.newaxis])
+    last_rows = rows.max(axis=0)
+    return np.where(last_rows >= 0, prices[last_rows, np.arange(prices.shape[1])], np.nan)
+
+def run_backtest(prices, amounts, sell_date=None, distribution_yield=0, strategies=None):
+    """ Returns a BacktestResult of buying a symbol with an amount at every date and selling all at <sell_date>,
+        of every strategy (a set of amounts) and every symbol, computed at once.
+
+        prices: DataFrame object indexed by Date, one column per symbol, e.g. from load_prices.
+        amounts: amounts to invest (the allocation signal) in each symbol at each date, e.g. 1 for every date
+            (dollar cost averaging), a number or an array broadcastable to the shape of <prices>, e.g. one amount
+            per date of shape (dates, 1), or of shape (strategies, dates, symbols) to run many strategies.
+            Amounts at dates without a price or after <sell_date> are not invested.
+        sell_date: default: None - the last date of <prices>. A symbol is sold at its last price at or before it.
+            ValueError is raised if it is before the first date of <prices>.
+        distribution_yield: average annual dividends per $ share price, a number or one per symbol.
+        strategies: labels of the strategies of 3-D <amounts>, e.g. the parameters they are generated with.
+
+        Each field of the result is a Series object indexed by symbol for 2-D <amounts>,
+        or a DataFrame object of strategies (rows) and symbols (columns) for 3-D <amounts>.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    is_single_strategy = amounts.ndim <= 2
+    if is_single_strategy:
+        amounts = np.broadcast_to(amounts, prices.shape)[np.newaxis]
+
+    sell_date = prices.index[-1] if sell_date is None else pd.Timestamp(sell_date)
+    sell_row = prices.index.searchsorted(sell_date, side="right") - 1
+    if sell_row < 0:
+        raise ValueError("sell date {0} is before the first date of prices".format(sell_date))
+
+    values = prices.values.astype(np.float64)
+    sell_prices = _get_sell_prices(values, sell_row)
+    hold_periods = (np.datetime64(sell_date.value, "ns") - prices.index.values) / np.timedelta64(365, 'D')
+
+    # purchases that count, at dates with prices on or before sell date
+    is_valid = ~np.isnan(values) & (hold_periods >= 0)[:, np.newaxis]
+    hold_periods = np.where(is_valid, hold_periods[:, np.newaxis], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        units_per_amount = np.where(is_valid, 1 / values, 0)
+
+        # annual return of a purchase, not defined if bought on sell date
+        annual_returns = (units_per_amount * sell_prices + hold_periods * distribution_yield - 1) / hold_periods
+        annual_returns = np.where(hold_periods > 0, annual_returns, 0)
+
+    # sums over dates of amounts times per-amount quantities, all in one pass over the (strategies x dates x symbols) array
+    amount_invested, units_bought, amount_held = np.einsum(
+        "sdn,kdn->ksn", amounts, np.array([is_valid, units_per_amount, hold_periods], dtype=np.float64)
+    )
+    no_of_purchases, annual_return_sum = np.einsum(
+        "sdn,kdn->ksn", amounts != 0, np.array([hold_periods > 0, annual_returns], dtype=np.float64),
+        dtype=np.float64, casting="unsafe"
+    )
+
+    dividend_payout = amount_held * distribution_yield
+    capital_gain = units_bought * sell_prices - amount_invested
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fields = [
+            amount_invested,
+            units_bought,
+            amount_held / amount_invested,
+            dividend_payout,
+            capital_gain,
+            (capital_gain + dividend_payout) / amount_invested,
+            annual_return_sum / no_of_purchases,
+        ]
+
+    if is_single_strategy:
+        return BacktestResult(*[pd.Series(f[0], index=prices.columns) for f in fields])
+
+    return BacktestResult(*[pd.DataFrame(f, index=strategies, columns=prices.columns) for f in fields])
+
+#------------------------------
+# studies of strategies to be run by fa.sweep.run_sweep, on arrays from to_arrays
+#------------------------------
+
+def to_arrays(prices, income_statement=None, eps_column="EPS (Basic)"):
+    """ Returns {name: numpy array} of data for the studies below, to be shared by fa.sweep.run_sweep.
+
+        prices: DataFrame object indexed by Date, one column per symbol, e.g. from load_prices.
+        income_statement: income statements of the symbols as returned by load_fundamental_data_of_symbols,
+            needed by study_pe_ratio only. Default: None.
+        eps_column: the column of <income_statement> to get EPS, default: "EPS (Basic)".
+    """
+    arrays = {
+        "dates": prices.index.values,
+        "symbols": np.array(prices.columns, dtype=str),
+        "prices": prices.values.astype(np.float64),
+    }
+
+    if income_statement is not None:
+        symbols = income_statement.index.get_level_values("Symbol")
+        arrays.update({
+            "report_dates": np.asarray(income_statement.index.get_level_values("Date"), dtype="datetime64[ns]"),
+            "report_symbols": pd.Index(prices.columns).get_indexer(symbols),
+            "eps": income_statement[eps_column].values.astype(np.float64),
+        })
+
+    return arrays
+
+def _to_prices(arrays):
+    return pd.DataFrame(arrays["prices"], index=pd.DatetimeIndex(arrays["dates"], name="Date"), columns=arrays["symbols"])
+
+def _to_study_result(result):
+    """ Returns a DataFrame object indexed by Symbol with a column for each field of BacktestResult <result> """
+    df = pd.DataFrame(result._asdict(), columns=BacktestResult._fields)
+    df.index.name = "Symbol"
+    return df
+
+def study_valuation(arrays, valuation_threshold=0.10, distribution_yield=0, horizon=365):
+    """ Studies investing 1 at every date at which the return in <horizon> days is at least <valuation_threshold>,
+        i.e. the stock is under-valued, known only with hindsight, and selling everything at the last date.
+        Returns the BacktestResult of each symbol as a DataFrame object indexed by Symbol.
+    """
+    prices = _to_prices(arrays)
+
+    with np.errstate(invalid="ignore"):
+        amounts = calc_future_returns(prices, horizon).values >= valuation_threshold
+
+    return _to_study_result(run_backtest(prices, amounts, distribution_yield=distribution_yield))
+
+def study_pe_ratio(arrays, pe_threshold=15, distribution_yield=0, financial_report_preparation_lag=np.timedelta64(30, 'D')):
+    """ Studies investing 1 at every date at which the P/E ratio, with EPS of the latest income statement available
+        <financial_report_preparation_lag> after its date, is positive and at most <pe_threshold>,
+        and selling everything at the last date.
+        Returns the BacktestResult of each symbol as a DataFrame object indexed by Symbol.
+    """
+    prices = _to_prices(arrays)
+    no_of_dates, no_of_symbols = prices.shape
+
+    # the latest EPS known at every date of every symbol
+    positions = asof_indexer(
+        arrays["report_dates"] + financial_report_preparation_lag,
+        np.repeat(arrays["dates"], no_of_symbols),
+        arrays["report_symbols"],
+        np.tile(np.arange(no_of_symbols), no_of_dates)
+    )
+    eps = np.where(positions >= 0, arrays["eps"][positions], np.nan).reshape(no_of_dates, no_of_symbols)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pe_ratios = prices.values / eps
+        amounts = (pe_ratios > 0) & (pe_ratios <= pe_threshold)
+
+    return _to_study_result(run_backtest(prices, amounts, distribution_yield=distribution_yield))
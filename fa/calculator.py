@@ -1,3 +1,9 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
 def delta(frame):
     """ Returns deltas (diff with next value) of frame.
 
@@ -41,3 +47,161 @@ def translate_index(df, delta):
 def get_deviations(frame):
     """ Returns how many sigmas does each value deviate from the mean of the column """
     return (frame - frame.mean()) / frame.std()
+
+def _to_2d_array(frame):
+    values = np.asarray(frame, dtype=np.float64)
+    return values.reshape(len(values), -1)
+
+def _like(frame, values):
+    """ wraps 2-D array <values> in an NDFrame object like <frame> """
+    if isinstance(frame, pd.Series):
+        return pd.Series(values[:, 0], index=frame.index, name=frame.name)
+
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns)
+
+def get_rolling_deviations(frame, window, min_periods=2):
+    """ Returns how many sigmas does each value deviate from the mean of the <window> values before it in the column,
+        NaN if there are less than <min_periods> of them. NaNs are ignored.
+
+        The sums over the windows are differences of cumulative sums, so that it runs in O(n) whatever the window size.
+
+        >>> get_rolling_deviations(pd.Series([1, 3, 1, 3, 9]), 3)
+        0         NaN
+        1         NaN
+        2   -0.707107
+        3    1.154701
+        4    5.773503
+        dtype: float64
+    """
+    values = _to_2d_array(frame)
+    is_valid = ~np.isnan(values)
+
+    # values are centered for precision of the sums of squares
+    counts = is_valid.sum(axis=0)
+    centered = values - np.where(is_valid, values, 0).sum(axis=0) / np.maximum(counts, 1)
+    valid_centered = np.where(is_valid, centered, 0)
+
+    def window_sums(x):
+        """ sums of the window of rows before each row of <x> """
+        cumsums = np.concatenate([np.zeros((1, x.shape[1])), np.cumsum(x, axis=0)])
+        return cumsums[:-1] - cumsums[np.maximum(np.arange(len(x)) - window, 0)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        window_counts = window_sums(is_valid.astype(np.float64))
+        means = window_sums(valid_centered) / window_counts
+        variances = (window_sums(valid_centered ** 2) - window_counts * means ** 2) / (window_counts - 1)
+        deviations = (centered - means) / np.sqrt(np.maximum(variances, 0))
+
+    deviations[window_counts < min_periods] = np.nan
+    return _like(frame, deviations)
+
+def _get_windows(column, window):
+    """ Returns a read-only 2-D view of 1-D array <column>, row i being the <window> values before column[i], NaN-padded """
+    padded = np.concatenate([np.full(window, np.nan), column])
+    return np.lib.stride_tricks.as_strided(padded, shape=(len(column), window), strides=padded.strides * 2, writeable=False)
+
+def get_robust_deviations(frame, window, min_periods=2, block_size=65536):
+    """ Returns how many scaled MADs (median absolute deviations, scaled to sigmas of normal distribution)
+        does each value deviate from the median of the <window> values before it in the column,
+        NaN if there are less than <min_periods> of them. NaNs are ignored.
+        Where the MAD is 0 (e.g. price not changing on most days), the scaled mean absolute deviation is used instead.
+
+        The median and MAD of every window are taken over all its values, so that it runs in O(n * window),
+        unlike get_rolling_deviations. The windows are strided views of the column, taken <block_size> rows at a time
+        to bound the memory used.
+
+        >>> get_robust_deviations(pd.Series([1, 3, 1, 3, 9]), 3)
+        0         NaN
+        1         NaN
+        2   -0.674491
+        3    2.393681
+        4    7.181042
+        dtype: float64
+    """
+    values = _to_2d_array(frame)
+    deviations = np.full(values.shape, np.nan)
+
+    for j in range(values.shape[1]):
+        windows = _get_windows(values[:, j], window)
+
+        for start in range(0, len(windows), block_size):
+            block = windows[start : start + block_size]
+            column = values[start : start + block_size, j]
+
+            with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+                warnings.simplefilter("ignore", RuntimeWarning)   # windows of NaNs only
+
+                medians = np.nanmedian(block, axis=1)
+                abs_deviations = np.abs(block - medians[:, np.newaxis])
+                mads = 1.4826 * np.nanmedian(abs_deviations, axis=1)
+                mads = np.where(mads == 0, 1.2533 * np.nanmean(abs_deviations, axis=1), mads)
+
+                block_deviations = (column - medians) / mads
+
+            block_deviations[(~np.isnan(block)).sum(axis=1) < min_periods] = np.nan
+            deviations[start : start + block_size, j] = block_deviations
+
+    return _like(frame, deviations)
+
+def fill_indexer(index, dates, method="ffill"):
+    """ Returns positions in sorted DatetimeIndex <index> of the values that would be found at <dates>
+        if the data were resampled daily and missing dates filled in by <method>,
+        without resampling: "ffill" takes the last value at or before the date, "bfill" the first value at or after it.
+        Positions of dates outside the resampled range are -1.
+
+        >>> fill_indexer(pd.to_datetime(["2012-01-01", "2012-01-03"]), pd.to_datetime(["2012-01-02", "2012-01-05"]))
+        array([ 0, -1])
+    """
+    index = np.asarray(index, dtype="datetime64[ns]")
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+
+    if method == "ffill":
+        positions = index.searchsorted(dates, side="right") - 1
+    elif method == "bfill":
+        positions = index.searchsorted(dates, side="left")
+    else:
+        raise ValueError("Unknown fill method: {0}".format(method))
+
+    if len(index):
+        first_day = index[0].astype("datetime64[D]")
+        end_day = index[-1].astype("datetime64[D]") + np.timedelta64(1, 'D')
+        positions[(dates < first_day) | (dates >= end_day)] = -1
+    else:
+        positions[:] = -1
+
+    return positions
+
+def asof_indexer(index, dates, index_groups=None, date_groups=None):
+    """ Returns positions in <index> of the latest entry at or before each of <dates>, within the same group, -1 if none,
+        by merging the two sorted sequences in one pass, so that no entry needs to be looked up date by date.
+
+        index, dates: sequences of dates, <index> need not be sorted.
+        index_groups, date_groups: optional sequences of group labels (e.g. symbols) of the entries of <index>
+            and of <dates>, an entry is only matched with dates of the same group.
+
+        >>> asof_indexer(pd.to_datetime(["2012-01-01", "2012-01-03"]), pd.to_datetime(["2011-12-31", "2012-01-02", "2012-01-03"]))
+        array([-1,  0,  1])
+    """
+    index = np.asarray(index, dtype="datetime64[ns]")
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    no_of_entries = len(index)
+
+    if index_groups is None or date_groups is None:
+        groups = np.zeros(no_of_entries + len(dates), dtype=int)
+    else:
+        groups = pd.factorize(np.concatenate([np.asarray(index_groups, dtype=object), np.asarray(date_groups, dtype=object)]))[0]
+
+    all_dates = np.concatenate([index, dates])
+    is_date = np.arange(len(all_dates)) >= no_of_entries
+
+    # entries come before dates at the same time, so that an entry is known at its own date
+    order = np.lexsort((is_date, all_dates, groups))
+
+    sorted_positions = np.arange(len(order))
+    last_entries = np.maximum.accumulate(np.where(is_date[order], -1, sorted_positions))
+    found = (last_entries >= 0) & (groups[order][np.maximum(last_entries, 0)] == groups[order])
+
+    positions = np.empty(len(dates), dtype=int)
+    sorted_dates = is_date[order]
+    positions[order[sorted_dates] - no_of_entries] = np.where(found, order[np.maximum(last_entries, 0)], -1)[sorted_dates]
+    return positions
@@ -0,0 +1,112 @@
+import os
+import os.path
+import shutil
+
+import numpy as np
+
+
+READ_ATTEMPTS = 3
+
+class ColumnarStore(object):
+    def __init__(self, path, data_types=("price",)):
+        """ Returns a store of fundamental data kept column by column, in one .npy file per column per symbol,
+            under directory <path>/<data_type>/<symbol>/. The files are memory-mapped when read, so that the values
+            are not parsed or copied until they are used.
+
+            path: root directory of the store, None if it is to be specified at runtime by calling init.
+            data_types: names of *_updated_at fields in Symbol model without _updated_at, of which data is kept.
+        """
+        self.init(path, data_types)
+
+    def init(self, path, data_types=("price",)):
+        self.path = path
+        self.data_types = tuple(data_types)
+
+    def is_tracking(self, data_type):
+        """ whether <data_type> data is kept in the store """
+        return self.path is not None and data_type in self.data_types
+
+    def _get_symbol_dir(self, data_type, symbol):
+        return os.path.join(self.path, data_type, symbol)
+
+    def write(self, data_type, symbol, columns):
+        """ Replaces all <data_type> data of <symbol> with <columns>.
+            columns: {field name: array}
+        """
+        symbol_dir = self._get_symbol_dir(data_type, symbol)
+        new_dir = symbol_dir + ".new"
+        old_dir = symbol_dir + ".old"
+
+        for d in (new_dir, old_dir):
+            shutil.rmtree(d, ignore_errors=True)
+
+        os.makedirs(new_dir)
+        for field_name, values in columns.items():
+            np.save(os.path.join(new_dir, field_name + ".npy"), values)
+
+        # swap in the new directory, so that a reader never sees columns of different versions:
+        # between the renames, read finds the columns in the old directory
+        if os.path.exists(symbol_dir):
+            os.rename(symbol_dir, old_dir)
+        os.rename(new_dir, symbol_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def delete(self, data_type, symbol):
+        """ Deletes all <data_type> data of <symbol>. """
+        shutil.rmtree(self._get_symbol_dir(data_type, symbol), ignore_errors=True)
+
+    def mark_stale(self, data_type, symbol):
+        """ Marks <data_type> data of <symbol> in the store as behind the database, until clear_stale is called. """
+        stale_path = self._get_symbol_dir(data_type, symbol) + ".stale"
+        os.makedirs(os.path.dirname(stale_path), exist_ok=True)
+        open(stale_path, "w").close()
+
+    def clear_stale(self, data_type, symbol):
+        try:
+            os.remove(self._get_symbol_dir(data_type, symbol) + ".stale")
+        except FileNotFoundError:
+            pass
+
+    def is_stale(self, data_type, symbol):
+        """ whether <data_type> data of <symbol> in the store may be behind the database """
+        return os.path.exists(self._get_symbol_dir(data_type, symbol) + ".stale")
+
+    def read(self, data_type, symbol, field_names):
+        """ Returns a list of read-only memory-mapped arrays of <data_type> data of <symbol>, one for each of <field_names>,
+            or None if there is no data of <symbol> in the store.
+        """
+        symbol_dir = self._get_symbol_dir(data_type, symbol)
+
+        # a write may swap the directories while they are read: retry until the columns are read from one of them
+        for _ in range(READ_ATTEMPTS):
+            for d in (symbol_dir, symbol_dir + ".old"):
+                columns = self._read_dir(d, field_names)
+                if columns is not None:
+                    return columns
+
+        return None
+
+    def _read_dir(self, symbol_dir, field_names):
+        """ Returns the list of arrays of <field_names> in <symbol_dir>,
+            None if it is missing or was renamed while being read.
+        """
+        def get_inode():
+            try:
+                return os.stat(symbol_dir).st_ino
+            except FileNotFoundError:
+                return None
+
+        inode = get_inode()
+        if inode is None:
+            return None
+
+        try:
+            columns = [np.load(os.path.join(symbol_dir, name + ".npy"), mmap_mode='r') for name in field_names]
+        except FileNotFoundError:
+            if get_inode() == inode:
+                raise # a missing field, not a swap
+            return None
+
+        return columns if get_inode() == inode else None
+
+store = ColumnarStore(None) # path to be specified at runtime
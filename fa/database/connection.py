@@ -0,0 +1,53 @@
+import peewee as pw
+
+
+# {profile name: pragmas ((name, value), ...) applied in order on every new connection}
+PROFILES = {
+    "default": (
+        ("foreign_keys", "ON"),
+    ),
+
+    # for writing lots of data: readers do not block the writer, with less syncing to disk (safe in WAL mode),
+    # a page cache of 256MB and a memory map of 1GB
+    "bulk-load": (
+        ("foreign_keys", "ON"),
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("cache_size", -262144),
+        ("mmap_size", 1073741824),
+        ("temp_store", "MEMORY"),
+    ),
+
+    # for reading only, from a memory map of 4GB
+    "analysis": (
+        ("foreign_keys", "ON"),
+        ("query_only", "ON"),
+        ("cache_size", -262144),
+        ("mmap_size", 4294967296),
+        ("temp_store", "MEMORY"),
+    ),
+}
+
+class ProfiledSqliteDatabase(pw.SqliteDatabase):
+    """ SqliteDatabase that configures every new connection with the pragmas of a profile in PROFILES """
+
+    def init(self, database, profile="default", **connect_kwargs):
+        """ database: path to sqlite database, None if it is to be specified at runtime by calling init.
+            profile: a key of PROFILES, default: "default".
+            Any extra keyword arguments are passed on to sqlite3.connect.
+        """
+        if profile not in PROFILES:
+            raise ValueError("Unknown connection profile: {0}".format(profile))
+
+        super(ProfiledSqliteDatabase, self).init(database, **connect_kwargs)
+        self.profile = profile
+
+    def _add_conn_hooks(self, conn):
+        super(ProfiledSqliteDatabase, self)._add_conn_hooks(conn)
+
+        for name, value in PROFILES[self.profile]:
+            conn.execute("PRAGMA {0} = {1}".format(name, value))
+
+    def get_pragma(self, name):
+        """ Returns the value of pragma <name> on the current connection. """
+        return self.execute_sql("PRAGMA {0}".format(name)).fetchone()[0]
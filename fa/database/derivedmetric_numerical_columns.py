@@ -0,0 +1,10 @@
+verbose_names = (
+    "P/E Ratio",
+    "Gross Profit Margin",
+    "Operating Profit Margin",
+    "Pretax Profit Margin",
+    "Net Profit Margin",
+    "Debt/Asset Ratio",
+    "Sales/Revenue Growth",
+    "EPS (Basic) Growth",
+)
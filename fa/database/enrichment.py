@@ -0,0 +1,136 @@
+from collections import OrderedDict
+import ast
+import logging
+import operator
+import re
+
+import peewee as pw
+
+from fa.database.models import db, enrichment_export, get_Model, get_numerical_column_names
+from fa.database.query import create_enrichment_triggers, get_enriched_columns, get_pending_row_ids, update_enriched_columns
+from fa.util import to_pythonic_name
+
+
+logger = logging.getLogger(__name__)
+
+# derived columns of each data type, calculated from other columns of the same row by enrich:
+# {data_type: [(verbose column name, expression)]}, in the order of calculation,
+# an expression is an arithmetic expression (+, -, *, /, parentheses and numbers) of [verbose column names],
+# which can use the columns calculated before it.
+ENRICHMENTS = OrderedDict([
+    ("income_statement", [
+        ("Operating Income", "[Gross Income] - [SG&A Expense] - [Other Operating Expense]"),
+    ]),
+])
+
+_COLUMN_PATTERN = re.compile(r"\[([^\[\]]+)\]")
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+# number literals, ast.Num before Python 3.8
+_NUMBER_NODES = tuple(getattr(ast, name) for name in ("Constant", "Num") if hasattr(ast, name))
+
+def compile_expression(expression, get_column):
+    """ Returns the peewee expression of <expression> (see ENRICHMENTS),
+        with the expression of every column returned by get_column(verbose column name).
+    """
+    columns = []
+
+    def to_name(match):
+        columns.append(match.group(1))
+        return "_{0}".format(len(columns) - 1)
+
+    try:
+        tree = ast.parse(_COLUMN_PATTERN.sub(to_name, expression), mode="eval")
+    except SyntaxError:
+        raise ValueError("invalid expression: {0}".format(expression))
+
+    def visit(node):
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            return visit(node.operand) * (-1.0 if isinstance(node.op, ast.USub) else 1.0)
+        elif isinstance(node, ast.Name) and node.id.startswith("_"):
+            return get_column(columns[int(node.id[1:])])
+        elif isinstance(node, _NUMBER_NODES) and type(getattr(node, "value", getattr(node, "n", None))) in (int, float):
+            # float, to avoid integer division by SQLite
+            return float(getattr(node, "value", getattr(node, "n", None)))
+
+        raise ValueError("invalid expression: {0}".format(expression))
+
+    return visit(tree.body)
+
+def compile_enrichments(data_type, enrichments, enriched_columns):
+    """ Returns (values, where) of one UPDATE statement calculating all <enrichments> ([(verbose column name, expression)])
+        of <data_type> data, each where its column is null, in the rows inserted or updated since the last calculation
+        (see PendingRow) if it is in <enriched_columns>, otherwise in all rows:
+        values: {field name: expression}, where: the expression of the rows to update.
+
+        A column calculated before is used in an expression as calculated, so that all columns are calculated in one pass.
+    """
+    Model = get_Model(data_type)
+    column_names = set(get_numerical_column_names(Model.__name__))
+
+    # expressions of the values of columns after calculation
+    values = OrderedDict()
+
+    def get_column(column):
+        if column not in column_names:
+            raise ValueError("unknown column of {0}: {1}".format(data_type, column))
+
+        name = to_pythonic_name(column)
+        return values.get(name, getattr(Model, name))
+
+    is_pending_list = []
+
+    for column, expression in enrichments:
+        field = get_column(column)
+        value = compile_expression(expression, get_column)
+        is_pending = getattr(Model, to_pythonic_name(column)) >> None
+
+        if column in enriched_columns:
+            is_pending &= Model.id << get_pending_row_ids(data_type)
+
+        values[to_pythonic_name(column)] = pw.Clause(
+            pw.SQL("CASE WHEN"), is_pending, pw.SQL("THEN"), value, pw.SQL("ELSE"), field, pw.SQL("END")
+        )
+        is_pending_list.append(is_pending)
+
+    where = is_pending_list[0]
+    for is_pending in is_pending_list[1:]:
+        where |= is_pending
+
+    return values, where
+
+def enrich(data_type, enrichments=None):
+    """ Calculates the derived columns of <data_type> data declared in <enrichments> ([(verbose column name, expression)],
+        default: None - ENRICHMENTS[data_type]), where null, in the rows inserted or updated since the last run
+        (in all rows for a column never calculated), all columns with one UPDATE statement.
+        Returns the number of rows updated.
+
+        Rows written are recorded by triggers created on the first run, and cleared by every run,
+        so <enrichments> should have all derived columns of <data_type>.
+    """
+    enrichments = ENRICHMENTS.get(data_type, []) if enrichments is None else enrichments
+    if not enrichments:
+        return 0
+
+    db.create_tables(enrichment_export, safe=True)
+    create_enrichment_triggers(data_type)
+
+    columns = [column for column, expression in enrichments]
+    enriched_columns = get_enriched_columns(data_type, columns)
+
+    if len(enriched_columns) == len(columns) and not get_pending_row_ids(data_type).exists():
+        return 0
+
+    values, where = compile_enrichments(data_type, enrichments, enriched_columns)
+    no_of_rows = update_enriched_columns(data_type, values, where, columns)
+
+    logger.info("Calculated {0} of {1} rows of {2}.".format(', '.join(columns), no_of_rows, data_type))
+    return no_of_rows
@@ -1,10 +1,12 @@
 import peewee as pw
 
-from fa.database import balancesheet_numerical_columns, cashflow_numerical_columns, incomestatement_numerical_columns, price_numerical_columns
+from fa.database import balancesheet_numerical_columns, cashflow_numerical_columns, incomestatement_numerical_columns, price_numerical_columns, \
+    derivedmetric_numerical_columns
+from fa.database.connection import ProfiledSqliteDatabase
 from fa.util import  to_pythonic_name
 
 
-db = pw.SqliteDatabase(None) # path to be specified at runtime
+db = ProfiledSqliteDatabase(None) # path and connection profile to be specified at runtime
 
 SYMBOL_CATEGORY_CHOICES = (
     ("stock", "Stock"),
@@ -80,6 +82,80 @@ def _create_financial_report_model(model_name):
 for model_name in ("BalanceSheet", "CashFlow", "IncomeStatement"):
     globals()[model_name] = _create_financial_report_model(model_name)
 
+#------------------------------
+# metrics derived from the data above (fa.analysis.derived), one row per symbol and release date of financial report
+#------------------------------
+
+DerivedMetric = _create_financial_report_model("DerivedMetric")
+
+# the *_updated_at markers of a symbol when its derived metrics were last refreshed
+class DerivedMetricRefresh(BaseModel):
+    symbol_obj = pw.ForeignKeyField(Symbol, db_column="symbol", primary_key=True)
+    price_updated_at = pw.DateTimeField(null=True)
+    balance_sheet_updated_at = pw.DateTimeField(null=True)
+    income_statement_updated_at = pw.DateTimeField(null=True)
+
+#------------------------------
+# narrow layout of the financial report models, one row per value,
+# so that reading a few columns does not read the whole wide rows
+#------------------------------
+
+class ReportMetric(BaseModel):
+    data_type = pw.CharField()  # name of *_updated_at fields in Symbol model without _updated_at
+    name = pw.CharField()       # field name in the financial report model
+
+    class Meta:
+        indexes = (
+            (("data_type", "name"), True),
+        )
+
+class ReportValue(BaseModel):
+    symbol_obj = pw.ForeignKeyField(Symbol, db_column="symbol")
+    metric = pw.ForeignKeyField(ReportMetric, db_column="metric_id")
+    date = pw.DateTimeField()
+    value = pw.DoubleField()    # null values are not stored
+
+    class Meta:
+        indexes = (
+            # a covering index, values of a symbol and a metric are read without touching the table
+            (("symbol_obj", "metric", "date", "value"), False),
+        )
+
+#------------------------------
+# findings of data quality checks (fa.analysis.audit), one row per finding
+#------------------------------
+
+class QualityFinding(BaseModel):
+    symbol_obj = pw.ForeignKeyField(Symbol, db_column="symbol")
+    data_type = pw.CharField()          # name of *_updated_at fields in Symbol model without _updated_at
+    check = pw.CharField()              # name of the check, e.g. "outlier"
+    date = pw.DateTimeField()
+    column = pw.CharField(null=True)    # verbose column name, None if the finding is of a whole record
+
+#------------------------------
+# progress of the calculation of derived columns of the models above (fa.database.enrichment)
+#------------------------------
+
+# derived columns that have been calculated in all rows
+class EnrichedColumn(BaseModel):
+    data_type = pw.CharField()      # name of *_updated_at fields in Symbol model without _updated_at
+    column = pw.CharField()         # verbose name of the derived column
+
+    class Meta:
+        indexes = (
+            (("data_type", "column"), True),
+        )
+
+# rows inserted or updated since the last calculation, recorded by triggers (fa.database.query.create_enrichment_triggers)
+class PendingRow(BaseModel):
+    data_type = pw.CharField()
+    row_id = pw.IntegerField()      # id of the row in the table of the data type
+
+    class Meta:
+        indexes = (
+            (("data_type", "row_id"), True),
+        )
+
 #------------------------------------------------
 # lists all active models (for iteration purpose)
 #------------------------------------------------
@@ -87,8 +163,20 @@ for model_name in ("BalanceSheet", "CashFlow", "IncomeStatement"):
 # in the order of dependence, what comes later depends on what comes earlier
 export = [Symbol, Price, BalanceSheet, CashFlow, IncomeStatement]
 
+# models of the narrow layout, with tables created by migration (fa.database.query.migrate_to_narrow_table)
+narrow_export = [ReportMetric, ReportValue]
+
+# models of derived metrics, with tables created by fa.analysis.derived.refresh_derived_metrics
+derived_export = [DerivedMetric, DerivedMetricRefresh]
+
+# models of the data quality report, with tables created by fa.analysis.audit.scan_database
+audit_export = [QualityFinding]
+
+# models of the progress of enrichment, with tables created by fa.database.enrichment.enrich
+enrichment_export = [EnrichedColumn, PendingRow]
+
 def get_Model(data_type):
     """ returns the model class of <data_type>
-        data_type: name of *_updated_at fields in Symbol model without _updated_at """
+        data_type: name of *_updated_at fields in Symbol model without _updated_at, or "derived_metric" """
     class_name = data_type.title().replace('_', '')
-    return next(cls for cls in export if cls.__name__ == class_name)
+    return next(cls for cls in export + derived_export if cls.__name__ == class_name)
@@ -1,9 +1,32 @@
+from collections import OrderedDict
+from itertools import repeat
+import hashlib
 import logging
+
+import numpy as np
+
 from fa.database.models import *
+from fa.database.columnar import store as columnar_store
+from fa.util import partition
 
 
 logger = logging.getLogger(__name__)
 
+# maximum number of host parameters in a single SQL statement (compile-time default of SQLite)
+SQLITE_MAX_VARIABLE_NUMBER = 999
+
+# functions to be called with (data_type, symbol) after update_fundamentals has updated data of the symbol
+update_listeners = []
+
+# what update_fundamentals can do with a record of a date that already exists, see update_fundamentals
+CONFLICT_POLICIES = (None, "ignore", "replace", "update_non_null")
+
+# data types from which derived metrics (DerivedMetric) are calculated, see fa.analysis.derived
+DERIVED_METRIC_SOURCES = ("price", "balance_sheet", "income_statement")
+
+# data types of which data can be kept in the narrow table ReportValue as well
+NARROW_DATA_TYPES = ("balance_sheet", "cash_flow", "income_statement")
+
 def get_outdated_symbols(data_type, end_date, category=None):
     """ Gets symbols which <data_type> data is never updated or was updated before <end_date>, and their update dates.
 
@@ -19,6 +42,15 @@ def get_outdated_symbols(data_type, end_date, category=None):
 
     return Symbol.select(Symbol.symbol, field.alias("updated_at")).where(condition)
 
+def get_update_markers(symbol):
+    """ Returns {data_type: date of last update} of <symbol>, empty if <symbol> does not exist.
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+    """
+    fields = [f for f in Symbol._meta.get_fields() if f.name.endswith("_updated_at")]
+    rows = list(Symbol.select(*fields).where(Symbol.symbol == symbol).tuples())
+
+    return {f.name[:-len("_updated_at")]: value for f, value in zip(fields, rows[0])} if rows else {}
+
 def get_record_dates(data_type, symbol):
     """ data_type: name of *_updated_at fields in Symbol model without _updated_at
         symbol: e.g. 'C6L.SI'
@@ -39,7 +71,297 @@ def get_fundamentals(data_type, symbol, field_names):
         .order_by(Model.date) \
         .tuples()
 
-def update_fundamentals(data_type, symbol, records, end_date, delete_old=False):
+def _get_fundamentals_array_sql(Model, field_names):
+    """ Returns (SQL statement selecting seconds since epoch of date and <field_names> of a symbol ordered by date,
+        SQL statement counting the rows of a symbol), both with the symbol as the only parameter.
+    """
+    quote = lambda field: '"{0}"'.format(field.db_column)
+
+    table = '"{0}"'.format(Model._meta.db_table)
+    condition = "{0} = ?".format(quote(Model.symbol_obj))
+    columns = ["CAST(strftime('%s', {0}) AS INTEGER)".format(quote(Model.date))]  # seconds since epoch
+    columns += [quote(getattr(Model, c)) for c in field_names]
+
+    return (
+        "SELECT {0} FROM {1} WHERE {2} ORDER BY {3}".format(', '.join(columns), table, condition, quote(Model.date)),
+        "SELECT COUNT(*) FROM {0} WHERE {1}".format(table, condition),
+    )
+
+def _split_dates(values):
+    """ Returns (dates in datetime64[ns] array, values) from 2-D array <values> with seconds since epoch in the first column """
+    return values[:, 0].astype(np.int64).astype("datetime64[s]").astype("datetime64[ns]"), values[:, 1:]
+
+def get_fundamentals_array(data_type, symbol, field_names, fetch_size=4096):
+    """ Returns fundamentals of <symbol> ordered by date, selecting only <field_names>, as a tuple of
+        (dates in datetime64[ns] array, values in 2-D float64 array, with NaN for NULL, one column per field name).
+
+        The query is run through the sqlite3 cursor directly, bypassing the conversion of values into model fields,
+        and the rows are copied into a preallocated array <fetch_size> rows at a time.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+        symbol: e.g. 'C6L.SI'
+        field_names: a sequence of field names (string) of numerical fields as defined in the respective model.
+    """
+    select_sql, count_sql = _get_fundamentals_array_sql(get_Model(data_type), field_names)
+
+    with db.transaction():  # so that the number of rows does not change in between
+        no_of_rows = db.execute_sql(count_sql, (symbol,)).fetchone()[0]
+        values = np.empty((no_of_rows, len(field_names) + 1), dtype=np.float64)
+
+        cursor = db.execute_sql(select_sql, (symbol,))
+
+        start = 0
+        for rows in iter(lambda: cursor.fetchmany(fetch_size), []):
+            values[start : start + len(rows)] = rows    # None becomes NaN
+            start += len(rows)
+
+    return _split_dates(values)
+
+def iter_fundamentals_arrays(data_type, symbol, field_names, chunk_size=65536):
+    """ Yields fundamentals of <symbol> ordered by date, selecting only <field_names>, <chunk_size> rows at a time,
+        each chunk as returned by get_fundamentals_array, so that a long series need not fit in memory at once.
+    """
+    select_sql, _ = _get_fundamentals_array_sql(get_Model(data_type), field_names)
+    cursor = db.execute_sql(select_sql, (symbol,))
+
+    for rows in iter(lambda: cursor.fetchmany(chunk_size), []):
+        yield _split_dates(np.array(rows, dtype=np.float64))   # None becomes NaN
+
+def get_fundamentals_of_symbols(data_type, symbols, field_names):
+    """ Returns in tuple form (symbol first), fundamentals of all <symbols>, selecting only <field_names>,
+        ordered by symbol and date, so that the composite index of symbol and date is used.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+        symbols: a sequence of symbols e.g. ['C6L.SI', 'J7X.SI']
+        field_names: a sequence of field names (string) as defined in the respective model.
+    """
+    Model = get_Model(data_type)
+    fields = [Model.symbol_obj] + [getattr(Model, c) for c in field_names]
+
+    # one query per chunk of symbols, the size of chunk is limited by the number of parameters allowed
+    for chunk in partition(sorted(set(symbols)), SQLITE_MAX_VARIABLE_NUMBER):
+        yield from Model.select(*fields) \
+            .where(Model.symbol_obj << chunk) \
+            .order_by(Model.symbol_obj, Model.date) \
+            .tuples()
+
+def get_fundamentals_as_of(data_type, date, field_names, symbols=None):
+    """ Returns in tuple form (symbol first), the latest fundamentals at or before <date> of every symbol,
+        one row per symbol ordered by symbol, selecting only <field_names>.
+        The latest date of each symbol is looked up in the composite index of symbol and date.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at, or "derived_metric"
+        date: datetime object
+        field_names: a sequence of field names (string) as defined in the respective model.
+        symbols: a sequence of symbols e.g. ['C6L.SI', 'J7X.SI'], default: None - all symbols.
+    """
+    Model = get_Model(data_type)
+    quote = lambda field: '"{0}"'.format(field.db_column)
+
+    fields = [Model.symbol_obj] + [getattr(Model, c) for c in field_names]
+    sql = "SELECT {0} FROM \"{1}\" AS t WHERE {2} = (SELECT MAX({2}) FROM \"{1}\" WHERE {3} = t.{3} AND {2} <= ?)".format(
+        ', '.join("t." + quote(f) for f in fields),
+        Model._meta.db_table,
+        quote(Model.date),
+        quote(Model.symbol_obj),
+    )
+    params = [Model.date.db_value(date)]
+
+    # one query per chunk of symbols, the size of chunk is limited by the number of parameters allowed
+    chunks = [None] if symbols is None else partition(sorted(set(symbols)), SQLITE_MAX_VARIABLE_NUMBER - 1)
+
+    for chunk in chunks:
+        chunk_sql, chunk_params = sql, params
+
+        if chunk is not None:
+            chunk_sql += " AND t.{0} IN ({1})".format(quote(Model.symbol_obj), ', '.join('?' * len(chunk)))
+            chunk_params = params + chunk
+
+        for row in db.execute_sql(chunk_sql + " ORDER BY t.{0}".format(quote(Model.symbol_obj)), chunk_params):
+            yield tuple(f.python_value(value) for f, value in zip(fields, row))
+
+def _get_value_fields(Model):
+    """ fields of numerical values of <Model> """
+    return [f for f in Model._meta.get_fields() if f.name not in ("id", "symbol_obj", "date")]
+
+def _get_report_metric_ids(data_type, field_names=None):
+    """ Returns {field name: id of ReportMetric} of <data_type>, of only <field_names> if given,
+        empty if not migrated to the narrow table.
+    """
+    if not ReportMetric.table_exists():
+        return {}
+
+    condition = ReportMetric.data_type == data_type
+    if field_names is not None:
+        condition &= ReportMetric.name << list(field_names)
+
+    return dict(ReportMetric.select(ReportMetric.name, ReportMetric.id).where(condition).tuples())
+
+def copy_to_narrow_table(data_type, symbol=None):
+    """ Replaces the <data_type> values in narrow table ReportValue by those in the wide table of <data_type>,
+        of <symbol>, or of all symbols if None, with one INSERT ... SELECT statement per column.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at, in NARROW_DATA_TYPES
+        symbol: e.g. 'C6L.SI'
+    """
+    Model = get_Model(data_type)
+    quote = lambda field: '"{0}"'.format(field.db_column)
+
+    with db.transaction():
+        metric_ids = _get_report_metric_ids(data_type)
+        for field in _get_value_fields(Model):
+            if field.name not in metric_ids:
+                metric_ids[field.name] = ReportMetric.create(data_type=data_type, name=field.name).id
+
+        delete_query = ReportValue.delete().where(ReportValue.metric << list(metric_ids.values()))
+        if symbol:
+            delete_query = delete_query.where(ReportValue.symbol_obj == symbol)
+        delete_query.execute()
+
+        for field in _get_value_fields(Model):
+            sql = 'INSERT INTO "{0}" ({1}, {2}, {3}, {4}) SELECT {5}, ?, {6}, {7} FROM "{8}" WHERE {7} IS NOT NULL'.format(
+                ReportValue._meta.db_table,
+                quote(ReportValue.symbol_obj), quote(ReportValue.metric), quote(ReportValue.date), quote(ReportValue.value),
+                quote(Model.symbol_obj), quote(Model.date), quote(field),
+                Model._meta.db_table
+            )
+            params = [metric_ids[field.name]]
+
+            if symbol:
+                sql += " AND {0} = ?".format(quote(Model.symbol_obj))
+                params.append(symbol)
+
+            db.execute_sql(sql, params)
+
+def migrate_to_narrow_table(data_types=NARROW_DATA_TYPES):
+    """ Creates the tables of the narrow layout if they do not exist and copies all data of <data_types> into them,
+        after which update_fundamentals keeps them up to date.
+        data_types: a sequence of data types in NARROW_DATA_TYPES
+    """
+    db.create_tables(narrow_export, safe=True)
+
+    for data_type in data_types:
+        logger.info("Copying {0} data into narrow table...".format(data_type))
+        copy_to_narrow_table(data_type)
+
+def get_fundamentals_narrow(data_type, symbol, field_names):
+    """ Returns in tuple form (date first), fundamentals of <symbol> ordered by date, selecting only <field_names>,
+        read from narrow table ReportValue, so only the values of <field_names> are read.
+        Only dates with a value of any of <field_names> are included.
+        Raises ValueError if <data_type> data has not been migrated to the narrow table.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at, in NARROW_DATA_TYPES
+        symbol: e.g. 'C6L.SI'
+        field_names: a sequence of field names (string) of numerical fields as defined in the respective model.
+    """
+    metric_ids = _get_report_metric_ids(data_type, field_names)
+
+    if len(metric_ids) < len(set(field_names)):
+        raise ValueError("{0} data has not been migrated to narrow table.".format(data_type))
+
+    ids = [metric_ids[name] for name in field_names]
+    quote = lambda field: '"{0}"'.format(field.db_column)
+
+    # one column per metric, values of the same date in one row
+    sql = "SELECT {0}, {1} FROM \"{2}\" WHERE {3} = ? AND {4} IN ({5}) GROUP BY {0} ORDER BY {0}".format(
+        quote(ReportValue.date),
+        ', '.join(["MAX(CASE WHEN {0} = ? THEN {1} END)".format(quote(ReportValue.metric), quote(ReportValue.value))] * len(ids)),
+        ReportValue._meta.db_table,
+        quote(ReportValue.symbol_obj),
+        quote(ReportValue.metric),
+        ', '.join('?' * len(ids))
+    )
+    cursor = db.execute_sql(sql, ids + [symbol] + ids)
+
+    for date, *values in cursor:
+        yield (ReportValue.date.python_value(date),) + tuple(values)
+
+def _chunk_records(records, max_variables=SQLITE_MAX_VARIABLE_NUMBER):
+    """ Yields successive lists of records from <records>, each list having records of the same keys and being
+        small enough to be inserted by one multi-row INSERT statement with at most <max_variables> parameters.
+
+        Chunks of the same keys have the same size, so that the same statement can be reused.
+    """
+    chunk, keys, chunk_size = [], None, None
+
+    for rec in records:
+        if chunk and (rec.keys() != keys or len(chunk) == chunk_size):
+            yield chunk
+            chunk = []
+
+        if not chunk:
+            keys = rec.keys()
+            chunk_size = max(1, max_variables // max(1, len(keys)))
+
+        chunk.append(rec)
+
+    if chunk:
+        yield chunk
+
+def _insert_chunk(Model, chunk, on_conflict):
+    """ Inserts <chunk> of records of the same keys into the table of <Model> with one statement,
+        handling records conflicting with existing ones on the unique (symbol_obj, date) index by <on_conflict>.
+    """
+    query = Model.insert_many(chunk)
+
+    if on_conflict is None:
+        query.execute()
+    elif on_conflict == "replace":
+        query.upsert().execute()
+    else:
+        # not supported by peewee, so modify the generated statement
+        sql, params = query.sql()
+
+        if on_conflict == "ignore":
+            sql = sql.replace("INSERT INTO", "INSERT OR IGNORE INTO", 1)
+        else:
+            quote = lambda field: '"{0}"'.format(field.db_column)
+            key_fields = [Model.symbol_obj, Model.date]
+            value_fields = [getattr(Model, k) for k in chunk[0] if k not in ("symbol_obj", "date")]
+
+            # an existing value is kept where the record has no value (requires SQLite 3.24 or later)
+            sql += " ON CONFLICT ({0}) DO {1}".format(
+                ', '.join(map(quote, key_fields)),
+                "UPDATE SET " + ', '.join(
+                    "{0} = COALESCE(excluded.{0}, {0})".format(quote(f)) for f in value_fields
+                ) if value_fields else "NOTHING"
+            )
+
+        db.execute_sql(sql, params)
+
+def get_column_dtype(field):
+    """ numpy dtype of the column to keep values of <field> in """
+    if isinstance(field, pw.DateTimeField):
+        return "datetime64[ns]"
+    elif isinstance(field, (pw.IntegerField, pw.BigIntegerField)) and not field.null:
+        return np.int64
+    else:
+        return np.float64
+
+def _write_columnar_store(data_type, symbol):
+    """ Copies all <data_type> data of <symbol> from database to columnar store, read into typed arrays. """
+    Model = get_Model(data_type)
+    fields = [f for f in Model._meta.get_fields() if f.name not in ("id", "symbol_obj", "date")]
+    dates, values = get_fundamentals_array(data_type, symbol, [f.name for f in fields])
+
+    if len(dates):
+        columns = {f.name: values[:, i].astype(get_column_dtype(f)) for i, f in enumerate(fields)}
+        columns["date"] = dates
+        columnar_store.write(data_type, symbol, columns)
+    else:
+        columnar_store.delete(data_type, symbol)
+
+def sync_columnar_store(data_type, symbol):
+    """ Copies all <data_type> data of <symbol> from database to columnar store, e.g. to fill the store of
+        an existing database, or to bring data marked stale up to date.
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+        symbol: e.g. 'C6L.SI'
+    """
+    _write_columnar_store(data_type, symbol)
+    columnar_store.clear_stale(data_type, symbol)
+
+def update_fundamentals(data_type, symbol, records, end_date, delete_old=False, on_conflict=None):
     """ Updates fundamentals of <symbol> with <records> and mark it as updated at <end_date>.
 
         data_type: name of *_updated_at fields in Symbol model without _updated_at
@@ -47,28 +369,259 @@ def update_fundamentals(data_type, symbol, records, end_date, delete_old=False):
         records: a sequence of maps
         end_date: datetime object
         delete_old: whether to delete all old records of <symbol> first
+        on_conflict: what to do with a record of a date that already exists, one of CONFLICT_POLICIES:
+            None - raise IntegrityError, "ignore" - keep the existing record, "replace" - replace the existing record,
+            "update_non_null" - update the existing record with the values of the record that are not None.
+            Default: None.
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError("Unknown conflict policy: {0}".format(on_conflict))
+
+    # bulk insert, no model instance is created
+    insert = lambda Model, chunk: _insert_chunk(Model, chunk, on_conflict)
+    _update_fundamentals(data_type, symbol, _chunk_records(records), insert, end_date, delete_old)
+
+def _insert_columns(Model, symbol, columns):
+    """ Inserts records of <symbol> with values in <columns> ({field name: sequence of values}) into the table
+        of <Model>, with one executemany call, converting each column as a whole.
+    """
+    fields = [getattr(Model, name) for name in columns]
+    quote = lambda field: '"{0}"'.format(field.db_column)
+
+    values = []
+    for f in fields:
+        dtype = get_column_dtype(f)
+
+        if dtype == "datetime64[ns]":   # stored as it is given, e.g. string from csv
+            values.append([f.db_value(v) for v in columns[f.name]])
+        else:
+            column = columns[f.name]
+            if f.null:
+                column = ["nan" if v == '' else v for v in column]  # stored as NULL
+
+            values.append(np.asarray(column, dtype=dtype).tolist())
+
+    sql = 'INSERT INTO "{0}" ({1}) VALUES ({2})'.format(
+        Model._meta.db_table,
+        ', '.join(map(quote, [Model.symbol_obj] + fields)),
+        ', '.join('?' * (len(fields) + 1))
+    )
+
+    with db.exception_wrapper():
+        db.get_cursor().executemany(sql, zip(repeat(symbol), *values))
+
+def update_fundamentals_from_columns(data_type, symbol, column_chunks, end_date, delete_old=False):
+    """ Same as update_fundamentals, but takes the data in chunks of columns instead of records,
+        e.g. as parsed by fa.piping.csv_lines_to_column_chunks, so that the data can be streamed into database
+        without creating a map per record. Each chunk is converted column by column and inserted with one executemany call.
+
+        column_chunks: an iterable of {field name: sequence of values} (without symbol_obj)
+    """
+    insert = lambda Model, chunk: _insert_columns(Model, symbol, chunk)
+    _update_fundamentals(data_type, symbol, column_chunks, insert, end_date, delete_old)
+
+def _update_fundamentals(data_type, symbol, chunks, insert, end_date, delete_old):
+    """ Updates fundamentals of <symbol> with every chunk of data in <chunks>, written by insert(Model, chunk),
+        and mark it as updated at <end_date>, see update_fundamentals.
     """
     logger.info("Updating {0} data of {1} in database...".format(data_type, symbol))
 
     Model = get_Model(data_type)
     marker_map = {data_type + "_updated_at": end_date}
+    chunk = None
+    is_columnar = columnar_store.is_tracking(data_type)
+
+    # read from database instead until the columnar store is written with the data committed
+    if is_columnar:
+        columnar_store.mark_stale(data_type, symbol)
 
     try:
         with db.transaction():
             if delete_old:  # do this when there may be e.g. price adjustment
                 Model.delete().where(Model.symbol_obj == symbol).execute()
 
-            for rec in records:
-                Model.create(**rec)
+            for chunk in chunks:
+                insert(Model, chunk)
+
+            if data_type in NARROW_DATA_TYPES and _get_report_metric_ids(data_type):
+                copy_to_narrow_table(data_type, symbol)
 
             Symbol.update(**marker_map).where(Symbol.symbol == symbol).execute()
 
+            # within the transaction, so that data is not committed if it cannot be written to the store
+            if is_columnar:
+                _write_columnar_store(data_type, symbol)
+
     except Exception as e:
         logger.exception(e)
-        logger.debug("Was trying to insert a record: {0}".format(rec))
+        logger.debug("Was trying to insert: {0}".format(chunk))
         logger.error("{0} data of {1} is not updated.".format(data_type, symbol))
         raise
 
+    if is_columnar:
+        columnar_store.clear_stale(data_type, symbol)
+
+    for listener in update_listeners:
+        listener(data_type, symbol)
+
+def _checksum(rows):
+    """ checksum of rows of (date, value, ...), values rounded so that they agree whichever way they are parsed """
+    digest = hashlib.sha1()
+
+    for date, *values in rows:
+        digest.update(repr((date, [None if v is None else round(v, 6) for v in values])).encode())
+
+    return digest.hexdigest()
+
+def update_fundamentals_incrementally(data_type, symbol, records, end_date, checked_field_names=("adj_close",)):
+    """ Appends the records in <records> that are newer than the existing data of <symbol> and marks it as updated
+        at <end_date>, provided that <records> agree with the existing data in <checked_field_names> on the dates
+        they overlap (compared by checksum). Returns whether it is done.
+
+        If they do not agree, e.g. because prices have been adjusted for a split or dividend, nothing is written
+        and all data of <symbol> should be reloaded with update_fundamentals(..., delete_old=True).
+
+        data_type: name of *_updated_at fields in Symbol model without _updated_at
+        symbol: e.g. 'C6L.SI'
+        records: a sequence of maps, starting some time before the last existing record to overlap with it
+        end_date: datetime object
+        checked_field_names: a sequence of field names (string) as defined in the respective model.
+    """
+    Model = get_Model(data_type)
+    fields = [Model.date] + [getattr(Model, c) for c in checked_field_names]
+
+    # values converted the same way as those read from database
+    to_row = lambda rec: tuple(f.python_value(rec.get(f.name)) for f in fields)
+    downloaded = sorted(((to_row(rec), rec) for rec in records), key=lambda item: item[0][0])
+
+    # so that no other writer can change the existing data between the checksum and the write
+    with db.atomic():
+        existing_rows = []
+        if downloaded:
+            # dates are stored as they are given, e.g. '2012-12-20' from csv or '2012-12-20 00:00:00' from datetime objects,
+            # so compared on the date part only
+            first_date = downloaded[0][0][0].strftime("%Y-%m-%d")
+            existing_rows = list(Model.select(*fields) \
+                .where((Model.symbol_obj == symbol) & (pw.fn.date(Model.date) >= first_date)) \
+                .order_by(Model.date) \
+                .tuples())
+
+        last_date = existing_rows[-1][0] if existing_rows else None
+        overlapping_rows = [row for row, rec in downloaded if last_date is not None and row[0] <= last_date]
+
+        if _checksum(overlapping_rows) != _checksum(existing_rows):
+            logger.info("{0} data of {1} has changed since last update.".format(data_type, symbol))
+            return False
+
+        new_records = [rec for row, rec in downloaded if last_date is None or row[0] > last_date]
+        update_fundamentals(data_type, symbol, new_records, end_date)
+        return True
+
+def update_quality_findings(data_type, symbols, findings):
+    """ Replaces the findings of data quality checks on <data_type> data of <symbols> with <findings>,
+        records (dicts) of QualityFinding fields.
+    """
+    with db.transaction():
+        for chunk in partition(symbols, SQLITE_MAX_VARIABLE_NUMBER - 1):
+            QualityFinding.delete() \
+                .where((QualityFinding.data_type == data_type) & (QualityFinding.symbol_obj << chunk)) \
+                .execute()
+
+        for chunk in _chunk_records(findings):
+            QualityFinding.insert_many(chunk).execute()
+
+def get_symbols_to_refresh(symbols=None):
+    """ Returns {symbol: {data_type: date of last update}} of every symbol (or of <symbols>) of which derived metrics
+        have never been refreshed, or any data of DERIVED_METRIC_SOURCES has been updated since the last refresh,
+        ordered by symbol. The dates are to be recorded by replace_derived_metrics.
+    """
+    names = [data_type + "_updated_at" for data_type in DERIVED_METRIC_SOURCES]
+
+    refreshed = {}
+    if DerivedMetricRefresh.table_exists():
+        fields = [getattr(DerivedMetricRefresh, name) for name in names]
+        refreshed = {row[0]: row[1:] for row in DerivedMetricRefresh.select(DerivedMetricRefresh.symbol_obj, *fields).tuples()}
+
+    fields = [getattr(Symbol, name) for name in names]
+    rows = Symbol.select(Symbol.symbol, *fields).order_by(Symbol.symbol).tuples()
+    selected = None if symbols is None else set(symbols)
+
+    return OrderedDict(
+        (row[0], dict(zip(DERIVED_METRIC_SOURCES, row[1:])))
+        for row in rows
+        if (selected is None or row[0] in selected) and refreshed.get(row[0]) != row[1:]
+    )
+
+def replace_derived_metrics(markers, records):
+    """ Replaces derived metrics of the symbols in <markers> with <records> (dicts of DerivedMetric fields),
+        and records <markers> ({symbol: {data_type: date of last update}}, see get_symbols_to_refresh)
+        as the markers of their refresh.
+    """
+    symbols = list(markers)
+    refresh_records = [
+        dict({"symbol_obj": symbol}, **{data_type + "_updated_at": date for data_type, date in dates.items()})
+        for symbol, dates in markers.items()
+    ]
+
+    with db.transaction():
+        for chunk in partition(symbols, SQLITE_MAX_VARIABLE_NUMBER):
+            DerivedMetric.delete().where(DerivedMetric.symbol_obj << chunk).execute()
+            DerivedMetricRefresh.delete().where(DerivedMetricRefresh.symbol_obj << chunk).execute()
+
+        for chunk in _chunk_records(records):
+            DerivedMetric.insert_many(chunk).execute()
+
+        for chunk in _chunk_records(refresh_records):
+            DerivedMetricRefresh.insert_many(chunk).execute()
+
+def create_enrichment_triggers(data_type):
+    """ Creates triggers (unless they exist) that record every row of <data_type> data inserted or updated
+        in PendingRow, whichever way it is written, so that its derived columns are calculated by
+        fa.database.enrichment.enrich. Ids of deleted rows may be reused by SQLite, so they cannot tell new rows.
+    """
+    table = get_Model(data_type)._meta.db_table
+
+    for event in ("INSERT", "UPDATE"):
+        db.execute_sql(
+            'CREATE TRIGGER IF NOT EXISTS "{table}_pending_{name}" AFTER {event} ON "{table}" BEGIN '
+            'INSERT OR IGNORE INTO "{pending_table}" ("data_type", "row_id") VALUES (\'{data_type}\', NEW."id"); '
+            'END'.format(table=table, name=event.lower(), event=event, pending_table=PendingRow._meta.db_table, data_type=data_type)
+        )
+
+def get_pending_row_ids(data_type):
+    """ Returns a query of the ids of rows of <data_type> data inserted or updated since the last enrichment """
+    return PendingRow.select(PendingRow.row_id).where(PendingRow.data_type == data_type)
+
+def get_enriched_columns(data_type, columns):
+    """ Returns the set of derived <columns> (verbose names) of <data_type> that have been calculated in all rows """
+    query = EnrichedColumn \
+        .select(EnrichedColumn.column) \
+        .where((EnrichedColumn.data_type == data_type) & (EnrichedColumn.column << list(columns))) \
+        .tuples()
+
+    return {column for column, in query}
+
+def update_enriched_columns(data_type, values, where, columns):
+    """ Sets the values of <data_type> data to <values> ({field name: expression}) in the rows matching <where>,
+        records derived <columns> (verbose names) as calculated in all rows and clears the pending rows,
+        in one transaction. Returns the number of rows updated.
+    """
+    Model = get_Model(data_type)
+
+    with db.transaction():
+        no_of_rows = Model.update(**values).where(where).execute()
+
+        # including the rows recorded by the update above
+        PendingRow.delete().where(PendingRow.data_type == data_type).execute()
+
+        EnrichedColumn.delete() \
+            .where((EnrichedColumn.data_type == data_type) & (EnrichedColumn.column << list(columns))) \
+            .execute()
+        EnrichedColumn.insert_many({"data_type": data_type, "column": column} for column in columns).execute()
+
+    return no_of_rows
+
 def delete_all():
-    for Model in reversed(export):  # delete data from dependent models first
-        Model.delete().execute()
+    for Model in reversed(export + narrow_export + derived_export + audit_export + enrichment_export):  # delete data from dependent models first
+        if Model.table_exists():
+            Model.delete().execute()
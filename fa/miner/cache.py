@@ -0,0 +1,171 @@
+from datetime import timedelta
+import gzip
+import hashlib
+import json
+import os
+import os.path
+import tempfile
+import time
+
+
+# headers of a response kept in the cache, the last two to revalidate it
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+class CachedResponse(object):
+    def __init__(self, url, text_path, headers):
+        """ A 200 response kept in the cache, with the attributes of requests.Response used by fa.miner.http and the
+            test_for_error functions, its text read from the gzip-compressed file <text_path> when used.
+            url: the final URL of the response, after redirection.
+        """
+        self.url = url
+        self.text_path = text_path
+        self.headers = headers
+        self.status_code = 200
+        self.reason = "OK"
+
+    @property
+    def text(self):
+        with gzip.open(self.text_path, "rt", encoding="utf-8") as f:
+            return f.read()
+
+    def iter_lines(self):
+        """ Yields the lines of the text without line breaks, read from the file as they are needed. """
+        with gzip.open(self.text_path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+
+    def close(self):
+        pass
+
+class ResponseCache(object):
+    def __init__(self, path, ttl=timedelta(days=1), offline=False):
+        """ Returns a cache of the texts of 200 responses of GET requests on disk, used by fa.miner.http:
+            the entry of a URL (<path>/urls/<SHA-1 of the URL>.json) refers to its text, kept gzip-compressed
+            in a file named by the SHA-1 of the text (<path>/texts/), so that identical texts are kept once.
+
+            path: root directory of the cache, None to disable the cache, or if it is to be specified at runtime by calling init.
+            ttl: how long a response is used without asking the server (timedelta object), default: 1 day.
+                After that it is revalidated with its ETag or Last-Modified header if any, or fetched again.
+            offline: if True, responses are only read from the cache, never from the network (replay mode).
+        """
+        self.init(path, ttl, offline)
+
+    def init(self, path, ttl=timedelta(days=1), offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.offline = offline
+
+    def is_enabled(self):
+        return self.path is not None
+
+    def _get_entry_path(self, url):
+        return os.path.join(self.path, "urls", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _get_text_path(self, digest):
+        return os.path.join(self.path, "texts", digest[:2], digest + ".gz")
+
+    def get_entry(self, url):
+        """ Returns the entry (dict) of <url>, None if <url> is not in the cache. """
+        try:
+            with open(self._get_entry_path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        """ whether <entry> can be used without asking the server """
+        return self.offline or time.time() - entry["fetched_at"] < self.ttl.total_seconds()
+
+    def get_validators(self, entry):
+        """ Returns headers of a conditional request to revalidate <entry>, empty if it cannot be revalidated. """
+        headers = {}
+
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        return headers
+
+    def get_response(self, entry):
+        """ Returns the CachedResponse object of <entry>, None if its text is missing. """
+        text_path = self._get_text_path(entry["digest"])
+        return CachedResponse(entry["url"], text_path, entry["headers"]) if os.path.exists(text_path) else None
+
+    def _write_entry(self, url, entry):
+        """ Writes <entry> of <url> into a temporary file renamed into place when complete,
+            so that a reader (from any thread or process) never sees a partly written entry.
+        """
+        entry_path = self._get_entry_path(url)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path), suffix=".tmp")
+
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, entry_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def put(self, url, response):
+        """ Keeps the text of <response>, a 200 response to GET <url>. """
+        writer = self.open_writer(url, response)
+        writer.write(response.text)
+        writer.close()
+
+    def open_writer(self, url, response):
+        """ Returns a CacheWriter object to keep the text of <response>, a 200 response to GET <url>,
+            written chunk by chunk, so that a text streamed is never held in memory.
+        """
+        return CacheWriter(self, url, response)
+
+    def touch(self, url, entry):
+        """ Marks <entry> of <url> as fetched now, after the server has confirmed it is not modified. """
+        self._write_entry(url, dict(entry, fetched_at=time.time()))
+
+class CacheWriter(object):
+    def __init__(self, cache, url, response):
+        """ Returns a writer of the text of <response> to GET <url> into ResponseCache <cache>,
+            kept in the cache when closed, not before.
+        """
+        self.cache = cache
+        self.url = url
+        self.response = response
+        self.sha1 = hashlib.sha1()
+
+        text_dir = os.path.join(cache.path, "texts")
+        os.makedirs(text_dir, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=text_dir, suffix=".tmp")
+        self.file = os.fdopen(fd, "wb")
+        self.gzip_file = gzip.GzipFile(fileobj=self.file, mode="wb")
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.sha1.update(data)
+        self.gzip_file.write(data)
+
+    def close(self):
+        """ Keeps the text written, with an entry of the URL referring to it. """
+        self.gzip_file.close()
+        self.file.close()
+
+        digest = self.sha1.hexdigest()
+        text_path = self.cache._get_text_path(digest)
+        os.makedirs(os.path.dirname(text_path), exist_ok=True)
+        os.replace(self.temp_path, text_path)
+
+        self.cache._write_entry(self.url, {
+            "url": self.response.url,
+            "digest": digest,
+            "headers": {name: self.response.headers[name] for name in CACHED_HEADERS if name in self.response.headers},
+            "fetched_at": time.time(),
+        })
+
+    def discard(self):
+        """ Discards the text written, e.g. when the response is broken while being read. """
+        self.gzip_file.close()
+        self.file.close()
+        os.remove(self.temp_path)
+
+cache = ResponseCache(None) # path to be specified at runtime, disabled by default
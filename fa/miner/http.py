@@ -1,24 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import logging
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from fa.miner.cache import cache, CachedResponse
 from fa.miner.exceptions import GetError
 
 
 logger = logging.getLogger(__name__)
 
-def strict_get(url, test_for_error=None):
+def _send_get(url, session, headers=None, **kwargs):
+    """ Sends GET request to <url> with <headers> if any, raises GetError if it cannot be sent. """
+    if headers:
+        kwargs["headers"] = headers
+
+    try:
+        return (session or requests).get(url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        logger.exception(e)
+        raise GetError() from e
+
+def _get(url, session, **kwargs):
+    """ Returns the response to GET <url>, which is a CachedResponse object from the response cache
+        (fa.miner.cache.cache) if it is enabled, and has a response to <url> that is fresh or not modified since.
+        In offline mode of the cache, raises GetError if it has no response to <url>.
+        Extra keyword arguments are passed on to requests.
+    """
+    if not cache.is_enabled():
+        return _send_get(url, session, **kwargs)
+
+    entry = cache.get_entry(url)
+    cached_response = entry and cache.get_response(entry)
+
+    if cached_response and cache.is_fresh(entry):
+        return cached_response
+
+    if cache.offline:
+        logger.error("GET {0} is not in the cache, offline".format(url))
+        raise GetError()
+
+    r = _send_get(url, session, cache.get_validators(entry) if cached_response else None, **kwargs)
+
+    if r.status_code == 304 and cached_response:
+        r.close()
+        cache.touch(url, entry)
+        return cached_response
+
+    return r
+
+def strict_get(url, test_for_error=None, session=None):
     """ Sends GET request to <url> and returns the response text if okay, raises GetError otherwise.
         test_for_error: an optional function: response -> boolean, to test if a 200 response is okay
+        session: an optional requests.Session object to send the request with, so that connections are reused.
+
+        If the response cache (fa.miner.cache.cache) is enabled, 200 responses are kept in it and read from it.
+    """
+    r = _get(url, session)
+
+    # including the responses failing <test_for_error>, so that they are tested again in offline mode
+    if r.status_code == 200 and not isinstance(r, CachedResponse) and cache.is_enabled():
+        cache.put(url, r)
+
+    if r.status_code == 200 and (test_for_error is None or not test_for_error(r)):
+        return r.text
+    else:
+        logger.error("GET {0} {1} {2}".format(r.url, r.status_code, r.reason))
+        raise GetError()
+
+def strict_get_lines(url, test_for_error=None, session=None):
+    """ Same as strict_get, but returns an iterator of the lines of the response text, read as they arrive,
+        so that the whole response is never held in memory.
+    """
+    r = _get(url, session, stream=True)
+
+    if r.status_code == 200 and (test_for_error is None or not test_for_error(r)):
+        if isinstance(r, CachedResponse):
+            return r.iter_lines()
+
+        r.encoding = r.encoding or "utf-8"
+        return _iter_lines(r, cache.open_writer(url, r) if cache.is_enabled() else None)
+    else:
+        logger.error("GET {0} {1} {2}".format(r.url, r.status_code, r.reason))
+        r.close()
+        raise GetError()
+
+def _iter_lines(response, writer=None):
+    """ Yields the lines of <response>, written to CacheWriter object <writer> if any,
+        which keeps them in the cache only if all lines have been read.
     """
     try:
-        r = requests.get(url)
+        for line in response.iter_lines(decode_unicode=True):
+            if writer:
+                writer.write(line + "\n")
+            yield line
+
+        if writer:
+            writer.close()
+            writer = None
     except requests.exceptions.RequestException as e:
         logger.exception(e)
         raise GetError() from e
-    else:
-        if r.status_code == 200 and (test_for_error is None or not test_for_error(r)):
-            return r.text
-        else:
-            logger.error("GET {0} {1} {2}".format(r.url, r.status_code, r.reason))
-            raise GetError()
+    finally:
+        response.close()
+
+        if writer:
+            writer.discard()
+
+class RateLimiter(object):
+    def __init__(self, rate):
+        """ Returns an object that spaces out the callers of its wait method (from any thread),
+            so that they proceed no more than <rate> times per second.
+        """
+        self.interval = 1 / rate
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """ Blocks until the caller is allowed to proceed. """
+        with self.lock:
+            now = time.monotonic()
+            scheduled_time = max(now, self.next_time)
+            self.next_time = scheduled_time + self.interval
+
+        time.sleep(scheduled_time - now)
+
+def _create_session(pool_size):
+    """ Returns a requests.Session object that keeps up to <pool_size> connections alive per host. """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def concurrent_get(urls, test_for_error=None, max_workers=8, max_workers_per_host=4, rate_limit=None):
+    """ Sends GET requests to <urls> concurrently over a pool of keep-alive connections,
+        returns {url: response text}, with None as the text of any url which strict_get fails on.
+
+        test_for_error: passed on to strict_get.
+        max_workers: maximum number of requests in flight, default: 8.
+        max_workers_per_host: maximum number of requests in flight to the same host, default: 4.
+        rate_limit: maximum number of requests sent per second, default: None - no limit.
+    """
+    urls = list(urls)
+    host_semaphores = {urlparse(url).netloc: threading.BoundedSemaphore(max_workers_per_host) for url in urls}
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    def get(url):
+        with host_semaphores[urlparse(url).netloc]:
+            if rate_limiter:
+                rate_limiter.wait()
+
+            try:
+                return strict_get(url, test_for_error, session)
+            except GetError:
+                return None
+
+    with _create_session(max_workers) as session, ThreadPoolExecutor(max_workers) as executor:
+        return dict(zip(urls, executor.map(get, urls)))
@@ -6,6 +6,8 @@ from functools import partial
 from collections import defaultdict
 import unicodedata
 
+import numpy as np
+
 from fa.miner.symbol_suffix import SYMBOL_SUFFIX_INFO, DEFAULT_CURRENCY
 from fa.miner.exceptions import PreprocessingError
 from fa.util import assert_equal
@@ -35,6 +37,21 @@ UNO_VALUE_UNIT_COLUMNS = {
     "Cash Ratio"
 }
 
+# currency symbols in the Basic Multilingual Plane, as recognized by _parse_value
+_CURRENCY_SYMBOLS = ''.join(c for c in map(chr, range(0x10000)) if unicodedata.category(c) == "Sc")
+
+# matches a whole line with the common forms of values, e.g. "-", "25%", "3,456", "(3,456.78)", "$3,456", "(¥3,456)".
+# Anything else falls into the last group and is parsed by _parse_value.
+VALUE_LINE_RE = re.compile(
+    r"^(?:"
+    r"(?P<dash>-)|"
+    r"(?P<percentage>-?\d[\d,]*(?:\.\d*)?)%|"
+    r"(?:(?P<open>\()|(?P<minus>-))?[{0}]?(?P<number>\d[\d,]*(?:\.\d*)?)(?(open)\))|"
+    r"(?P<other>[^\n]*)"
+    r")$".format(re.escape(_CURRENCY_SYMBOLS)),
+    re.MULTILINE
+)
+
 def _parse_top_remark(string):
     """ top remark string -> month (integer) where fiscal year ends, currency (string), value unit (multiple of 1,000) """
     result = TOP_REMARK_RE.match(string)
@@ -118,11 +135,41 @@ def _parse_value(string, value_unit):
             else:
                 return int(s) * value_unit
 
-def preprocess(obj, symbol, timeframe, report_type):
-    """ Preprocesses <obj>, parses the values, yields column name, list of parsed values
+def _parse_values(strings, value_unit):
+    """ Same as _parse_value on every string in <strings>, but done to the whole column at once,
+        returns a float64 array with NaN in place of None.
+    """
+    matches = VALUE_LINE_RE.findall('\n'.join(strings))
+
+    if len(matches) != len(strings):    # some string contains a line break
+        return np.array([_parse_value(s, value_unit) for s in strings], dtype=np.float64)
+
+    result = np.empty(len(strings), dtype=np.float64)
+
+    if matches:
+        dashes, percentages, opens, minuses, numbers, _ = (np.array(g, dtype=object) for g in zip(*matches))
+
+        number_strings = '\n'.join(p or n or "nan" for p, n in zip(percentages, numbers)).replace(',', '')
+        values = np.array(number_strings.split('\n')).astype(np.float64)
+
+        is_percentage = percentages != ''
+        is_negative = (opens != '') | (minuses != '')
+
+        result[:] = np.where(is_percentage, values / 100, np.where(is_negative, -values, values) * value_unit)
+        result[dashes != ''] = np.nan
+
+        for i in np.flatnonzero((dashes == '') & ~is_percentage & (numbers == '')):
+            result[i] = _parse_value(strings[i], value_unit)
+
+    return result
+
+def preprocess(obj, symbol, timeframe, report_type, vectorized=False):
+    """ Preprocesses <obj>, parses the values, yields column name, parsed values
 
         obj: dictionary of scraped raw data.
         symbol, timeframe, report_type: the parameters that were used to obtain <obj>.
+        vectorized: if True, the values of each column are parsed at once into a float64 array (NaN for missing value),
+            otherwise into a list of ints, floats or None. default: False.
     """
     logger.info("preprocessing raw data of {0} {1} {2}".format(symbol, timeframe, report_type))
 
@@ -134,4 +181,8 @@ def preprocess(obj, symbol, timeframe, report_type):
 
     for column_name, values in _deduplicate_column_name(obj["data"][1:]):
         value_unit_to_use = 1 if column_name in UNO_VALUE_UNIT_COLUMNS else value_unit
-        yield column_name, [_parse_value(v, value_unit_to_use) for v in values]
+
+        if vectorized:
+            yield column_name, _parse_values(values, value_unit_to_use)
+        else:
+            yield column_name, [_parse_value(v, value_unit_to_use) for v in values]
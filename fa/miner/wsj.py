@@ -3,6 +3,12 @@ import re
 
 from bs4 import BeautifulSoup
 
+try:
+    from lxml import html as lxml_html
+    from lxml.etree import XPath
+except ImportError:  # lxml is optional, the BeautifulSoup scraper backend is used without it
+    lxml_html = None
+
 from fa.miner.symbol_suffix import SYMBOL_SUFFIX_INFO
 from fa.miner.http import strict_get
 from fa.miner.preprocess import preprocess
@@ -40,7 +46,7 @@ def _test_for_not_found(response):
 def _scrape_row(tr):
     return tr.select("td.rowTitle")[0].text.strip(), [e.text.strip() for e in tr.select("td.valueCell")]
 
-def _scrape_html(html):
+def _scrape_html_bs4(html):
     """ Performs soup work on <html> string to extract the relevant information and returns it in a dictionary. """
     soup = BeautifulSoup(html)
 
@@ -65,8 +71,64 @@ def _scrape_html(html):
 
     return result
 
-def get_financial_data(symbol, timeframe, report_type):
-    """ Returns financial data in an iterator of csv rows (tuples). First row will be the headers.
+def _xpath_has_class(class_name):
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {0} ')".format(class_name)
+
+if lxml_html:
+    # compiled once, equivalent to the css selectors used by the BeautifulSoup scraper backend
+    _select_canonical_link_href = XPath("//link[@rel='canonical']/@href")
+    _select_tables = XPath("//table[{0}]".format(_xpath_has_class("crDataTable")))
+    _select_table_header = XPath(".//tr[{0}]/th".format(_xpath_has_class("topRow")))
+    _select_rows = XPath("(./tbody)[1]//tr")
+    _select_row_title = XPath("./td[{0}]".format(_xpath_has_class("rowTitle")))
+    _select_value_cells = XPath("./td[{0}]".format(_xpath_has_class("valueCell")))
+
+def _scrape_html_lxml(html):
+    """ Same as _scrape_html_bs4, but only the elements needed are located, by compiled XPath expressions over an lxml tree. """
+    if not html.strip():
+        raise IndexError("The html is empty.")
+
+    root = lxml_html.fromstring(html)
+
+    link = _select_canonical_link_href(root)[0]
+    symbol_prefix, timeframe, report_type = WSJ_URL_RE.match(link).groups()
+    logger.info("scraping html of {0} {1} {2}".format(symbol_prefix, timeframe, report_type))
+
+    tables = _select_tables(root)
+    table_header = _select_table_header(tables[0])
+
+    result = {
+        "symbol_prefix": symbol_prefix,
+        "timeframe": timeframe,
+        "report_type": report_type,
+        "top_remark": table_header[0].text_content(),
+        "data": [
+            ("periods", [e.text_content().strip() for e in table_header[1:-1]]),
+        ]
+    }
+
+    result["data"] += [
+        (_select_row_title(tr)[0].text_content().strip(), [e.text_content().strip() for e in _select_value_cells(tr)])
+        for tbl in tables for tr in _select_rows(tbl)
+    ]
+
+    return result
+
+SCRAPER_BACKENDS = {
+    "bs4": _scrape_html_bs4,
+    "lxml": _scrape_html_lxml,
+}
+
+DEFAULT_SCRAPER_BACKEND = "lxml" if lxml_html else "bs4"
+
+def _scrape_html(html, backend=None):
+    """ Extracts the relevant information from <html> string and returns it in a dictionary.
+        backend: name of the scraper in SCRAPER_BACKENDS, default: None - DEFAULT_SCRAPER_BACKEND.
+    """
+    return SCRAPER_BACKENDS[backend or DEFAULT_SCRAPER_BACKEND](html)
+
+def fetch_financial_data(symbol, timeframe, report_type):
+    """ Returns the html of the financial report page.
         symbol: e.g. "C6L.SI"
         timeframe: "annual" or "quarter"
         report_type: any string in FINANCIAL_REPORT_TYPES
@@ -74,8 +136,9 @@ def get_financial_data(symbol, timeframe, report_type):
     logger.info("getting {0} {1} data of {2}".format(timeframe, report_type, symbol))
 
     url = _get_report_url(symbol, timeframe, report_type)
-    html = strict_get(url, _test_for_not_found)
+    return strict_get(url, _test_for_not_found)
 
+def _parse_financial_data(html, symbol, timeframe, report_type, **preprocess_kwargs):
     try:
         raw_data = _scrape_html(html)
     except (IndexError, AttributeError, KeyError) as e:
@@ -85,10 +148,27 @@ def get_financial_data(symbol, timeframe, report_type):
         raise ScrapingError(msg) from e
 
     try:    # exception can only be triggered in transpose_items because preprocess returns a generator
-        items = preprocess(raw_data, symbol, timeframe, report_type)
+        items = preprocess(raw_data, symbol, timeframe, report_type, **preprocess_kwargs)
         return transpose_items(items)
     except (AssertionError, ValueError) as e:
         msg = "failed to preprocess the raw data of {0} {1} {2}".format(symbol, timeframe, report_type)
         logger.exception(e)
         logger.error(msg)
         raise PreprocessingError(msg) from e
+
+def parse_financial_data(html, symbol, timeframe, report_type):
+    """ Returns financial data parsed out from <html> of the financial report page, in a list of csv rows (tuples).
+        First row will be the headers.
+        symbol, timeframe, report_type: the parameters that were used to fetch <html>.
+        Values are parsed column by column (see preprocess), so a missing value is NaN.
+    """
+    return list(_parse_financial_data(html, symbol, timeframe, report_type, vectorized=True))
+
+def get_financial_data(symbol, timeframe, report_type):
+    """ Returns financial data in an iterator of csv rows (tuples). First row will be the headers.
+        symbol: e.g. "C6L.SI"
+        timeframe: "annual" or "quarter"
+        report_type: any string in FINANCIAL_REPORT_TYPES
+    """
+    html = fetch_financial_data(symbol, timeframe, report_type)
+    return _parse_financial_data(html, symbol, timeframe, report_type)
@@ -2,8 +2,7 @@ import logging
 
 import requests
 
-from fa.miner.http import strict_get
-from fa.miner.exceptions import GetError
+from fa.miner.http import concurrent_get, strict_get_lines
 
 
 logger = logging.getLogger(__name__)
@@ -25,9 +24,11 @@ def _get_abcdef(start_date, end_date):
         'endyear': end_date.year,
     }
 
-def get_historical_data(symbols, start_date, end_date):
+def get_historical_data(symbols, start_date, end_date, **kwargs):
     """ Returns {"symbol": "historical data in csv string"}:
         (blank string if there is an error.)
+        The data of all <symbols> are downloaded concurrently,
+        extra keyword arguments are passed on to fa.miner.http.concurrent_get.
 
         >>> get_historical_data(("C6L.SI", "ZZZZZZ",), datetime(2004, 3, 1), datetime(2014, 3, 1))
         {"C6L.SI": "...", "ZZZZZZ": ''}
@@ -35,15 +36,19 @@ def get_historical_data(symbols, start_date, end_date):
     logger.info("getting historical data of {0} from {1} to {2}".format(','.join(symbols), start_date, end_date))
     abcdef = _get_abcdef(start_date, end_date)
 
-    result = {}
-    for s in symbols:
-        url = HISTORICAL_DATA_API_URL_TEMPLATE.format(symbol=s, **abcdef)
-        try:
-            result[s] = strict_get(url)
-        except GetError:
-            result[s] = ''
+    urls = {s: HISTORICAL_DATA_API_URL_TEMPLATE.format(symbol=s, **abcdef) for s in symbols}
+    texts = concurrent_get(urls.values(), **kwargs)
 
-    return result
+    return {s: texts[url] or '' for s, url in urls.items()}
+
+def stream_historical_data(symbol, start_date, end_date, session=None):
+    """ Returns an iterator of lines of historical data of <symbol> in csv, read as they arrive,
+        raises GetError if there is an error.
+        session: an optional requests.Session object to send the request with, so that connections are reused.
+    """
+    logger.info("streaming historical data of {0} from {1} to {2}".format(symbol, start_date, end_date))
+    url = HISTORICAL_DATA_API_URL_TEMPLATE.format(symbol=symbol, **_get_abcdef(start_date, end_date))
+    return strict_get_lines(url, session=session)
 
 def _construct_yql(symbols, table, timeframe):
     full_symbols = '({0})'.format(','.join(map(repr, symbols)))
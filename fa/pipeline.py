@@ -0,0 +1,122 @@
+from concurrent.futures import ProcessPoolExecutor, wait
+from queue import Queue
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()    # end-of-stream marker put on the queues
+
+def _fetch_worker(args_iter, args_iter_lock, fetch, fetched_queue, stop_event):
+    """ Keeps taking arguments from <args_iter> and putting (args, fetched data, exception) on <fetched_queue>. """
+    while not stop_event.is_set():
+        with args_iter_lock:
+            args = next(args_iter, _DONE)
+
+        if args is _DONE:
+            break
+
+        try:
+            fetched, error = fetch(*args), None
+        except Exception as e:
+            fetched, error = None, e
+
+        fetched_queue.put((args, fetched, error))
+
+    fetched_queue.put(_DONE)
+
+def _parse_dispatcher(fetched_queue, parse, parse_executor, parsed_queue, no_of_fetch_workers, stop_event, errors):
+    """ Submits fetched data from <fetched_queue> to <parse_executor>
+        and puts (args, future of parsed data, exception) on <parsed_queue>.
+        Stops submitting once <stop_event> is set.
+        If it fails, e.g. because the pool is broken, the exception is appended to <errors> and the pipeline is stopped.
+    """
+    no_of_fetch_workers_done = 0
+
+    try:
+        while no_of_fetch_workers_done < no_of_fetch_workers and not stop_event.is_set():
+            entry = fetched_queue.get()
+
+            if entry is _DONE:
+                no_of_fetch_workers_done += 1
+                continue
+
+            args, fetched, error = entry
+            future = None if error else parse_executor.submit(parse, fetched, *args)
+            parsed_queue.put((args, future, error))
+    except BaseException as e:
+        errors.append(e)
+        stop_event.set()
+    finally:
+        parsed_queue.put(_DONE)
+
+    # drain the queue so that no fetch worker stays blocked on it
+    while no_of_fetch_workers_done < no_of_fetch_workers:
+        if fetched_queue.get() is _DONE:
+            no_of_fetch_workers_done += 1
+
+def run_pipeline(args_list, fetch, parse, store, skipped_exceptions=(), fetch_workers=8, parse_workers=None, queue_size=32):
+    """ Runs fetch -> parse -> store for every argument tuple in <args_list>, with the three stages overlapping:
+
+        fetch(*args) -> fetched data: I/O-bound stage, run in a pool of <fetch_workers> threads.
+        parse(fetched data, *args) -> parsed data: CPU-bound stage, run in a pool of <parse_workers> processes
+            (default: None - as many as CPUs), so it must be a module-level function with picklable arguments and result.
+        store(parsed data, *args): run in the calling thread only, so it can own e.g. the database connection.
+
+        The stages are connected by queues of size <queue_size>, so that a fast stage cannot run ahead of a slow one.
+        If fetch or parse raises an exception in <skipped_exceptions>, a warning is logged and the arguments are skipped.
+        Any other exception stops the pipeline and is re-raised.
+    """
+    args_iter = iter(args_list)
+    args_iter_lock = threading.Lock()
+    stop_event = threading.Event()
+    fetched_queue = Queue(queue_size)
+    parsed_queue = Queue(queue_size)
+    dispatcher_errors = []
+
+    parse_executor = ProcessPoolExecutor(parse_workers)
+
+    try:
+        # start the worker processes before any thread, as forking a multi-threaded process is unsafe
+        parse_executor.submit(int).result()
+
+        threads = [
+            threading.Thread(target=_fetch_worker, args=(args_iter, args_iter_lock, fetch, fetched_queue, stop_event))
+            for _ in range(fetch_workers)
+        ]
+        threads.append(threading.Thread(
+            target=_parse_dispatcher,
+            args=(fetched_queue, parse, parse_executor, parsed_queue, fetch_workers, stop_event, dispatcher_errors)
+        ))
+
+        for t in threads:
+            t.start()
+
+        try:
+            for args, future, error in iter(parsed_queue.get, _DONE):
+                try:
+                    if error:
+                        raise error
+
+                    parsed = future.result()
+                except skipped_exceptions as e:
+                    logger.warning("Could not get data with {0} due to {1}. Skip.".format(args, e.__class__.__name__))
+                    continue
+
+                store(parsed, *args)
+        except:
+            stop_event.set()
+
+            # drain the queue so that no worker stays blocked on it, and let the parses submitted finish:
+            # shutting down the pool with cancelled ones may never return
+            wait([entry[1] for entry in iter(parsed_queue.get, _DONE) if entry[1]])
+            raise
+        finally:
+            for t in threads:
+                t.join()
+    finally:
+        parse_executor.shutdown()
+
+    if dispatcher_errors:
+        raise dispatcher_errors[0]
@@ -1,5 +1,6 @@
 import csv
 from io import StringIO
+from itertools import islice
 
 from fa.util import to_pythonic_name
 
@@ -27,3 +28,22 @@ def csv_string_to_records(symbol, csv_string, **kwargs):
     """
     reader = csv.reader(StringIO(csv_string), **kwargs)
     yield from csv_rows_to_records(symbol, reader)
+
+def csv_lines_to_column_chunks(lines, chunk_size=1024, **kwargs):
+    """ Returns a generator of {key: list of values} of every <chunk_size> rows in <lines>,
+        the keys being the pythonic version of column names, so that rows are parsed as they come
+        and no map is created per row.
+
+        lines: an iterable of csv lines (strings), first line must be headers,
+        chunk_size: number of rows per chunk, default: 1024,
+        extra keyword arguments are passed on to Reader.
+    """
+    reader = csv.reader(lines, **kwargs)
+    headers = next(reader, None)
+
+    if headers is None:
+        return
+
+    keys = [to_pythonic_name(verbose_name) for verbose_name in headers]
+    for rows in iter(lambda: list(islice(reader, chunk_size)), []):
+        yield dict(zip(keys, map(list, zip(*rows))))
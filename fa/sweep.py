@@ -0,0 +1,90 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import os
+import os.path
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from fa.util import partition
+
+
+# {directory: {name: array}} of arrays shared with the calling process, loaded once per worker process
+_shared_arrays = {}
+
+def _share_arrays(arrays, directory):
+    """ Saves <arrays> ({name: numpy array}) into <directory>, one .npy file per array. """
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, name + ".npy"), np.asarray(array))
+
+def _load_shared_arrays(directory):
+    """ Returns {name: read-only memory-mapped array} of arrays saved into <directory> by _share_arrays.
+        The memory maps are backed by the same pages of the OS page cache in every process.
+    """
+    if directory not in _shared_arrays:
+        _shared_arrays[directory] = {
+            name[:-len(".npy")]: np.load(os.path.join(directory, name), mmap_mode='r')
+            for name in os.listdir(directory)
+        }
+
+    return _shared_arrays[directory]
+
+def _run_studies(study, directory, params_list):
+    """ Runs in a worker process: returns results of <study> with shared arrays in <directory> and each of <params_list> """
+    arrays = _load_shared_arrays(directory)
+    return [study(arrays, **params) for params in params_list]
+
+def get_grid(grid):
+    """ Returns a list of dicts of parameters, one for every combination of values in <grid> ({name: values}).
+
+        >>> get_grid({"a": [1, 2], "b": [3]})
+        [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*[grid[name] for name in names])]
+
+def _to_frame(params_list, results, names):
+    """ Returns a DataFrame object of <results>, each result as rows prefixed with columns of its parameters """
+    frames = []
+
+    for params, result in zip(params_list, results):
+        frame = result.reset_index() if isinstance(result, pd.DataFrame) else pd.DataFrame([result])
+
+        for i, name in enumerate(names):
+            frame.insert(i, name, [params[name]] * len(frame))
+
+        frames.append(frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+def run_sweep(study, grid, arrays, max_workers=None, batch_size=None):
+    """ Runs study(arrays, **params) for every combination of parameters in <grid> ({name: values}),
+        in a pool of <max_workers> processes (default: None - as many as CPUs), and returns the results in
+        one DataFrame object, with a column for each parameter followed by the columns of the result.
+
+        study: a module-level function (so that it can be sent to the workers) returning a dict (one row)
+            or a DataFrame object (its rows, with its index as columns), e.g. fa.backtest.study_valuation.
+        arrays: {name: numpy array} of data needed by every study, e.g. from fa.backtest.to_arrays.
+            They are written to memory-mapped files once and mapped by the workers, instead of being pickled
+            for every task, so the study gets read-only arrays.
+        batch_size: number of combinations sent to a worker at a time,
+            default: None - about 4 batches per worker.
+    """
+    params_list = get_grid(grid)
+    max_workers = max_workers or os.cpu_count() or 1
+    batch_size = batch_size or max(1, -(-len(params_list) // (max_workers * 4)))
+
+    directory = tempfile.mkdtemp(prefix="fa-sweep-")
+
+    try:
+        _share_arrays(arrays, directory)
+
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(_run_studies, study, directory, batch) for batch in partition(params_list, batch_size)]
+            results = [result for future in futures for result in future.result()]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return _to_frame(params_list, results, list(grid))
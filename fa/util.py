@@ -5,8 +5,10 @@ import re
 def transpose_items(items):
     """ >>> list(transpose_items((("foo", [1, 2, 3]), ("bar", [4, 5, 6]))))
         [('foo', 'bar'), (1, 4), (2, 5), (3, 6)]
+
+        the values of an item can be any sequence, e.g. a list or a numpy array
     """
-    columns = ([column_name] + values for column_name, values in items)
+    columns = ([column_name] + list(values) for column_name, values in items)
     return zip(*columns)
 
 def to_pythonic_name(verbose_name):
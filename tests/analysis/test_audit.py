@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from fa.analysis import audit
+from fa.database import query
+from fa.database.models import *
+from tests.util import DBTestCase
+
+
+class TestAudit(DBTestCase):
+    def tearDown(self):
+        query.delete_all()
+
+    def test_scan_frame(self):
+        index = pd.MultiIndex.from_tuples([
+            ("C6L.SI", datetime(2012, 12, 20)),
+            ("C6L.SI", datetime(2012, 12, 21)),
+            ("C6L.SI", datetime(2012, 12, 31)),
+        ], names=["Symbol", "Date"])
+        df = pd.DataFrame({"Volume": [6860, np.nan, 7850]}, index=index)
+
+        result = audit.scan_frame("price", df, {"missing_date": np.timedelta64(7, 'D'), "missing_value": None})
+
+        self.assertEqual(result, [
+            {"symbol_obj": "C6L.SI", "data_type": "price", "check": "missing_date", "date": datetime(2012, 12, 31), "column": None},
+            {"symbol_obj": "C6L.SI", "data_type": "price", "check": "missing_value", "date": datetime(2012, 12, 21), "column": "Volume"},
+        ])
+
+    def test_scan_database(self):
+        start = datetime(2012, 1, 1)
+
+        with db.transaction():
+            for symbol, spike in (("C6L.SI", 1000), ("J7X.SI", 1)):
+                Symbol.create(symbol=symbol)
+                Price.insert_many(
+                    {"symbol_obj": symbol, "date": start + timedelta(days=i), "open": 1, "high": 1, "low": 1, "close": 1,
+                     "volume": spike if i == 50 else 1, "adj_close": 1}
+                    for i in range(100)
+                ).execute()
+
+        checks = {"price": {"outlier": 6}}
+        no_of_findings = audit.scan_database(checks=checks, chunk_size=1, max_workers=1)
+
+        self.assertEqual(no_of_findings, 1)
+        result = list(QualityFinding.select().dicts())
+        self.assertEqual(len(result), 1)
+        self.assertEqual(
+            (result[0]["symbol_obj"], result[0]["check"], result[0]["date"], result[0]["column"]),
+            ("C6L.SI", "outlier", start + timedelta(days=50), "Volume")
+        )
+
+        # findings are replaced on the next scan
+        audit.scan_database(checks=checks, symbols=["C6L.SI"], max_workers=1)
+        self.assertEqual(QualityFinding.select().count(), 1)
+
+    def test_find_bad_ticks(self):
+        start = datetime(2012, 1, 1)
+        prices = np.linspace(10, 20, 200)
+        prices[120] = 100
+
+        Symbol.create(symbol="C6L.SI")
+        Price.insert_many(
+            {"symbol_obj": "C6L.SI", "date": start + timedelta(days=i), "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1, "adj_close": p}
+            for i, p in enumerate(prices)
+        ).execute()
+
+        # the spike is met by a jump up then a jump down
+        for chunk_size in (7, 1000):
+            result = audit.find_bad_ticks("C6L.SI", window=20, chunk_size=chunk_size)
+            self.assertEqual([(r["date"], r["column"]) for r in result], [
+                (start + timedelta(days=119), "Adj Close"),
+                (start + timedelta(days=120), "Adj Close"),
+            ])
+
+if __name__ == "__main__":
+    unittest.main()
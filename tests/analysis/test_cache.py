@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+from fa.analysis import cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get(self):
+        lru_cache = cache.LRUCache(2)
+        create = MagicMock(side_effect=["a", "b", "c"])
+
+        self.assertEqual(lru_cache.get(1, create), "a")
+        self.assertEqual(lru_cache.get(1, create), "a")
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(lru_cache.info(), cache.CacheInfo(hits=1, misses=1, maxsize=2, currsize=1))
+
+    def test_get_unhashable_key(self):
+        lru_cache = cache.LRUCache(2)
+        create = MagicMock(side_effect=["a", "b"])
+
+        self.assertEqual(lru_cache.get((1, [2]), create), "a")
+        self.assertEqual(lru_cache.get((1, [2]), create), "b")
+        self.assertEqual(lru_cache.info(), cache.CacheInfo(hits=0, misses=2, maxsize=2, currsize=0))
+
+    def test_get_eviction(self):
+        lru_cache = cache.LRUCache(2)
+
+        lru_cache.get(1, lambda: "a")
+        lru_cache.get(2, lambda: "b")
+        lru_cache.get(1, lambda: "x")   # 1 becomes the most recently used
+        lru_cache.get(3, lambda: "c")   # 2 is discarded
+
+        self.assertEqual(lru_cache.get(1, lambda: "y"), "a")
+        self.assertEqual(lru_cache.get(2, lambda: "z"), "z")
+        self.assertEqual(lru_cache.info().currsize, 2)
+
+    def test_invalidate_clear(self):
+        lru_cache = cache.LRUCache(10)
+        for i in range(5):
+            lru_cache.get(i, lambda: i)
+
+        lru_cache.invalidate(lambda key: key % 2 == 0)
+        self.assertEqual(lru_cache.info().currsize, 2)
+        self.assertEqual(lru_cache.get(1, lambda: None), 1)
+        self.assertEqual(lru_cache.get(2, lambda: None), None)
+
+        lru_cache.clear()
+        self.assertEqual(lru_cache.info(), cache.CacheInfo(hits=0, misses=0, maxsize=10, currsize=0))
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        cache.frame_cache.clear()
+        cache.metric_cache.clear()
+        self.addCleanup(cache.frame_cache.clear)
+        self.addCleanup(cache.metric_cache.clear)
+
+    def test_load_fundamental_data(self):
+        markers = {"price": datetime(2014, 12, 15)}
+        mock_load = MagicMock(side_effect=["df1", "df2", "df3"])
+
+        with patch("fa.analysis.cache.query.get_update_markers", MagicMock(side_effect=lambda s: markers)), \
+             patch("fa.analysis.cache.io.load_fundamental_data", mock_load):
+
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", ["Close"]), "df1")
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", ["Close"]), "df1")
+            mock_load.assert_called_once_with("price", "C6L.SI", ["Close"])
+
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", ["Close"], fast=True), "df2")
+
+            markers["price"] = datetime(2014, 12, 16)
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", ["Close"]), "df3")
+
+        self.assertEqual(cache.frame_cache.info().hits, 1)
+
+    def test_load_fundamental_data_unhashable_kwargs(self):
+        mock_load = MagicMock(side_effect=["df1", "df2"])
+
+        with patch("fa.analysis.cache.query.get_update_markers", MagicMock(return_value={})), \
+             patch("fa.analysis.cache.io.load_fundamental_data", mock_load):
+
+            # loaded without the cache
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", storage=["database"]), "df1")
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI", storage=["database"]), "df2")
+
+    def test_get_metric_uncomparable_keys(self):
+        with patch("fa.analysis.cache.query.get_update_markers", MagicMock(return_value={"price": None, 1: None})):
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (), {}, lambda: "m1"), "m1")
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (), {}, lambda: "m2"), "m1")
+
+    def test_invalidation_on_update(self):
+        with patch("fa.analysis.cache.query.get_update_markers", MagicMock(return_value={})), \
+             patch("fa.analysis.cache.io.load_fundamental_data", MagicMock(side_effect=["df1", "df2", "df3"])):
+
+            cache.load_fundamental_data("price", "C6L.SI")
+            cache.load_fundamental_data("price", "J7X.SI")
+            cache.get_metric(object, "C6L.SI", (), {}, lambda: "metric")
+
+            for listener in cache.query.update_listeners:
+                listener("price", "C6L.SI")
+
+            self.assertEqual(cache.load_fundamental_data("price", "C6L.SI"), "df3")
+            self.assertEqual(cache.load_fundamental_data("price", "J7X.SI"), "df2")
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (), {}, lambda: "new metric"), "new metric")
+
+    def test_get_metric(self):
+        markers = {"price": datetime(2014, 12, 15), "cash_flow": None}
+
+        with patch("fa.analysis.cache.query.get_update_markers", MagicMock(side_effect=lambda s: markers)):
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (1,), {'b': 2}, lambda: "m1"), "m1")
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (1,), {'b': 2}, lambda: "m2"), "m1")
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (1,), {'b': 3}, lambda: "m3"), "m3")
+
+            markers["cash_flow"] = datetime(2014, 12, 15)
+            self.assertEqual(cache.get_metric(object, "C6L.SI", (1,), {'b': 2}, lambda: "m4"), "m4")
+
+if __name__ == "__main__":
+    unittest.main()
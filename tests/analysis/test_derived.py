@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from fa.analysis import derived
+from fa.analysis.finance import calc_derived_metrics
+from fa.database import query
+from fa.database.models import *
+from tests.util import DBTestCase
+
+
+class TestDerived(DBTestCase):
+    def tearDown(self):
+        query.delete_all()
+
+    def setUp(self):
+        with db.transaction():
+            for symbol in ("C6L.SI", "J7X.SI"):
+                Symbol.create(symbol=symbol, price_updated_at=datetime(2014, 12, 15))
+                Price.insert_many(
+                    {"symbol_obj": symbol, "date": datetime(2012, 1, 1) + timedelta(days=i), "open": 1, "high": 1, "low": 1,
+                     "close": 1, "volume": 1, "adj_close": 10 + i}
+                    for i in range(100)
+                ).execute()
+                IncomeStatement.create(symbol_obj=symbol, date=datetime(2011, 12, 31), sales_revenue=100, net_income=10, eps_basic_=2)
+
+    def test_refresh_derived_metrics(self):
+        self.assertEqual(derived.refresh_derived_metrics(chunk_size=1), ["C6L.SI", "J7X.SI"])
+
+        # released 30 days after the date of report, at price 10 + 29
+        result = list(DerivedMetric.select(DerivedMetric.symbol_obj, DerivedMetric.date, DerivedMetric.p_e_ratio, DerivedMetric.net_profit_margin).tuples())
+        self.assertEqual(result, [
+            ("C6L.SI", datetime(2012, 1, 30), 19.5, 0.1),
+            ("J7X.SI", datetime(2012, 1, 30), 19.5, 0.1),
+        ])
+
+    def test_refresh_derived_metrics_incrementally(self):
+        derived.refresh_derived_metrics()
+
+        with patch("fa.analysis.derived.calc_derived_metrics", wraps=calc_derived_metrics) as mock_calc_derived_metrics:
+            self.assertEqual(derived.refresh_derived_metrics(), [])
+            self.assertFalse(mock_calc_derived_metrics.called)
+
+            # an update of income statements of one symbol
+            records = [{"symbol_obj": "J7X.SI", "date": datetime(2011, 12, 31), "sales_revenue": 100, "net_income": 20, "eps_basic_": 2}]
+            query.update_fundamentals("income_statement", "J7X.SI", records, datetime(2014, 12, 16), delete_old=True)
+
+            self.assertEqual(derived.refresh_derived_metrics(), ["J7X.SI"])
+            self.assertEqual(mock_calc_derived_metrics.call_count, 1)
+
+        result = list(DerivedMetric.select(DerivedMetric.symbol_obj, DerivedMetric.net_profit_margin).tuples())
+        self.assertEqual(result, [("C6L.SI", 0.1), ("J7X.SI", 0.2)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,7 +4,7 @@ from unittest.mock import patch, MagicMock, call
 import pandas as pd
 import numpy as np
 
-from fa.analysis.finance import Metric, DatedMetric
+from fa.analysis.finance import Metric, DatedMetric, BatchedDatedMetric, UniverseMetric, join_as_of, calc_derived_metrics
 from tests.util import PandasTestCase
 
 
@@ -26,6 +26,41 @@ class TestMetric(PandasTestCase):
 
         self.assertIsInstance(obj, Metric)
 
+    def test_from_cached_archive(self):
+        fake_load = lambda data_type, symbol: data_type[0]
+        fake_get_metric = lambda cls, symbol, args, kwargs, create: create()
+
+        with patch("fa.analysis.finance.cache.load_fundamental_data", MagicMock(side_effect=fake_load)) as mock_load, \
+             patch("fa.analysis.finance.cache.get_metric", MagicMock(side_effect=fake_get_metric)) as mock_get_metric, \
+             patch("fa.analysis.finance.Metric.__init__", MagicMock(return_value=None)) as mock_constructor:
+
+            obj = Metric.from_cached_archive("C6L.SI", 1, b=2)
+
+            self.assertEqual(mock_load.call_count, 4)
+            self.assertEqual(mock_get_metric.call_args[0][:4], (Metric, "C6L.SI", (1,), {'b': 2}))
+            mock_constructor.assert_called_once_with(1, b=2, historical='p', balance_sheet='b', cash_flow='c', income_statement='i')
+
+        self.assertIsInstance(obj, Metric)
+
+    def test_from_archive_of_symbols(self):
+        fake_load = lambda data_type, symbols: data_type
+        fake_split = lambda data_type, symbols: {s: data_type[0] + s for s in symbols}
+
+        with patch("fa.analysis.finance.load_fundamental_data_of_symbols", MagicMock(side_effect=fake_load)) as mock_load, \
+             patch("fa.analysis.finance.split_by_symbol", MagicMock(side_effect=fake_split)), \
+             patch("fa.analysis.finance.Metric.__init__", MagicMock(return_value=None)) as mock_constructor:
+
+            metrics = Metric.from_archive_of_symbols(["C6L.SI", "J7X.SI"], 1, b=2)
+
+            self.assertEqual(mock_load.call_count, 4)
+            mock_constructor.assert_has_calls([
+                call(1, b=2, historical='pC6L.SI', balance_sheet='bC6L.SI', cash_flow='cC6L.SI', income_statement='iC6L.SI'),
+                call(1, b=2, historical='pJ7X.SI', balance_sheet='bJ7X.SI', cash_flow='cJ7X.SI', income_statement='iJ7X.SI'),
+            ])
+
+        self.assertEqual(list(metrics), ["C6L.SI", "J7X.SI"])
+        self.assertIsInstance(metrics["C6L.SI"], Metric)
+
     def test_at(self):
         # make up some fake data for testing attribute transfer
         data = lambda: {'d': np.random.randn(3)}
@@ -45,6 +80,18 @@ class TestMetric(PandasTestCase):
         self.assertEqual(other_attributes, vars(metric))
         self.assertIsInstance(obj, DatedMetric)
 
+    def test_at_dates(self):
+        index = pd.date_range("2012-01-01", periods=3)
+        metric = Metric(historical=pd.DataFrame({'d': np.random.randn(3)}, index=index))
+
+        obj = metric.at_dates(index)
+
+        self.assertTrue(obj.dates.equals(index))
+        other_attributes = {k: v for k, v in vars(obj).items() if k not in ("dates", "as_of")}
+        self.assertEqual(other_attributes.keys(), vars(metric).keys())
+        self.assertIs(obj.historical, metric.historical)
+        self.assertIsInstance(obj, BatchedDatedMetric)
+
     def test_calc_return(self):
         historical_data = {"Adj Close": [3.0, 3.5, 4.2], "Close": [3.0, 5.0, 4.2]}
         historical_index = pd.date_range("2012-01-01", periods=3, freq='2D')
@@ -56,6 +103,9 @@ class TestMetric(PandasTestCase):
         self.assertAlmostEqual(ret1, 0.2)
         self.assertAlmostEqual(ret2, -0.16)
 
+        # no price available on or after the date
+        self.assertRaises(KeyError, metric.calc_return, pd.Timestamp("2012-01-02"), pd.Timestamp("2012-01-06"))
+
     def test_calc_annual_return(self):
         historical_data = {"Adj Close": [3.0, 3.5, 4.2], "Close": [3.0, 5.0, 4.2]}
         historical_index = pd.date_range("2012-01-01", periods=3, freq='2D')
@@ -88,6 +138,22 @@ class TestMetric(PandasTestCase):
         self.assertFrameEqual(pe_ratios1, pd.Series([2.5, 1.4, 1], index=expected_index))
         self.assertFrameEqual(pe_ratios2, pd.Series([0.5, 1.25, 0.625], index=expected_index))
 
+    def test_calc_pe_ratio__out_of_range(self):
+        historical_data = {"Adj Close": [3.0, 3.5]}
+        historical_index = pd.to_datetime(["2012-01-02", "2012-01-03"])
+
+        income_statement_data = {"EPS (Basic)": [1.2, 2.5, 3.5]}
+        income_statement_index = pd.to_datetime(["2011-12-31", "2012-01-01", "2012-01-02"])
+
+        metric = Metric(
+            historical=pd.DataFrame(historical_data, index=historical_index),
+            income_statement=pd.DataFrame(income_statement_data, index=income_statement_index),
+            financial_report_preparation_lag=np.timedelta64(1, 'D')
+        )
+
+        expected_index = pd.to_datetime(["2012-01-01", "2012-01-02", "2012-01-03"])
+        self.assertFrameEqual(metric.calc_pe_ratio(), pd.Series([np.nan, 1.2, 1.0], index=expected_index))
+
     def test_calc_profit_margin(self):
         income_statement_data = {
             "Gross Income": [62, 50, 36],
@@ -202,5 +268,284 @@ class TestDatedMetric(unittest.TestCase):
         # because of 1 day financial_report_preparation_lag
         self.assertEqual(debt_ratio, 0.68)
 
+class TestBatchedDatedMetric(PandasTestCase):
+    def setUp(self):
+        historical_data = {"Adj Close": [3.0, 3.5, 4.2], "Close": [3.0, 5.0, 4.2]}
+        historical_index = pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-05"])
+
+        income_statement_data = {
+            "EPS (Basic)": [1.2, 2.5, 3.5],
+            "Gross Income": [62, 50, 36],
+            "Sales/Revenue": [3.1, 2.0, 1.2]
+        }
+        balance_sheet_data = {"Total Liabilities / Total Assets": [0.69, 0.68, 0.67]}
+        report_index = pd.to_datetime(["2012-01-01", "2012-01-02", "2012-01-03"])
+
+        self.kwargs = {
+            "historical": pd.DataFrame(historical_data, index=historical_index),
+            "income_statement": pd.DataFrame(income_statement_data, index=report_index),
+            "balance_sheet": pd.DataFrame(balance_sheet_data, index=report_index),
+            "financial_report_preparation_lag": np.timedelta64(1, 'D'),
+        }
+        self.dates = pd.to_datetime(["2012-01-02", "2012-01-03", "2012-01-04"])
+        self.batched_dated_metric = BatchedDatedMetric(self.dates, **self.kwargs)
+
+    def assertSameAsDatedMetric(self, result, calc):
+        """ verify that <result> is what calc(DatedMetric object) gives at each date """
+        self.assertEqual(list(result.index), list(self.dates))
+
+        for date, value in result.items():
+            self.assertAlmostEqual(value, calc(DatedMetric(date, **self.kwargs)))
+
+    def test_calc_return(self):
+        sell_date = pd.Timestamp("2012-01-05")
+
+        ret = self.batched_dated_metric.calc_return(sell_date, "Close")
+        self.assertSameAsDatedMetric(ret, lambda dm: dm.calc_return(sell_date, "Close"))
+
+        # no price available on or after the sell date
+        ret = self.batched_dated_metric.calc_return(pd.to_datetime(["2012-01-05", "2012-01-05", "2012-01-06"]))
+        self.assertTrue(np.isnan(ret.iat[2]))
+
+    def test_calc_annual_return(self):
+        sell_date = pd.Timestamp("2012-01-05")
+
+        annual_return = self.batched_dated_metric.calc_annual_return(sell_date)
+        self.assertSameAsDatedMetric(annual_return, lambda dm: dm.calc_annual_return(sell_date))
+
+    def test_calc_pe_ratio(self):
+        pe_ratios = self.batched_dated_metric.calc_pe_ratio()
+        self.assertSameAsDatedMetric(pe_ratios, lambda dm: dm.calc_pe_ratio())
+
+    def test_calc_profit_margin(self):
+        gross_profit_margin = self.batched_dated_metric.calc_profit_margin("gross")
+        self.assertSameAsDatedMetric(gross_profit_margin, lambda dm: dm.calc_profit_margin("gross"))
+
+    def test_calc_debt_to_asset_ratio(self):
+        debt_ratio = self.batched_dated_metric.calc_debt_to_asset_ratio()
+        self.assertSameAsDatedMetric(debt_ratio, lambda dm: dm.calc_debt_to_asset_ratio())
+
+    def test_no_report(self):
+        batched_dated_metric = BatchedDatedMetric(pd.to_datetime(["2012-01-01", "2012-01-03"]), **self.kwargs)
+
+        self.assertEqual(list(batched_dated_metric.calc_pe_ratio().isnull()), [True, False])
+        self.assertEqual(list(batched_dated_metric.calc_debt_to_asset_ratio().isnull()), [True, False])
+
+    def test_as_of(self):
+        dates = pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-09"])
+        batched_dated_metric = BatchedDatedMetric(dates, as_of=True, **self.kwargs)
+
+        # the latest reports known at the dates, released on 2012-01-02, 2012-01-03 and 2012-01-04
+        self.assertFrameEqual(batched_dated_metric.calc_debt_to_asset_ratio(), pd.Series([np.nan, 0.68, 0.67], index=dates))
+        self.assertFrameEqual(batched_dated_metric.calc_pe_ratio(), pd.Series([np.nan, 1.4, np.nan], index=dates))
+
+class TestJoinAsOf(PandasTestCase):
+    def test_join_as_of(self):
+        frame = pd.DataFrame(
+            {"a": [1.0, 2.0, 3.0]},
+            index=pd.DatetimeIndex(pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-05"]), name="Date")
+        )
+        dates = pd.to_datetime(["2011-12-31", "2012-01-03", "2012-01-04", "2012-01-09"])
+
+        result = join_as_of(frame, dates)
+        expected = pd.DataFrame({"a": [np.nan, 2.0, 2.0, 3.0]}, index=pd.DatetimeIndex(dates, name="Date"))
+        self.assertFrameEqual(result, expected)
+
+        result = join_as_of(frame, dates, lag=np.timedelta64(1, 'D'))
+        expected = pd.DataFrame({"a": [np.nan, 1.0, 2.0, 3.0]}, index=pd.DatetimeIndex(dates, name="Date"))
+        self.assertFrameEqual(result, expected)
+
+    def test_join_as_of__symbols(self):
+        index = pd.MultiIndex.from_arrays(
+            [["C6L.SI", "C6L.SI", "J7X.SI"], pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-02"])],
+            names=["Symbol", "Date"]
+        )
+        frame = pd.DataFrame({"a": [1.0, 2.0, 3.0], "b": [4.0, 5.0, 6.0]}, index=index)
+
+        symbols = ["C6L.SI", "J7X.SI", "J7X.SI", "Z74.SI"]
+        dates = pd.to_datetime(["2012-01-04", "2012-01-01", "2012-01-02", "2012-01-02"])
+
+        result = join_as_of(frame, dates, symbols)
+        expected_index = pd.MultiIndex.from_arrays([symbols, dates], names=["Symbol", "Date"])
+        expected = pd.DataFrame({"a": [2.0, np.nan, 3.0, np.nan], "b": [5.0, np.nan, 6.0, np.nan]}, index=expected_index)
+        self.assertFrameEqual(result, expected)
+
+class TestCalcDerivedMetrics(PandasTestCase):
+    def test_calc_derived_metrics(self):
+        long_frame = lambda data, index: pd.DataFrame(
+            data, index=pd.MultiIndex.from_tuples([(s, pd.Timestamp(d)) for s, d in index], names=["Symbol", "Date"])
+        )
+
+        historical = long_frame({"Adj Close": [3.0, 3.5, 2.0]}, [("C6L.SI", "2012-01-01"), ("C6L.SI", "2012-01-03"), ("J7X.SI", "2012-01-02")])
+        income_statement = long_frame({
+            "EPS (Basic)": [1.0, 0.5, 2.0],
+            "Sales/Revenue": [10.0, 12.0, 0.0],
+            "Gross Income": [5.0, 3.0, 1.0],
+            "Operating Income": [4.0, 2.0, 1.0],
+            "Pretax Income": [3.0, 1.5, 1.0],
+            "Net Income": [2.0, 1.2, 1.0],
+        }, [("C6L.SI", "2011-12-31"), ("C6L.SI", "2012-01-01"), ("J7X.SI", "2011-12-31")])
+        balance_sheet = long_frame({"Total Liabilities / Total Assets": [0.69]}, [("J7X.SI", "2012-01-01")])
+
+        result = calc_derived_metrics(historical, balance_sheet, income_statement, np.timedelta64(2, 'D'))
+
+        # released 2 days after the date of report
+        self.assertEqual(list(result.index), [
+            ("C6L.SI", pd.Timestamp("2012-01-02")),
+            ("C6L.SI", pd.Timestamp("2012-01-03")),
+            ("J7X.SI", pd.Timestamp("2012-01-02")),
+            ("J7X.SI", pd.Timestamp("2012-01-03")),
+        ])
+        np.testing.assert_allclose(result["P/E Ratio"].values, [3.0, 7.0, 1.0, np.nan])
+        np.testing.assert_allclose(result["Gross Profit Margin"].values, [0.5, 0.25, np.nan, np.nan])
+        np.testing.assert_allclose(result["Net Profit Margin"].values, [0.2, 0.1, np.nan, np.nan])
+        np.testing.assert_allclose(result["Debt/Asset Ratio"].values, [np.nan, np.nan, np.nan, 0.69])
+        np.testing.assert_allclose(result["Sales/Revenue Growth"].values, [np.nan, 0.2, np.nan, np.nan])
+        np.testing.assert_allclose(result["EPS (Basic) Growth"].values, [np.nan, -0.5, np.nan, np.nan])
+
+        # the same as Metric
+        metric = Metric(
+            historical=historical.loc["C6L.SI"],
+            income_statement=income_statement.loc["C6L.SI"],
+            financial_report_preparation_lag=np.timedelta64(2, 'D')
+        )
+        np.testing.assert_allclose(result.loc["C6L.SI"]["P/E Ratio"].values, metric.calc_pe_ratio().values)
+
+    def test_calc_derived_metrics__no_data(self):
+        # as returned by load_fundamental_data_of_symbols without records
+        empty_frame = lambda columns: pd.DataFrame(
+            index=pd.MultiIndex.from_arrays([pd.Index([], dtype=object), pd.DatetimeIndex([])], names=["Symbol", "Date"]),
+            columns=columns, dtype=np.float64
+        )
+        income_statement_columns = ["EPS (Basic)", "Sales/Revenue", "Gross Income", "Operating Income", "Pretax Income", "Net Income"]
+
+        historical = pd.DataFrame(
+            {"Adj Close": [3.0]},
+            index=pd.MultiIndex.from_tuples([("C6L.SI", pd.Timestamp("2012-01-01"))], names=["Symbol", "Date"])
+        )
+        income_statement = pd.DataFrame(
+            [[1.0, 10.0, 5.0, 4.0, 3.0, 2.0]], columns=income_statement_columns,
+            index=pd.MultiIndex.from_tuples([("C6L.SI", pd.Timestamp("2011-12-31"))], names=["Symbol", "Date"])
+        )
+        balance_sheet = empty_frame(["Total Liabilities / Total Assets"])
+
+        result = calc_derived_metrics(historical, balance_sheet, income_statement, np.timedelta64(1, 'D'))
+        self.assertEqual(list(result.index), [("C6L.SI", pd.Timestamp("2012-01-01"))])
+        np.testing.assert_allclose(result["P/E Ratio"].values, [3.0])
+        self.assertTrue(result["Debt/Asset Ratio"].isnull().all())
+
+        result = calc_derived_metrics(empty_frame(["Adj Close"]), balance_sheet, empty_frame(income_statement_columns))
+        self.assertEqual(len(result), 0)
+        self.assertEqual(list(result.index.names), ["Symbol", "Date"])
+
+class TestUniverseMetric(PandasTestCase):
+    def setUp(self):
+        self.historical = {
+            "C6L.SI": pd.DataFrame(
+                {"Adj Close": [3.0, 3.5, 4.2], "Close": [3.0, 5.0, 4.2]},
+                index=pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-05"])
+            ),
+            "J7X.SI": pd.DataFrame(
+                {"Adj Close": [1.0, np.nan, 2.0, 2.5], "Close": [1.0, 1.5, 2.0, 2.5]},
+                index=pd.to_datetime(["2012-01-02", "2012-01-03", "2012-01-04", "2012-01-08"])
+            ),
+        }
+        self.income_statement = {
+            "C6L.SI": pd.DataFrame(
+                {"EPS (Basic)": [1.2, 2.5, 3.5], "Gross Income": [62, 50, 36], "Sales/Revenue": [3.1, 2.0, 1.2]},
+                index=pd.to_datetime(["2012-01-01", "2012-01-02", "2012-01-03"])
+            ),
+            "J7X.SI": pd.DataFrame(
+                {"EPS (Basic)": [2.0, 4.0], "Gross Income": [3.0, 6.0], "Sales/Revenue": [1.0, 1.5]},
+                index=pd.to_datetime(["2012-01-02", "2012-01-06"])
+            ),
+        }
+        self.balance_sheet = {
+            "J7X.SI": pd.DataFrame(
+                {"Total Liabilities / Total Assets": [0.69, 0.68]},
+                index=pd.to_datetime(["2012-01-01", "2012-01-02"])
+            ),
+        }
+        self.symbols = ["C6L.SI", "J7X.SI", "Z74.SI"]
+
+        concat = lambda frames: pd.concat(frames, names=["Symbol", "Date"])
+        self.universe_metric = UniverseMetric(
+            self.symbols,
+            historical=concat(self.historical),
+            income_statement=concat(self.income_statement),
+            balance_sheet=concat(self.balance_sheet),
+            financial_report_preparation_lag=np.timedelta64(1, 'D')
+        )
+
+    def get_metric(self, symbol):
+        return Metric(
+            historical=self.historical[symbol],
+            income_statement=self.income_statement[symbol],
+            financial_report_preparation_lag=np.timedelta64(1, 'D')
+        )
+
+    def test_from_archive(self):
+        with patch("fa.analysis.finance.load_fundamental_data_of_symbols", MagicMock(side_effect=lambda t, s: t[0])) as mock_load, \
+             patch("fa.analysis.finance.UniverseMetric.__init__", MagicMock(return_value=None)) as mock_constructor:
+
+            obj = UniverseMetric.from_archive(["C6L.SI"], 1, b=2)
+
+            mock_load.assert_any_call("price", ["C6L.SI"])
+            mock_constructor.assert_called_once_with(["C6L.SI"], 1, b=2, historical='p', balance_sheet='b', cash_flow='c', income_statement='i')
+
+        self.assertIsInstance(obj, UniverseMetric)
+
+    def test_calc_return(self):
+        ret = self.universe_metric.calc_return(pd.Timestamp("2012-01-02"), pd.Timestamp("2012-01-04"))
+
+        for symbol in ("C6L.SI", "J7X.SI"):
+            expected = self.get_metric(symbol).calc_return(pd.Timestamp("2012-01-02"), pd.Timestamp("2012-01-04"))
+            self.assertAlmostEqual(ret[symbol], expected)
+
+        # no data at all
+        self.assertTrue(np.isnan(ret["Z74.SI"]))
+
+        # no price available on or after the sell date
+        ret = self.universe_metric.calc_return(pd.Timestamp("2012-01-02"), pd.Timestamp("2012-01-06"), "Close")
+        self.assertTrue(np.isnan(ret["C6L.SI"]))
+        self.assertAlmostEqual(ret["J7X.SI"], 1.5)
+
+    def test_calc_annual_return(self):
+        buy_dates = pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-03"])
+        annual_return = self.universe_metric.calc_annual_return(buy_dates, pd.Timestamp("2012-01-05"), "Close")
+
+        for symbol, buy_date in zip(("C6L.SI", "J7X.SI"), buy_dates):
+            expected = self.get_metric(symbol).calc_annual_return(buy_date, pd.Timestamp("2012-01-05"), "Close")
+            self.assertAlmostEqual(annual_return[symbol], expected)
+
+        self.assertEqual(list(annual_return.index), self.symbols)
+
+    def test_calc_pe_ratio(self):
+        pe_ratios = self.universe_metric.calc_pe_ratio()
+
+        expected_index = pd.to_datetime(["2012-01-02", "2012-01-03", "2012-01-04", "2012-01-07"])
+        self.assertEqual(list(pe_ratios.index), list(expected_index))
+        self.assertEqual(list(pe_ratios.columns), self.symbols)
+
+        # the same as calculated for each symbol
+        for symbol in ("C6L.SI", "J7X.SI"):
+            expected = self.get_metric(symbol).calc_pe_ratio()
+            np.testing.assert_allclose(pe_ratios[symbol].loc[expected.index].values, expected.values)
+
+        self.assertTrue(pe_ratios["Z74.SI"].isnull().all())
+
+    def test_calc_profit_margin(self):
+        gross_profit_margin = self.universe_metric.calc_profit_margin("gross")
+
+        self.assertEqual(list(gross_profit_margin["C6L.SI"].dropna()), [20, 25, 30])
+        self.assertEqual(list(gross_profit_margin["J7X.SI"].dropna()), [3, 4])
+
+    def test_calc_debt_to_asset_ratio(self):
+        debt_ratio = self.universe_metric.calc_debt_to_asset_ratio()
+
+        self.assertEqual(list(debt_ratio.index), list(pd.to_datetime(["2012-01-02", "2012-01-03"])))
+        self.assertEqual(list(debt_ratio["J7X.SI"]), [0.69, 0.68])
+        self.assertTrue(debt_ratio["C6L.SI"].isnull().all())
+
 if __name__ == "__main__":
     unittest.main()
@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 from fa.analysis import io
@@ -56,5 +57,178 @@ class TestIO(PandasTestCase):
         expected.index.name = "Date"
         self.assertFrameEqual(df, expected)
 
+    def test_load_fundamental_data_columnar(self):
+        arrays = [
+            np.array(["2012-12-20", "2012-12-21", "2012-12-22"], dtype="datetime64[ns]"),
+            np.array([6860, 7850, 3870]),
+            np.array([100.4, 99.9, 32.6]),
+        ]
+        mock_read = MagicMock(return_value=arrays)
+
+        with patch("fa.analysis.io.columnar_store.is_tracking", MagicMock(return_value=True)), \
+             patch("fa.analysis.io.columnar_store.is_stale", MagicMock(return_value=False)), \
+             patch("fa.analysis.io.columnar_store.read", mock_read), \
+             patch("fa.analysis.io.get_fundamentals") as mock_get_fundamentals:
+            df = io.load_fundamental_data("price", "C6L.SI", ["Volume", "Adj Close"], storage="columnar")
+
+            mock_read.assert_called_once_with("price", "C6L.SI", ["date", "volume", "adj_close"])
+            self.assertFalse(mock_get_fundamentals.called)
+
+        expected = pd.DataFrame(
+            [[6860, 100.4],
+             [7850, 99.9],
+             [3870, 32.6]],
+            index=pd.DatetimeIndex(arrays[0]),
+            columns=["Volume", "Adj Close"]
+        )
+        expected.index.name = "Date"
+        self.assertFrameEqual(df, expected)
+
+    def test_load_fundamental_data_columnar_stale(self):
+        dates = np.array(["2012-12-20"], dtype="datetime64[ns]")
+        mock_get_fundamentals_array = MagicMock(return_value=(dates, np.array([[6860, 100.4]])))
+
+        with patch("fa.analysis.io.columnar_store.is_tracking", MagicMock(return_value=True)), \
+             patch("fa.analysis.io.columnar_store.is_stale", MagicMock(return_value=True)), \
+             patch("fa.analysis.io.columnar_store.read") as mock_read, \
+             patch("fa.analysis.io.get_fundamentals_array", mock_get_fundamentals_array):
+            df = io.load_fundamental_data("price", "C6L.SI", ["Volume", "Adj Close"], storage="columnar")
+
+            mock_get_fundamentals_array.assert_called_once_with("price", "C6L.SI", ["volume", "adj_close"])
+            self.assertFalse(mock_read.called)
+
+        self.assertEqual(list(df["Adj Close"]), [100.4])
+
+    def test_load_fundamental_data_columnar_not_tracking(self):
+        with patch("fa.analysis.io.columnar_store.is_tracking", MagicMock(return_value=False)):
+            self.assertRaises(ValueError, io.load_fundamental_data, "price", "C6L.SI", storage="columnar")
+
+    def test_load_fundamental_data_fast(self):
+        dates = np.array(["2012-12-20", "2012-12-21", "2012-12-22"], dtype="datetime64[ns]")
+        values = np.array([[6860, 100.4], [7850, 99.9], [3870, 32.6]])
+        mock_get_fundamentals_array = MagicMock(return_value=(dates, values))
+
+        with patch("fa.analysis.io.get_fundamentals_array", mock_get_fundamentals_array):
+            df = io.load_fundamental_data("price", "C6L.SI", ["Volume", "Adj Close"], fast=True)
+
+            mock_get_fundamentals_array.assert_called_once_with("price", "C6L.SI", ["volume", "adj_close"])
+
+        expected = pd.DataFrame(
+            {"Volume": [6860, 7850, 3870], "Adj Close": [100.4, 99.9, 32.6]},
+            index=pd.DatetimeIndex(dates),
+            columns=["Volume", "Adj Close"]
+        )
+        expected.index.name = "Date"
+        self.assertFrameEqual(df, expected)
+
+    def test_iter_fundamental_data(self):
+        chunks = [
+            (np.array(["2012-12-20", "2012-12-21"], dtype="datetime64[ns]"), np.array([[6860, 100.4], [7850, 99.9]])),
+            (np.array(["2012-12-22"], dtype="datetime64[ns]"), np.array([[3870, 32.6]])),
+        ]
+        mock_iter_fundamentals_arrays = MagicMock(return_value=iter(chunks))
+
+        with patch("fa.analysis.io.iter_fundamentals_arrays", mock_iter_fundamentals_arrays):
+            frames = list(io.iter_fundamental_data("price", "C6L.SI", ["Volume", "Adj Close"], chunk_size=2))
+
+            mock_iter_fundamentals_arrays.assert_called_once_with("price", "C6L.SI", ["volume", "adj_close"], 2)
+
+        expected = pd.DataFrame(
+            {"Volume": [3870], "Adj Close": [32.6]},
+            index=pd.DatetimeIndex(chunks[1][0], name="Date"),
+            columns=["Volume", "Adj Close"]
+        )
+        self.assertEqual(len(frames), 2)
+        self.assertFrameEqual(frames[1], expected)
+
+    def test_load_fundamental_data_narrow(self):
+        mock_get_fundamentals_narrow = MagicMock(return_value=[
+            (datetime(2012, 3, 31), 0.69, None),
+            (datetime(2013, 3, 31), 0.68, 1000.0),
+        ])
+
+        with patch("fa.analysis.io.get_fundamentals_narrow", mock_get_fundamentals_narrow):
+            df = io.load_fundamental_data("balance_sheet", "C6L.SI", ["Total Liabilities / Total Assets", "Inventories"], storage="narrow")
+
+            mock_get_fundamentals_narrow.assert_called_once_with("balance_sheet", "C6L.SI", ["total_liabilities_total_assets", "inventories"])
+
+        expected = pd.DataFrame(
+            {"Total Liabilities / Total Assets": [0.69, 0.68], "Inventories": [np.nan, 1000.0]},
+            index=pd.DatetimeIndex(pd.to_datetime(["2012-03-31", "2013-03-31"]), name="Date"),
+            columns=["Total Liabilities / Total Assets", "Inventories"]
+        )
+        self.assertFrameEqual(df, expected)
+
+    def test_load_fundamental_data_of_symbols(self):
+        mock_get_fundamentals_of_symbols = MagicMock(return_value=[
+            ("ABC.SI", datetime(2012, 12, 21), 4430, 54.4),
+            ("C6L.SI", datetime(2012, 12, 20), 6860, 100.4),
+            ("C6L.SI", datetime(2012, 12, 21), 7850, 99.9),
+        ])
+
+        with patch("fa.analysis.io.get_fundamentals_of_symbols", mock_get_fundamentals_of_symbols):
+            df = io.load_fundamental_data_of_symbols("price", ["C6L.SI", "ABC.SI"], ["Volume", "Adj Close"])
+
+            mock_get_fundamentals_of_symbols.assert_called_once_with("price", ["C6L.SI", "ABC.SI"], ["date", "volume", "adj_close"])
+
+        expected = pd.DataFrame(
+            [[4430, 54.4],
+             [6860, 100.4],
+             [7850, 99.9]],
+            index=pd.MultiIndex.from_tuples([
+                ("ABC.SI", datetime(2012, 12, 21)),
+                ("C6L.SI", datetime(2012, 12, 20)),
+                ("C6L.SI", datetime(2012, 12, 21)),
+            ], names=["Symbol", "Date"]),
+            columns=["Volume", "Adj Close"]
+        )
+        self.assertFrameEqual(df, expected)
+
+    def test_load_fundamental_data_of_symbols__empty(self):
+        with patch("fa.analysis.io.get_fundamentals_of_symbols", MagicMock(return_value=[])):
+            df = io.load_fundamental_data_of_symbols("price", ["C6L.SI"], ["Volume", "Adj Close"])
+
+        self.assertEqual(len(df), 0)
+        self.assertEqual(list(df.index.names), ["Symbol", "Date"])
+        self.assertEqual(list(df.columns), ["Volume", "Adj Close"])
+
+    def test_load_fundamental_data_as_of(self):
+        mock_get_fundamentals_as_of = MagicMock(return_value=[
+            ("ABC.SI", datetime(2012, 4, 30), 12.5),
+            ("C6L.SI", datetime(2012, 1, 30), 8.2),
+        ])
+
+        with patch("fa.analysis.io.get_fundamentals_as_of", mock_get_fundamentals_as_of):
+            df = io.load_fundamental_data_as_of("derived_metric", datetime(2012, 12, 31), ["P/E Ratio"])
+
+            mock_get_fundamentals_as_of.assert_called_once_with("derived_metric", datetime(2012, 12, 31), ["date", "p_e_ratio"], None)
+
+        expected = pd.DataFrame(
+            {"Date": [datetime(2012, 4, 30), datetime(2012, 1, 30)], "P/E Ratio": [12.5, 8.2]},
+            index=pd.Index(["ABC.SI", "C6L.SI"], name="Symbol"),
+            columns=["Date", "P/E Ratio"]
+        )
+        self.assertFrameEqual(df, expected)
+
+    def test_split_by_symbol(self):
+        df = pd.DataFrame(
+            [[4430], [6860], [7850]],
+            index=pd.MultiIndex.from_tuples([
+                ("ABC.SI", datetime(2012, 12, 21)),
+                ("C6L.SI", datetime(2012, 12, 20)),
+                ("C6L.SI", datetime(2012, 12, 21)),
+            ], names=["Symbol", "Date"]),
+            columns=["Volume"]
+        )
+
+        frames = io.split_by_symbol(df, ["C6L.SI", "ZZZ", "ABC.SI"])
+
+        self.assertEqual(list(frames), ["C6L.SI", "ZZZ", "ABC.SI"])
+        self.assertEqual(list(frames["C6L.SI"]["Volume"]), [6860, 7850])
+        self.assertEqual(list(frames["C6L.SI"].index), [datetime(2012, 12, 20), datetime(2012, 12, 21)])
+        self.assertEqual(list(frames["ABC.SI"]["Volume"]), [4430])
+        self.assertEqual(len(frames["ZZZ"]), 0)
+        self.assertEqual(list(frames["ZZZ"].columns), ["Volume"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -62,5 +62,99 @@ class TestSanity(PandasTestCase):
             'b': [np.nan, 4],
         }, index=pd.to_datetime(["2012-01-02", "2012-01-04"])))
 
+    def test_is_rolling_outlier(self):
+        # a small jump after a long flat stretch stands out among recent values, not among all values
+        frame = pd.Series(np.concatenate([np.arange(50.0), np.full(20, 50.0) + np.tile([0, 0.1], 10), [52]]))
+
+        self.assertFalse(sanity.is_outlier(frame, 3).iloc[-1])
+        self.assertTrue(sanity.is_rolling_outlier(frame, 3, 20).iloc[-1])
+        self.assertTrue(sanity.is_rolling_outlier(frame, 3, 20, robust=True).iloc[-1])
+        self.assertFalse(sanity.is_rolling_outlier(frame, 3, 20).iloc[:-1].any())
+
+    def test_check_for_rolling_discontinuity(self):
+        df = pd.DataFrame({
+            'a': [1, 2, 3, 4, 5, 6, 100, 101, 102],
+            'b': [1, 2, 3, 4, 5, 6, 7, 8, 9],
+        }, index=pd.date_range("2012-01-01", periods=9))
+
+        for robust in (False, True):
+            result = sanity.check_for_rolling_discontinuity(df, 3, 4, robust)
+            self.assertEqual(list(result.index), [pd.Timestamp("2012-01-06")])
+            self.assertEqual(list(result.columns), ['a'])
+
+    def test_iter_rolling_outliers(self):
+        frame = pd.DataFrame({'a': np.random.randn(100), 'b': np.random.randn(100)})
+        frame.iloc[[10, 50, 51], 0] = 100
+
+        chunks = [frame.iloc[i : i + 7] for i in range(0, 100, 7)]
+        result = pd.concat(list(sanity.iter_rolling_outliers(chunks, 3, 20, robust=True)))
+
+        self.assertFrameEqual(result, sanity.is_rolling_outlier(frame, 3, 20, robust=True))
+
+    def test_iter_rolling_discontinuities(self):
+        df = pd.DataFrame({'a': np.cumsum(np.random.randn(100)), 'b': np.cumsum(np.random.randn(100))},
+            index=pd.date_range("2012-01-01", periods=100))
+        df.iloc[[20, 48, 49], 0] = 100
+        df.iloc[70, 1] = -100
+
+        # chunk boundaries right before and after the jumps
+        chunks = [df.iloc[i : j] for i, j in ((0, 21), (21, 48), (48, 49), (49, 100))]
+        result = pd.concat(list(sanity.iter_rolling_discontinuities(chunks, 5, 10)))
+
+        expected = sanity.check_for_rolling_discontinuity(df, 5, 10)
+        self.assertEqual(list(result.index), list(expected.index))
+        self.assertFrameEqual(result[expected.columns], expected)
+
+    def make_frame_of_symbols(self, data):
+        """ DataFrame object indexed by Symbol and Date, with 5 days of <data> ({column: values}) of symbols A and B """
+        dates = list(pd.date_range("2012-01-01", periods=5))
+        index = pd.MultiIndex.from_arrays([["A"] * 5 + ["B"] * 5, dates * 2], names=["Symbol", "Date"])
+        return pd.DataFrame(data, index=index, columns=sorted(data))
+
+    def test_find_missing_dates(self):
+        df = self.make_frame_of_symbols({'a': range(10)})
+        df = df.drop([("A", pd.Timestamp("2012-01-02")), ("B", pd.Timestamp("2012-01-04"))])
+
+        result = sanity.find_missing_dates(df, np.timedelta64(1, 'D'))
+
+        self.assertEqual(list(result["Symbol"]), ["A", "B"])
+        self.assertEqual(list(result["Date"]), list(pd.to_datetime(["2012-01-03", "2012-01-05"])))
+        self.assertEqual(list(result["Column"]), [None, None])
+
+    def test_find_missing_values(self):
+        df = self.make_frame_of_symbols({'a': [1, 2, np.nan, 4, 5, 1, 2, 3, 4, 5], 'b': [1, 2, 3, 4, 5, np.nan, 2, 3, 4, 5]})
+
+        result = sanity.find_missing_values(df)
+
+        self.assertEqual(list(zip(result["Symbol"], result["Date"], result["Column"])), [
+            ("A", pd.Timestamp("2012-01-03"), 'a'),
+            ("B", pd.Timestamp("2012-01-01"), 'b'),
+        ])
+
+    def test_find_outliers(self):
+        # the same values are outliers or not depending on the other values of the symbol
+        df = self.make_frame_of_symbols({'a': [1, 1, 1, 1, 5, 1, 3, 5, 7, 5]})
+
+        result = sanity.find_outliers(df, 1.5)
+
+        self.assertEqual(list(zip(result["Symbol"], result["Date"], result["Column"])), [
+            ("A", pd.Timestamp("2012-01-05"), 'a'),
+        ])
+
+    def test_find_discontinuities(self):
+        # same as test_check_for_discontinuity__DatetimeIndex for each symbol, with no jump across symbols
+        df = self.make_frame_of_symbols({
+            'a': [1, 2, 100, 101, 102, 1, 2, 3, 4, 5],
+            'b': [1, 2, 3, 4, 100, 1000, 2, 3, 4, 5],
+        })
+
+        result = sanity.find_discontinuities(df, 1)
+
+        self.assertEqual(list(zip(result["Symbol"], result["Date"], result["Column"])), [
+            ("A", pd.Timestamp("2012-01-02"), 'a'),
+            ("A", pd.Timestamp("2012-01-04"), 'b'),
+            ("B", pd.Timestamp("2012-01-01"), 'b'),
+        ])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import tempfile
+import shutil
+import os.path
+
+import numpy as np
+
+from fa.database.columnar import ColumnarStore
+
+
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.store = ColumnarStore(self.path)
+
+    def test_is_tracking(self):
+        self.assertTrue(self.store.is_tracking("price"))
+        self.assertFalse(self.store.is_tracking("balance_sheet"))
+        self.assertFalse(ColumnarStore(None).is_tracking("price"))
+
+    def test_write_read(self):
+        dates = np.array(["2012-12-20", "2012-12-21"], dtype="datetime64[ns]")
+        self.store.write("price", "C6L.SI", {"date": dates, "volume": np.array([6860, 7850]), "adj_close": np.array([100.4, 99.9])})
+
+        date, adj_close = self.store.read("price", "C6L.SI", ["date", "adj_close"])
+
+        self.assertIsInstance(adj_close, np.memmap)
+        np.testing.assert_array_equal(date, dates)
+        np.testing.assert_array_equal(adj_close, [100.4, 99.9])
+
+    def test_write_replaces_old_data(self):
+        self.store.write("price", "C6L.SI", {"volume": np.array([6860, 7850])})
+        self.store.write("price", "C6L.SI", {"volume": np.array([3870])})
+
+        volume, = self.store.read("price", "C6L.SI", ["volume"])
+
+        np.testing.assert_array_equal(volume, [3870])
+        self.assertEqual(os.listdir(os.path.join(self.path, "price")), ["C6L.SI"])
+
+    def test_read_while_swapped(self):
+        self.store.write("price", "C6L.SI", {"volume": np.array([6860, 7850])})
+        symbol_dir = os.path.join(self.path, "price", "C6L.SI")
+        os.rename(symbol_dir, symbol_dir + ".old") # a write between its renames
+
+        volume, = self.store.read("price", "C6L.SI", ["volume"])
+
+        np.testing.assert_array_equal(volume, [6860, 7850])
+
+    def test_read_not_found(self):
+        self.assertIsNone(self.store.read("price", "C6L.SI", ["volume"]))
+
+    def test_delete(self):
+        self.store.write("price", "C6L.SI", {"volume": np.array([6860, 7850])})
+        self.store.delete("price", "C6L.SI")
+
+        self.assertIsNone(self.store.read("price", "C6L.SI", ["volume"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import shutil
+import os.path
+
+import peewee as pw
+
+from fa.database.connection import ProfiledSqliteDatabase, PROFILES
+
+
+class TestProfiledSqliteDatabase(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.db_path = os.path.join(path, "test.db")
+
+    def connect(self, profile):
+        database = ProfiledSqliteDatabase(self.db_path, profile=profile)
+        database.connect()
+        self.addCleanup(database.close)
+        return database
+
+    def test_default(self):
+        database = self.connect("default")
+
+        self.assertEqual(database.get_pragma("foreign_keys"), 1)
+        self.assertEqual(database.get_pragma("journal_mode"), "delete")
+
+    def test_bulk_load(self):
+        database = self.connect("bulk-load")
+
+        self.assertEqual(database.get_pragma("foreign_keys"), 1)
+        self.assertEqual(database.get_pragma("journal_mode"), "wal")
+        self.assertEqual(database.get_pragma("synchronous"), 1)   # NORMAL
+        self.assertEqual(database.get_pragma("cache_size"), -262144)
+        self.assertEqual(database.get_pragma("temp_store"), 2)    # MEMORY
+
+    def test_analysis(self):
+        self.connect("default").execute_sql("CREATE TABLE t (a INTEGER)")
+        database = self.connect("analysis")
+
+        self.assertEqual(database.get_pragma("query_only"), 1)
+        database.execute_sql("SELECT * FROM t")
+        self.assertRaises(pw.OperationalError, database.execute_sql, "INSERT INTO t VALUES (1)")
+
+    def test_every_connection(self):
+        database = ProfiledSqliteDatabase(None)
+        database.init(self.db_path, profile="bulk-load")
+        database.connect()
+        database.close()
+
+        database.connect()  # a new connection
+        self.addCleanup(database.close)
+        self.assertEqual(database.get_pragma("synchronous"), 1)
+
+    def test_unknown_profile(self):
+        self.assertNotIn("turbo", PROFILES)
+        self.assertRaises(ValueError, ProfiledSqliteDatabase, self.db_path, profile="turbo")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from datetime import datetime
+
+from fa.database import enrichment, query
+from fa.database.models import *
+from tests.util import DBTestCase
+
+
+class TestEnrichment(DBTestCase):
+    def setUp(self):
+        Symbol.create(symbol="C6L.SI")
+
+    def tearDown(self):
+        query.delete_all()
+
+    def insert(self, year, **values):
+        IncomeStatement.create(symbol_obj="C6L.SI", date=datetime(year, 3, 31), **values)
+
+    def get_values(self, *field_names):
+        fields = [getattr(IncomeStatement, name) for name in field_names]
+        return list(IncomeStatement.select(*fields).order_by(IncomeStatement.date).tuples())
+
+    def test_compile_expression(self):
+        columns = {"Sales/Revenue": IncomeStatement.sales_revenue, "Net Income": IncomeStatement.net_income}
+
+        for expression in ("[Net Income] / [Sales/Revenue] * 100", "-([Net Income] - 2) / -[Sales/Revenue]"):
+            self.assertIsInstance(enrichment.compile_expression(expression, columns.get), pw.Node)
+
+        for expression in ("[Net Income] ** 2", "abs([Net Income])", "[Net Income] +", "'a'"):
+            with self.assertRaises(ValueError):
+                enrichment.compile_expression(expression, columns.get)
+
+    def test_compile_enrichments_unknown_column(self):
+        with self.assertRaises(ValueError):
+            enrichment.compile_enrichments("income_statement", [("Operating Income", "[Gross Profit]")], set())
+
+    def test_enrich(self):
+        self.insert(2011, gross_income=40, sg_a_expense=10, other_operating_expense=5)
+        self.insert(2012, gross_income=50, sg_a_expense=10, other_operating_expense=5, operating_income=30)
+        self.insert(2013, gross_income=40)
+
+        self.assertEqual(enrichment.enrich("income_statement"), 2)
+
+        # existing values kept
+        self.assertEqual(self.get_values("operating_income"), [(25,), (30,), (None,)])
+
+    def test_enrich_chained(self):
+        enrichments = [
+            ("Gross Income", "[Sales/Revenue] - [Cost of Goods Sold (COGS) incl. D&A]"),
+            ("Operating Income", "[Gross Income] - [SG&A Expense] - [Other Operating Expense]"),
+        ]
+
+        self.insert(2011, sales_revenue=100, cost_of_goods_sold_cogs_incl_d_a=60, sg_a_expense=10, other_operating_expense=5)
+        self.insert(2012, sales_revenue=100, gross_income=50, sg_a_expense=10, other_operating_expense=5, operating_income=30)
+        self.insert(2013, sales_revenue=100, cost_of_goods_sold_cogs_incl_d_a=60)
+
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 2)
+
+        # existing values kept, gross income calculated used in operating income
+        self.assertEqual(self.get_values("gross_income", "operating_income"), [(40, 25), (50, 30), (40, None)])
+
+    def test_enrich_incrementally(self):
+        enrichments = [("Net Income", "[Pretax Income] - [Income Tax]")]
+
+        self.insert(2011, pretax_income=10)
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 1)
+        self.assertEqual(self.get_values("net_income"), [(None,)])
+
+        # only rows inserted or updated since the last run
+        self.insert(2012, pretax_income=20, income_tax=2)
+        self.insert(2013, pretax_income=30)
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 2)
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 0)
+        self.assertEqual(self.get_values("net_income"), [(None,), (18,), (None,)])
+
+        IncomeStatement.update(income_tax=1).where(IncomeStatement.date == datetime(2013, 3, 31)).execute()
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 1)
+        self.assertEqual(self.get_values("net_income"), [(None,), (18,), (29,)])
+
+        # a new column in all rows
+        enrichments.append(("Income Tax - Current Domestic", "[Income Tax] * 2"))
+        self.assertEqual(enrichment.enrich("income_statement", enrichments), 3)
+        self.assertEqual(self.get_values("income_tax_current_domestic"), [(None,), (4,), (2,)])
+
+        self.assertEqual(query.get_enriched_columns("income_statement", ["Net Income", "Sales/Revenue"]), {"Net Income"})
+
+    def test_enrich_reused_ids(self):
+        Symbol.create(symbol="J7X.SI")
+        records = lambda symbol: [{"symbol_obj": symbol, "date": datetime(2012, 3, 31), "gross_income": 40, "sg_a_expense": 10, "other_operating_expense": 5}]
+
+        query.update_fundamentals("income_statement", "C6L.SI", records("C6L.SI"), datetime(2014, 12, 15))
+        query.update_fundamentals("income_statement", "J7X.SI", records("J7X.SI"), datetime(2014, 12, 15))
+        self.assertEqual(enrichment.enrich("income_statement"), 2)
+
+        # reloaded into the ids of the rows deleted
+        records_reloaded = [dict(records("J7X.SI")[0], gross_income=140)]
+        query.update_fundamentals("income_statement", "J7X.SI", records_reloaded, datetime(2014, 12, 16), delete_old=True)
+        self.assertEqual(enrichment.enrich("income_statement"), 1)
+        self.assertEqual(sorted(self.get_values("operating_income")), [(25,), (125,)])
+
+    def test_enrich_updated_in_place(self):
+        self.insert(2012, gross_income=40, sg_a_expense=10)
+        enrichment.enrich("income_statement")
+
+        records = [{"symbol_obj": "C6L.SI", "date": datetime(2012, 3, 31), "other_operating_expense": 5}]
+        query.update_fundamentals("income_statement", "C6L.SI", records, datetime(2014, 12, 16), on_conflict="update_non_null")
+
+        self.assertEqual(enrichment.enrich("income_statement"), 1)
+        self.assertEqual(self.get_values("operating_income"), [(25,)])
+
+if __name__ == "__main__":
+    unittest.main()
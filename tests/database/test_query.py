@@ -1,6 +1,10 @@
 import unittest
-from datetime import datetime
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta
+import tempfile
+import shutil
 
+import numpy as np
 import peewee as pw
 
 from fa.database import query
@@ -46,6 +50,17 @@ class TestQuery(DBTestCase):
             {"symbol": "J7X.SI", "updated_at": None},
         ])
 
+    def test_get_update_markers(self):
+        Symbol.create(symbol="C6L.SI", price_updated_at=datetime(2012, 12, 21))
+
+        self.assertEqual(query.get_update_markers("C6L.SI"), {
+            "price": datetime(2012, 12, 21),
+            "balance_sheet": None,
+            "cash_flow": None,
+            "income_statement": None,
+        })
+        self.assertEqual(query.get_update_markers("ZZZ"), {})
+
     def test_get_record_dates(self):
         symbols = [
             {"symbol": "C6L.SI", "price_updated_at": None},
@@ -90,6 +105,89 @@ class TestQuery(DBTestCase):
             (datetime(2012, 12, 22), 3870, 32.6),
         ])
 
+    def test_get_fundamentals_array(self):
+        symbols = [
+            {"symbol": "C6L.SI"},
+            {"symbol": "ABC.SI"},
+        ]
+
+        balance_sheets = [
+            {"symbol_obj": "C6L.SI", "date": datetime(1995, 4, 1), "inventories": 2000, "cash_only": None},
+            {"symbol_obj": "ABC.SI", "date": datetime(2000, 4, 1), "inventories": 10000, "cash_only": 5.5},
+            {"symbol_obj": "C6L.SI", "date": datetime(1994, 4, 1), "inventories": 1000, "cash_only": 1.5},
+            {"symbol_obj": "C6L.SI", "date": datetime(1996, 4, 1), "inventories": None, "cash_only": 2.5},
+        ]
+
+        with db.transaction():
+            Symbol.insert_many(symbols).execute()
+            BalanceSheet.insert_many(balance_sheets).execute()
+
+        dates, values = query.get_fundamentals_array("balance_sheet", "C6L.SI", ("inventories", "cash_only"), fetch_size=2)
+
+        np.testing.assert_array_equal(dates, np.array(["1994-04-01", "1995-04-01", "1996-04-01"], dtype="datetime64[ns]"))
+        np.testing.assert_array_equal(values, np.array([[1000, 1.5], [2000, np.nan], [np.nan, 2.5]]))
+        self.assertEqual(values.dtype, np.float64)
+
+    def test_iter_fundamentals_arrays(self):
+        Symbol.create(symbol="C6L.SI")
+        BalanceSheet.insert_many(
+            {"symbol_obj": "C6L.SI", "date": datetime(1990 + i, 4, 1), "inventories": i, "cash_only": None}
+            for i in range(5)
+        ).execute()
+
+        chunks = list(query.iter_fundamentals_arrays("balance_sheet", "C6L.SI", ("inventories", "cash_only"), chunk_size=2))
+
+        self.assertEqual([len(dates) for dates, values in chunks], [2, 2, 1])
+        np.testing.assert_array_equal(chunks[2][0], np.array(["1994-04-01"], dtype="datetime64[ns]"))
+        np.testing.assert_array_equal(np.concatenate([values for dates, values in chunks]), [[i, np.nan] for i in range(5)])
+
+        self.assertEqual(list(query.iter_fundamentals_arrays("balance_sheet", "ABC.SI", ("inventories",))), [])
+
+    def test_get_fundamentals_array_no_data(self):
+        dates, values = query.get_fundamentals_array("price", "C6L.SI", ("volume", "adj_close"))
+
+        self.assertEqual(dates.shape, (0,))
+        self.assertEqual(values.shape, (0, 2))
+
+    def test_get_fundamentals_of_symbols(self):
+        symbols = [
+            {"symbol": "C6L.SI"},
+            {"symbol": "ABC.SI"},
+            {"symbol": "J7X.SI"},
+        ]
+
+        prices = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 7850, "adj_close": 99.9},
+            {"symbol_obj": "ABC.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 4430, "adj_close": 54.4},
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 20), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 6860, "adj_close": 100.4},
+            {"symbol_obj": "J7X.SI", "date": datetime(2012, 12, 22), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 3870, "adj_close": 32.6},
+        ]
+
+        with db.transaction():
+            Symbol.insert_many(symbols).execute()
+            Price.insert_many(prices).execute()
+
+        expected = [
+            ("ABC.SI", datetime(2012, 12, 21), 4430),
+            ("C6L.SI", datetime(2012, 12, 20), 6860),
+            ("C6L.SI", datetime(2012, 12, 21), 7850),
+        ]
+
+        result = list(query.get_fundamentals_of_symbols("price", ["C6L.SI", "ABC.SI"], ("date", "volume")))
+        self.assertEqual(result, expected)
+
+        with patch("fa.database.query.SQLITE_MAX_VARIABLE_NUMBER", 1):
+            result = list(query.get_fundamentals_of_symbols("price", ["C6L.SI", "ABC.SI"], ("date", "volume")))
+        self.assertEqual(result, expected)
+
+    def test_chunk_records(self):
+        records = [{'a': 1, 'b': 2}] * 5 + [{'a': 1}] * 2 + [{'b': 1, 'a': 2}]
+
+        chunks = list(query._chunk_records(records, max_variables=5))
+
+        self.assertEqual([len(c) for c in chunks], [2, 2, 1, 2, 1])
+        self.assertEqual([r for c in chunks for r in c], records)
+
     def test_update_fundamentals(self):
         symbols = [
             {"symbol": "C6L.SI"},
@@ -157,6 +255,92 @@ class TestQuery(DBTestCase):
 
         self.assertEqual(updated_data, prices[1:] + records)
 
+    def test_update_fundamentals_many_records(self):
+        Symbol.create(symbol="C6L.SI")
+
+        symbol = "C6L.SI"
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 1, 1) + timedelta(days=i), "open": 0, "close": 0, "high": 0, "low": 0, "volume": i, "adj_close": 1.0}
+            for i in range(1000)
+        ]
+
+        query.update_fundamentals("price", symbol, iter(records), datetime(2014, 12, 22))
+
+        volumes = [p.volume for p in Price.select(Price.volume).order_by(Price.date)]
+        self.assertEqual(volumes, list(range(1000)))
+
+    def test_update_fundamentals_columnar_store(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        Symbol.create(symbol="C6L.SI")
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 20), open=0, close=0, high=0, low=0, volume=6860, adj_close=100.4)
+
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 7850, "adj_close": 99.9},
+        ]
+
+        with patch("fa.database.query.columnar_store.path", path):
+            query.update_fundamentals("price", "C6L.SI", records, datetime(2012, 12, 22))
+            date, volume, adj_close = query.columnar_store.read("price", "C6L.SI", ["date", "volume", "adj_close"])
+
+        np.testing.assert_array_equal(date, np.array(["2012-12-20", "2012-12-21"], dtype="datetime64[ns]"))
+        np.testing.assert_array_equal(volume, [6860, 7850])
+        np.testing.assert_array_equal(adj_close, [100.4, 99.9])
+        self.assertEqual(volume.dtype, np.int64)
+
+    def test_update_fundamentals_columnar_store_failure(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        Symbol.create(symbol="C6L.SI")
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 7850, "adj_close": 99.9},
+        ]
+
+        with patch("fa.database.query.columnar_store.path", path):
+            with patch("fa.database.query.columnar_store.write", MagicMock(side_effect=OSError)):
+                self.assertRaises(OSError, query.update_fundamentals, "price", "C6L.SI", records, datetime(2012, 12, 22))
+
+            # not committed, and marked stale until written
+            self.assertEqual(Price.select().count(), 0)
+            self.assertTrue(query.columnar_store.is_stale("price", "C6L.SI"))
+
+            query.update_fundamentals("price", "C6L.SI", records, datetime(2012, 12, 22))
+            self.assertFalse(query.columnar_store.is_stale("price", "C6L.SI"))
+
+    def test_sync_columnar_store_nullable_columns(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        Symbol.create(symbol="C6L.SI")
+        BalanceSheet.create(symbol_obj="C6L.SI", date=datetime(1994, 4, 1), inventories=1000)
+
+        with patch("fa.database.query.columnar_store.path", path):
+            query.sync_columnar_store("balance_sheet", "C6L.SI")
+            inventories, cash_only = query.columnar_store.read("balance_sheet", "C6L.SI", ["inventories", "cash_only"])
+
+            BalanceSheet.delete().execute()
+            query.sync_columnar_store("balance_sheet", "C6L.SI")
+            self.assertIsNone(query.columnar_store.read("balance_sheet", "C6L.SI", ["inventories"]))
+
+        np.testing.assert_array_equal(inventories, [1000])
+        np.testing.assert_array_equal(cash_only, [np.nan])
+
+    def test_update_fundamentals_update_listeners(self):
+        Symbol.create(symbol="C6L.SI")
+        listener = MagicMock()
+
+        with patch("fa.database.query.update_listeners", [listener]):
+            query.update_fundamentals("price", "C6L.SI", [], datetime(2012, 12, 22))
+
+            self.assertRaises(
+                pw.IntegrityError,
+                query.update_fundamentals, "price", "ZZZ", [{"symbol_obj": "ZZZ", "date": datetime(2012, 12, 22)}], datetime(2012, 12, 22)
+            )
+
+        listener.assert_called_once_with("price", "C6L.SI")
+
     def test_update_fundamentals_exception_handling(self):
         symbols = [
             {"symbol": "C6L.SI"},
@@ -190,6 +374,275 @@ class TestQuery(DBTestCase):
         self.assertEqual(updated_data, prices)
         self.assertEqual(markers, [{"symbol": "C6L.SI", "price_updated_at": None}])
 
+    def test_update_fundamentals_on_conflict(self):
+        Symbol.create(symbol="C6L.SI")
+        BalanceSheet.create(symbol_obj="C6L.SI", date=datetime(2012, 3, 31), inventories=1000, cash_only=500)
+
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 3, 31), "inventories": 1200, "cash_only": None},
+            {"symbol_obj": "C6L.SI", "date": datetime(2013, 3, 31), "inventories": 1300, "cash_only": 600},
+        ]
+        get_values = lambda: [(b.date, b.inventories, b.cash_only) for b in BalanceSheet.select().order_by(BalanceSheet.date)]
+
+        self.assertRaises(
+            pw.IntegrityError,
+            query.update_fundamentals, "balance_sheet", "C6L.SI", records, datetime(2014, 12, 22)
+        )
+
+        query.update_fundamentals("balance_sheet", "C6L.SI", records, datetime(2014, 12, 22), on_conflict="ignore")
+        self.assertEqual(get_values(), [(datetime(2012, 3, 31), 1000, 500), (datetime(2013, 3, 31), 1300, 600)])
+
+        query.update_fundamentals("balance_sheet", "C6L.SI", records, datetime(2014, 12, 22), on_conflict="update_non_null")
+        self.assertEqual(get_values(), [(datetime(2012, 3, 31), 1200, 500), (datetime(2013, 3, 31), 1300, 600)])
+
+        query.update_fundamentals("balance_sheet", "C6L.SI", records, datetime(2014, 12, 22), on_conflict="replace")
+        self.assertEqual(get_values(), [(datetime(2012, 3, 31), 1200, None), (datetime(2013, 3, 31), 1300, 600)])
+
+        self.assertEqual(Symbol.get(Symbol.symbol == "C6L.SI").balance_sheet_updated_at, datetime(2014, 12, 22))
+
+    def test_update_fundamentals_unknown_conflict_policy(self):
+        self.assertRaises(
+            ValueError,
+            query.update_fundamentals, "price", "C6L.SI", [], datetime(2014, 12, 22), on_conflict="merge"
+        )
+
+    def test_update_fundamentals_from_columns(self):
+        Symbol.create(symbol="C6L.SI")
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 19), open=0, close=0, high=0, low=0, volume=0, adj_close=100.1)
+
+        # as parsed from csv
+        column_chunks = [
+            {"date": ["2012-12-21", "2012-12-20"], "open": ["0", "0"], "high": ["0", "0"], "low": ["0", "0"], "close": ["0", "0"], "volume": ["7850", "6860"], "adj_close": ["99.9", "100.4"]},
+            {"date": ["2012-12-19"], "open": ["0"], "high": ["0"], "low": ["0"], "close": ["0"], "volume": ["5000"], "adj_close": ["100.1"]},
+        ]
+
+        query.update_fundamentals_from_columns("price", "C6L.SI", iter(column_chunks), datetime(2012, 12, 22), delete_old=True)
+
+        prices = [(p.date, p.volume, p.adj_close) for p in Price.select().order_by(Price.date)]
+        self.assertEqual(prices, [
+            (datetime(2012, 12, 19), 5000, 100.1),
+            (datetime(2012, 12, 20), 6860, 100.4),
+            (datetime(2012, 12, 21), 7850, 99.9),
+        ])
+        self.assertEqual(Symbol.get(Symbol.symbol == "C6L.SI").price_updated_at, datetime(2012, 12, 22))
+
+    def test_update_fundamentals_from_columns_null(self):
+        Symbol.create(symbol="C6L.SI")
+
+        column_chunks = [{"date": ["2012-03-31", "2013-03-31"], "inventories": ["1000", '']}]
+        query.update_fundamentals_from_columns("balance_sheet", "C6L.SI", column_chunks, datetime(2014, 12, 22))
+
+        self.assertEqual([b.inventories for b in BalanceSheet.select().order_by(BalanceSheet.date)], [1000, None])
+
+    def test_update_fundamentals_from_columns_exception_handling(self):
+        Symbol.create(symbol="C6L.SI")
+
+        column_chunks = [
+            {"date": ["2012-12-21"], "open": ["0"], "high": ["0"], "low": ["0"], "close": ["0"], "volume": ["0"], "adj_close": ["99.9"]},
+            {"date": ["2012-12-21"], "open": ["0"], "high": ["0"], "low": ["0"], "close": ["0"], "volume": ["0"], "adj_close": ["99.9"]},
+        ]
+
+        self.assertRaises(
+            pw.IntegrityError,
+            query.update_fundamentals_from_columns, "price", "C6L.SI", column_chunks, datetime(2012, 12, 22)
+        )
+
+        # rollback should occur
+        self.assertEqual(Price.select().count(), 0)
+        self.assertIsNone(Symbol.get(Symbol.symbol == "C6L.SI").price_updated_at)
+
+    def test_update_fundamentals_incrementally(self):
+        Symbol.create(symbol="C6L.SI", price_updated_at=datetime(2012, 12, 21))
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 19), open=0, close=0, high=0, low=0, volume=0, adj_close=100.1)
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 20), open=0, close=0, high=0, low=0, volume=0, adj_close=100.4)
+
+        # as parsed from csv, overlapping on 2012-12-20
+        make_record = lambda date, adj_close: {
+            "symbol_obj": "C6L.SI", "date": date, "open": "0", "close": "0", "high": "0", "low": "0", "volume": "0", "adj_close": adj_close
+        }
+        records = [make_record("2012-12-21", "99.9"), make_record("2012-12-20", "100.4")]
+
+        self.assertTrue(query.update_fundamentals_incrementally("price", "C6L.SI", records, datetime(2012, 12, 22)))
+
+        prices = [(p.date, p.adj_close) for p in Price.select().order_by(Price.date)]
+        self.assertEqual(prices, [(datetime(2012, 12, 19), 100.1), (datetime(2012, 12, 20), 100.4), (datetime(2012, 12, 21), 99.9)])
+        self.assertEqual(Symbol.get(Symbol.symbol == "C6L.SI").price_updated_at, datetime(2012, 12, 22))
+
+    def test_update_fundamentals_incrementally__csv_dates(self):
+        Symbol.create(symbol="C6L.SI")
+        Symbol.create(symbol="J7X.SI")
+
+        make_record = lambda symbol, date, adj_close: {
+            "symbol_obj": symbol, "date": date, "open": "0", "close": "0", "high": "0", "low": "0", "volume": "0", "adj_close": adj_close
+        }
+
+        # written from csv, with dates stored as strings without time
+        column_chunks = [{"date": ["2012-12-19", "2012-12-20"], "open": ["0", "0"], "high": ["0", "0"], "low": ["0", "0"],
+                          "close": ["0", "0"], "volume": ["0", "0"], "adj_close": ["100.1", "100.4"]}]
+        query.update_fundamentals_from_columns("price", "C6L.SI", column_chunks, datetime(2012, 12, 21))
+
+        records = [make_record("J7X.SI", "2012-12-19", "100.1"), make_record("J7X.SI", "2012-12-20", "100.4")]
+        query.update_fundamentals("price", "J7X.SI", records, datetime(2012, 12, 21))
+
+        for symbol in ("C6L.SI", "J7X.SI"):
+            records = [make_record(symbol, "2012-12-20", "100.4"), make_record(symbol, "2012-12-21", "99.9")]
+            self.assertTrue(query.update_fundamentals_incrementally("price", symbol, records, datetime(2012, 12, 22)))
+
+            prices = [(p.date, p.adj_close) for p in Price.select().where(Price.symbol_obj == symbol).order_by(Price.date)]
+            self.assertEqual(prices, [(datetime(2012, 12, 19), 100.1), (datetime(2012, 12, 20), 100.4), (datetime(2012, 12, 21), 99.9)])
+
+    def test_update_fundamentals_incrementally__one_transaction(self):
+        Symbol.create(symbol="C6L.SI")
+        records = [{"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 0, "adj_close": 99.9}]
+        depths = []
+
+        with patch("fa.database.query.update_fundamentals", MagicMock(side_effect=lambda *args: depths.append(db.transaction_depth()))):
+            self.assertTrue(query.update_fundamentals_incrementally("price", "C6L.SI", records, datetime(2012, 12, 22)))
+
+        # written in the transaction the existing data was read in
+        self.assertEqual(depths, [1])
+
+    def test_update_fundamentals_incrementally_adjusted(self):
+        Symbol.create(symbol="C6L.SI", price_updated_at=datetime(2012, 12, 21))
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 19), open=0, close=0, high=0, low=0, volume=0, adj_close=100.1)
+        Price.create(symbol_obj="C6L.SI", date=datetime(2012, 12, 20), open=0, close=0, high=0, low=0, volume=0, adj_close=100.4)
+
+        # adjusted for dividend
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 20), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 0, "adj_close": 98.2},
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 0, "adj_close": 99.9},
+        ]
+
+        self.assertFalse(query.update_fundamentals_incrementally("price", "C6L.SI", records, datetime(2012, 12, 22)))
+
+        # a day missing in the overlap
+        records[0]["date"], records[0]["adj_close"] = datetime(2012, 12, 19), 100.1
+        self.assertFalse(query.update_fundamentals_incrementally("price", "C6L.SI", records, datetime(2012, 12, 22)))
+
+        # nothing written
+        prices = [(p.date, p.adj_close) for p in Price.select().order_by(Price.date)]
+        self.assertEqual(prices, [(datetime(2012, 12, 19), 100.1), (datetime(2012, 12, 20), 100.4)])
+        self.assertEqual(Symbol.get(Symbol.symbol == "C6L.SI").price_updated_at, datetime(2012, 12, 21))
+
+    def test_update_fundamentals_incrementally_no_data(self):
+        Symbol.create(symbol="C6L.SI")
+
+        records = [
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 12, 21), "open": 0, "close": 0, "high": 0, "low": 0, "volume": 0, "adj_close": 99.9},
+        ]
+
+        self.assertTrue(query.update_fundamentals_incrementally("price", "C6L.SI", records, datetime(2012, 12, 22)))
+        self.assertEqual(Price.select().count(), 1)
+
+    def test_migrate_to_narrow_table(self):
+        Symbol.create(symbol="C6L.SI")
+        Symbol.create(symbol="J7X.SI")
+        BalanceSheet.create(symbol_obj="C6L.SI", date=datetime(2012, 3, 31), inventories=1000, cash_only=500)
+        BalanceSheet.create(symbol_obj="C6L.SI", date=datetime(2013, 3, 31), inventories=1100)
+        BalanceSheet.create(symbol_obj="J7X.SI", date=datetime(2013, 3, 31), cash_only=200)
+
+        query.migrate_to_narrow_table(["balance_sheet"])
+
+        self.assertEqual(ReportValue.select().count(), 4)   # null values are not copied
+        self.assertEqual(ReportMetric.select().count(), len(BalanceSheet._meta.get_fields()) - 3)
+
+        values = list(query.get_fundamentals_narrow("balance_sheet", "C6L.SI", ["cash_only", "inventories"]))
+        self.assertEqual(values, [(datetime(2012, 3, 31), 500, 1000), (datetime(2013, 3, 31), None, 1100)])
+
+        # only dates with values of selected fields
+        values = list(query.get_fundamentals_narrow("balance_sheet", "J7X.SI", ["inventories"]))
+        self.assertEqual(values, [])
+
+        self.assertRaises(ValueError, list, query.get_fundamentals_narrow("cash_flow", "C6L.SI", ["free_cash_flow"]))
+
+    def test_update_fundamentals_narrow_table(self):
+        Symbol.create(symbol="C6L.SI")
+        Symbol.create(symbol="J7X.SI")
+        BalanceSheet.create(symbol_obj="C6L.SI", date=datetime(2012, 3, 31), inventories=1000)
+        BalanceSheet.create(symbol_obj="J7X.SI", date=datetime(2012, 3, 31), inventories=2000)
+        query.migrate_to_narrow_table(["balance_sheet"])
+
+        records = [{"symbol_obj": "C6L.SI", "date": datetime(2013, 3, 31), "inventories": 1100}]
+        query.update_fundamentals("balance_sheet", "C6L.SI", records, datetime(2014, 12, 22), delete_old=True)
+
+        values = list(query.get_fundamentals_narrow("balance_sheet", "C6L.SI", ["inventories"]))
+        self.assertEqual(values, [(datetime(2013, 3, 31), 1100)])
+
+        values = list(query.get_fundamentals_narrow("balance_sheet", "J7X.SI", ["inventories"]))
+        self.assertEqual(values, [(datetime(2012, 3, 31), 2000)])
+
+        # data types not migrated are left alone
+        query.update_fundamentals("cash_flow", "C6L.SI", [{"symbol_obj": "C6L.SI", "date": datetime(2013, 3, 31)}], datetime(2014, 12, 22))
+        self.assertEqual(ReportValue.select().count(), 2)
+
+    def test_get_fundamentals_as_of(self):
+        for symbol in ("C6L.SI", "J7X.SI", "ABC.SI"):
+            Symbol.create(symbol=symbol)
+
+        BalanceSheet.insert_many([
+            {"symbol_obj": "C6L.SI", "date": datetime(2011, 3, 31), "inventories": 1000},
+            {"symbol_obj": "C6L.SI", "date": datetime(2012, 3, 31), "inventories": 1100},
+            {"symbol_obj": "C6L.SI", "date": datetime(2013, 3, 31), "inventories": 1200},
+            {"symbol_obj": "J7X.SI", "date": datetime(2012, 6, 30), "inventories": 50},
+            {"symbol_obj": "ABC.SI", "date": datetime(2013, 1, 1), "inventories": 5},
+        ]).execute()
+
+        result = list(query.get_fundamentals_as_of("balance_sheet", datetime(2012, 12, 31), ("date", "inventories")))
+        self.assertEqual(result, [
+            ("C6L.SI", datetime(2012, 3, 31), 1100),
+            ("J7X.SI", datetime(2012, 6, 30), 50),
+        ])
+
+        result = list(query.get_fundamentals_as_of("balance_sheet", datetime(2013, 3, 31), ("inventories",), ["C6L.SI", "ABC.SI"]))
+        self.assertEqual(result, [("ABC.SI", 5), ("C6L.SI", 1200)])
+
+    def test_refresh_derived_metrics_markers(self):
+        Symbol.create(symbol="C6L.SI", price_updated_at=datetime(2014, 12, 15))
+        Symbol.create(symbol="J7X.SI")
+        db.create_tables(derived_export, safe=True)
+
+        markers = query.get_symbols_to_refresh()
+        self.assertEqual(list(markers), ["C6L.SI", "J7X.SI"])
+        self.assertEqual(markers["C6L.SI"], {"price": datetime(2014, 12, 15), "balance_sheet": None, "income_statement": None})
+
+        records = [{"symbol_obj": "C6L.SI", "date": datetime(2012, 4, 30), "p_e_ratio": 15.5}]
+        query.replace_derived_metrics(markers, records)
+        self.assertEqual(query.get_symbols_to_refresh(), {})
+        self.assertEqual(list(DerivedMetric.select(DerivedMetric.p_e_ratio).tuples()), [(15.5,)])
+
+        # only the symbol updated since
+        Symbol.update(balance_sheet_updated_at=datetime(2014, 12, 16)).where(Symbol.symbol == "J7X.SI").execute()
+        self.assertEqual(list(query.get_symbols_to_refresh()), ["J7X.SI"])
+        self.assertEqual(query.get_symbols_to_refresh(["C6L.SI"]), {})
+
+        # replaced
+        query.replace_derived_metrics({"C6L.SI": markers["C6L.SI"]}, [])
+        self.assertEqual(DerivedMetric.select().count(), 0)
+
+    def test_update_quality_findings(self):
+        Symbol.create(symbol="C6L.SI")
+        Symbol.create(symbol="J7X.SI")
+        db.create_tables(audit_export, safe=True)
+
+        findings = [
+            {"symbol_obj": symbol, "data_type": "price", "check": "outlier", "date": datetime(2012, 12, 21), "column": "Volume"}
+            for symbol in ("C6L.SI", "J7X.SI")
+        ]
+        query.update_quality_findings("price", ["C6L.SI", "J7X.SI"], findings)
+
+        # findings of other symbols and data types are left alone
+        QualityFinding.create(symbol_obj="C6L.SI", data_type="balance_sheet", check="missing_date", date=datetime(2012, 3, 31))
+        new_findings = [{"symbol_obj": "C6L.SI", "data_type": "price", "check": "missing_date", "date": datetime(2012, 12, 24), "column": None}]
+        query.update_quality_findings("price", ["C6L.SI"], new_findings)
+
+        result = list(QualityFinding.select(QualityFinding.symbol_obj, QualityFinding.data_type, QualityFinding.check)
+            .order_by(QualityFinding.symbol_obj, QualityFinding.data_type).tuples())
+        self.assertEqual(result, [
+            ("C6L.SI", "balance_sheet", "missing_date"),
+            ("C6L.SI", "price", "missing_date"),
+            ("J7X.SI", "price", "outlier"),
+        ])
+
     def test_delete_all(self):
         symbols = [
             {"symbol": "C6L.SI", "price_updated_at": None},
@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import timedelta
+import os
+import shutil
+import tempfile
+
+from fa.miner.cache import ResponseCache
+
+
+def make_response(url, text, headers=None):
+    response = MagicMock()
+    response.url = url
+    response.text = text
+    response.headers = headers or {}
+    return response
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_disabled(self):
+        self.assertTrue(self.cache.is_enabled())
+        self.assertFalse(ResponseCache(None).is_enabled())
+
+    def test_put(self):
+        self.assertIsNone(self.cache.get_entry("http://foo"))
+
+        self.cache.put("http://foo", make_response("http://foo/1", "héllo\nworld", {"ETag": '"x"', "Server": "bar"}))
+        entry = self.cache.get_entry("http://foo")
+        response = self.cache.get_response(entry)
+
+        self.assertEqual(response.url, "http://foo/1")
+        self.assertEqual(response.text, "héllo\nworld")
+        self.assertEqual(list(response.iter_lines()), ["héllo", "world"])
+        self.assertEqual(response.headers, {"ETag": '"x"'})
+
+    def test_put_same_text(self):
+        # kept once
+        for url in ("http://foo", "http://bar"):
+            self.cache.put(url, make_response(url, "not found"))
+
+        texts = [name for _, _, names in os.walk(os.path.join(self.path, "texts")) for name in names]
+        self.assertEqual(len(texts), 1)
+        self.assertEqual(self.cache.get_response(self.cache.get_entry("http://bar")).text, "not found")
+
+    def test_is_fresh(self):
+        self.cache.put("http://foo", make_response("http://foo", "foo"))
+        entry = self.cache.get_entry("http://foo")
+        self.assertTrue(self.cache.is_fresh(entry))
+
+        self.cache.init(self.path, ttl=timedelta(0))
+        self.assertFalse(self.cache.is_fresh(entry))
+
+        self.cache.touch("http://foo", dict(entry, fetched_at=0))
+        self.cache.init(self.path, ttl=timedelta(0), offline=True)
+        self.assertTrue(self.cache.is_fresh(self.cache.get_entry("http://foo")))
+
+    def test_get_validators(self):
+        self.cache.put("http://foo", make_response("http://foo", "foo", {"ETag": '"x"', "Last-Modified": "Mon, 15 Dec 2014 00:00:00 GMT"}))
+        self.cache.put("http://bar", make_response("http://bar", "bar"))
+
+        self.assertEqual(self.cache.get_validators(self.cache.get_entry("http://foo")), {
+            "If-None-Match": '"x"',
+            "If-Modified-Since": "Mon, 15 Dec 2014 00:00:00 GMT",
+        })
+        self.assertEqual(self.cache.get_validators(self.cache.get_entry("http://bar")), {})
+
+    def test_open_writer(self):
+        writer = self.cache.open_writer("http://foo", make_response("http://foo", None))
+        writer.write("a\n")
+        self.assertIsNone(self.cache.get_entry("http://foo"))
+
+        writer.write("b\n")
+        writer.close()
+        self.assertEqual(self.cache.get_response(self.cache.get_entry("http://foo")).text, "a\nb\n")
+
+        # nothing kept
+        writer = self.cache.open_writer("http://bar", make_response("http://bar", None))
+        writer.write("a\n")
+        writer.discard()
+        self.assertIsNone(self.cache.get_entry("http://bar"))
+        self.assertEqual(len(os.listdir(os.path.join(self.path, "texts"))), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,15 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from datetime import timedelta
+import shutil
+import tempfile
+import threading
+import time
 
 from requests.exceptions import ConnectionError
 
 from fa.miner import http
+from fa.miner.cache import ResponseCache
 from fa.miner.exceptions import GetError
 
 
@@ -54,5 +60,178 @@ class TestHTTP(unittest.TestCase):
 
         self.assertEqual(data, "bar")
 
+    def test_strict_get_session(self):
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 200
+        mock_session.get.return_value.text = "foo"
+
+        with patch("fa.miner.http.requests.get") as mock_get:
+            data = http.strict_get("http://foo", session=mock_session)
+            self.assertFalse(mock_get.called)
+
+        mock_session.get.assert_called_once_with("http://foo")
+        self.assertEqual(data, "foo")
+
+    def test_strict_get_lines(self):
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 200
+        mock_session.get.return_value.encoding = None
+        mock_session.get.return_value.iter_lines.return_value = iter(["Date,Close", "2014-12-12,1.0"])
+
+        lines = http.strict_get_lines("http://foo", session=mock_session)
+
+        mock_session.get.assert_called_once_with("http://foo", stream=True)
+        self.assertEqual(list(lines), ["Date,Close", "2014-12-12,1.0"])
+
+        response = mock_session.get.return_value
+        response.iter_lines.assert_called_once_with(decode_unicode=True)
+        self.assertEqual(response.encoding, "utf-8")
+        self.assertTrue(response.close.called)
+
+    def test_strict_get_lines_error(self):
+        with patch("fa.miner.http.requests.get", MagicMock(side_effect=ConnectionError)):
+            self.assertRaises(GetError, http.strict_get_lines, "http://ex")
+
+        with patch("fa.miner.http.requests.get") as mock_get:
+            mock_get.return_value.status_code = 404
+            self.assertRaises(GetError, http.strict_get_lines, "http://err")
+
+        # broken while reading
+        with patch("fa.miner.http.requests.get") as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.iter_lines.side_effect = ConnectionError
+
+            lines = http.strict_get_lines("http://foo")
+            self.assertRaises(GetError, list, lines)
+
+    def test_concurrent_get(self):
+        def fake_get(url, test_for_error, session):
+            if "err" in url:
+                raise GetError()
+            else:
+                return url[7:]
+
+        urls = ["http://foo", "http://bar", "http://err"]
+
+        with patch("fa.miner.http.strict_get", MagicMock(side_effect=fake_get)) as mock_strict_get:
+            result = http.concurrent_get(urls, test_for_error="test_for_error")
+
+        self.assertEqual(result, {"http://foo": "foo", "http://bar": "bar", "http://err": None})
+        self.assertEqual(mock_strict_get.call_count, 3)
+        self.assertTrue(all(c[0][1] == "test_for_error" for c in mock_strict_get.call_args_list))
+
+    def test_concurrent_get_max_workers_per_host(self):
+        lock = threading.Lock()
+        in_flight = {"a": 0, "b": 0}
+        max_in_flight = {"a": 0, "b": 0}
+
+        def fake_get(url, test_for_error, session):
+            host = url[7]
+            with lock:
+                in_flight[host] += 1
+                max_in_flight[host] = max(max_in_flight[host], in_flight[host])
+            time.sleep(0.01)
+            with lock:
+                in_flight[host] -= 1
+
+        urls = ["http://{0}/{1}".format(host, i) for host in "ab" for i in range(8)]
+
+        with patch("fa.miner.http.strict_get", MagicMock(side_effect=fake_get)):
+            http.concurrent_get(urls, max_workers=8, max_workers_per_host=2)
+
+        self.assertEqual(max_in_flight, {"a": 2, "b": 2})
+
+class TestHTTPCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.path)
+
+        patcher = patch("fa.miner.http.cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def make_session(self, status_code=200, text="foo", headers=None):
+        mock_session = MagicMock()
+        response = mock_session.get.return_value
+        response.status_code = status_code
+        response.url = "http://foo"
+        response.text = text
+        response.headers = headers or {}
+        response.iter_lines.return_value = iter(text.split("\n"))
+        return mock_session
+
+    def test_strict_get(self):
+        mock_session = self.make_session()
+        self.assertEqual(http.strict_get("http://foo", session=mock_session), "foo")
+        self.assertEqual(http.strict_get("http://foo", session=mock_session), "foo")
+
+        # the second from the cache
+        mock_session.get.assert_called_once_with("http://foo")
+
+    def test_strict_get_test_for_error(self):
+        test_for_error = lambda r: "404" in r.url
+        mock_session = self.make_session()
+        mock_session.get.return_value.url = "http://foo/404.html"
+
+        for _ in range(2):
+            self.assertRaises(GetError, http.strict_get, "http://foo", test_for_error, mock_session)
+
+        self.assertEqual(mock_session.get.call_count, 1)
+
+    def test_strict_get_revalidate(self):
+        http.strict_get("http://foo", session=self.make_session(headers={"ETag": '"x"'}))
+        self.cache.init(self.path, ttl=timedelta(0))
+
+        # not modified
+        mock_session = self.make_session(status_code=304)
+        self.assertEqual(http.strict_get("http://foo", session=mock_session), "foo")
+        mock_session.get.assert_called_once_with("http://foo", headers={"If-None-Match": '"x"'})
+
+        # modified
+        mock_session = self.make_session(text="bar")
+        self.assertEqual(http.strict_get("http://foo", session=mock_session), "bar")
+        self.assertEqual(self.cache.get_response(self.cache.get_entry("http://foo")).text, "bar")
+
+    def test_strict_get_offline(self):
+        http.strict_get("http://foo", session=self.make_session())
+        self.cache.init(self.path, ttl=timedelta(0), offline=True)
+
+        mock_session = MagicMock()
+        self.assertEqual(http.strict_get("http://foo", session=mock_session), "foo")
+        self.assertRaises(GetError, http.strict_get, "http://bar", session=mock_session)
+        self.assertFalse(mock_session.get.called)
+
+    def test_strict_get_lines(self):
+        mock_session = self.make_session(text="Date,Close\n2014-12-12,1.0")
+
+        # not kept until all lines are read
+        lines = http.strict_get_lines("http://foo", session=mock_session)
+        self.assertEqual(next(lines), "Date,Close")
+        self.assertIsNone(self.cache.get_entry("http://foo"))
+
+        self.assertEqual(list(lines), ["2014-12-12,1.0"])
+        self.assertEqual(list(http.strict_get_lines("http://foo", session=mock_session)), ["Date,Close", "2014-12-12,1.0"])
+        self.assertEqual(mock_session.get.call_count, 1)
+
+    def test_strict_get_lines_broken(self):
+        mock_session = self.make_session()
+        mock_session.get.return_value.iter_lines.side_effect = ConnectionError
+
+        self.assertRaises(GetError, list, http.strict_get_lines("http://foo", session=mock_session))
+        self.assertIsNone(self.cache.get_entry("http://foo"))
+
+class TestRateLimiter(unittest.TestCase):
+    def test_wait(self):
+        rate_limiter = http.RateLimiter(100)
+
+        start = time.monotonic()
+        for _ in range(6):
+            rate_limiter.wait()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
 if __name__ == "__main__":
     unittest.main()
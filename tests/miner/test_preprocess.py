@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 
+import numpy as np
+
 from fa.miner import preprocess
 from fa.miner.exceptions import PreprocessingError
 
@@ -117,6 +119,30 @@ class TestPreprocess(unittest.TestCase):
         self.assertEqual(preprocess._parse_value("$3,456", 10), 34560)
         self.assertEqual(preprocess._parse_value("(¥3,456)", 10), -34560)
 
+    def test_parse_values(self):
+        strings = ['-', "25%", "-2.5%", "1,025.5%", "3,456", "(3,456)", "3,456.78", "(3,456.78)", "$3,456", "(¥3,456)", "-$3", "12", "0.001"]
+
+        for value_unit in (1, 10, 1000000):
+            result = preprocess._parse_values(strings, value_unit)
+
+            self.assertEqual(result.dtype, np.float64)
+            self.assertTrue(np.isnan(result[0]))
+            self.assertEqual(list(result[1:]), [preprocess._parse_value(s, value_unit) for s in strings[1:]])
+
+    def test_parse_values_fallback(self):
+        # forms not recognized by the regular expression are parsed one by one
+        result = preprocess._parse_values(["$$5", ".5", "3,456"], 10)
+        self.assertEqual(list(result), [50, 5, 34560])
+
+        result = preprocess._parse_values(["3\n", "5"], 10)
+        self.assertEqual(list(result), [30, 50])
+
+        self.assertEqual(len(preprocess._parse_values([], 10)), 0)
+
+    def test_parse_values_error(self):
+        for string in ("abc", '', "(5%)", "S$5"):
+            self.assertRaises(ValueError, preprocess._parse_values, ["5", string], 10)
+
     def test_preprocess(self):
         obj = {
             "data": [
@@ -142,5 +168,26 @@ class TestPreprocess(unittest.TestCase):
             ("Liabilities & Shareholders' Equity", [25169000, 22589000, 22501000])
         ])
 
+    def test_preprocess_vectorized(self):
+        obj = {
+            "data": [
+                ["periods", ["2009", "2010", "2011"]],
+                ["Cash & Short Term Investments", ["4,504", "-", "5,488"]],
+                ["Liabilities & Shareholders' Equity", ["25,169", "22,589", "(22,501)"]],
+            ],
+            "symbol_prefix": "C6L",
+            "timeframe": "annual",
+            "top_remark": "Fiscal year is April-March. All values SGD Thousands.",
+            "report_type": "balance-sheet",
+        }
+
+        with patch("fa.miner.preprocess.UNO_VALUE_UNIT_COLUMNS", {"Cash & Short Term Investments"}):
+            preprocessed = list(preprocess.preprocess(obj, "C6L.SI", "annual", "balance-sheet", vectorized=True))
+
+        self.assertEqual(preprocessed[0], ("Date", [datetime(2009, 4, 1), datetime(2010, 4, 1), datetime(2011, 4, 1)]))
+        np.testing.assert_array_equal(preprocessed[1][1], np.array([4504, np.nan, 5488]))
+        np.testing.assert_array_equal(preprocessed[2][1], np.array([25169000, 22589000, -22501000]))
+        self.assertEqual([column_name for column_name, _ in preprocessed[1:]], ["Cash & Short Term Investments", "Liabilities & Shareholders' Equity"])
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
+from datetime import datetime
+import math
 import os.path
 
 from fa.miner import wsj
@@ -41,6 +43,24 @@ class TestWSJ(unittest.TestCase):
         self.assertEqual(result["data"][1], ("Cash & Short Term Investments", ["4,612", "7,832", "5,400", "5,488", "5,305"]))
         self.assertEqual(len(result["data"]), 99)
 
+    @unittest.skipUnless(wsj.lxml_html, "lxml is not installed")
+    def test_scrape_html_backends(self):
+        fixture_data_filename = os.path.join(os.path.dirname(__file__), "fixture_data", "C6L.SI_annual_balance-sheet.html")
+        with open(fixture_data_filename) as f:
+            html = f.read()
+
+        self.assertEqual(wsj._scrape_html(html, "lxml"), wsj._scrape_html(html, "bs4"))
+
+    @unittest.skipUnless(wsj.lxml_html, "lxml is not installed")
+    def test_scrape_html_lxml_bad_html(self):
+        self.assertRaises(IndexError, wsj._scrape_html, "", "lxml")
+        self.assertRaises(IndexError, wsj._scrape_html, "<html><body></body></html>", "lxml")
+
+    def test_scrape_html_default_backend(self):
+        with patch.dict("fa.miner.wsj.SCRAPER_BACKENDS", {"foo": MagicMock(return_value="result")}), \
+             patch("fa.miner.wsj.DEFAULT_SCRAPER_BACKEND", "foo"):
+            self.assertEqual(wsj._scrape_html("html"), "result")
+
     def test_get_financial_data(self):
         with patch("fa.miner.wsj._get_report_url", MagicMock(return_value="http://foo")) as mock_get_report_url, \
              patch("fa.miner.wsj.strict_get", MagicMock(return_value="html")) as mock_strict_get, \
@@ -58,6 +78,45 @@ class TestWSJ(unittest.TestCase):
 
         self.assertEqual(result, "csv rows")
 
+    def test_fetch_financial_data(self):
+        with patch("fa.miner.wsj._get_report_url", MagicMock(return_value="http://foo")) as mock_get_report_url, \
+             patch("fa.miner.wsj.strict_get", MagicMock(return_value="html")) as mock_strict_get:
+
+            result = wsj.fetch_financial_data("C6L.SI", "annual", "balance-sheet")
+
+            mock_get_report_url.assert_called_once_with("C6L.SI", "annual", "balance-sheet")
+            mock_strict_get.assert_called_once_with("http://foo", wsj._test_for_not_found)
+
+        self.assertEqual(result, "html")
+
+    def test_parse_financial_data(self):
+        with patch("fa.miner.wsj._scrape_html", MagicMock(return_value="raw_data")) as mock_scrape_html, \
+             patch("fa.miner.wsj.preprocess", MagicMock(return_value="items")) as mock_preprocess, \
+             patch("fa.miner.wsj.transpose_items", MagicMock(return_value=iter([("Date",), (1,)]))):
+
+            result = wsj.parse_financial_data("html", "C6L.SI", "annual", "balance-sheet")
+
+            mock_scrape_html.assert_called_once_with("html")
+            mock_preprocess.assert_called_once_with("raw_data", "C6L.SI", "annual", "balance-sheet", vectorized=True)
+
+        self.assertEqual(result, [("Date",), (1,)])
+
+    def test_parse_financial_data__fixture(self):
+        fixture_data_filename = os.path.join(os.path.dirname(__file__), "fixture_data", "C6L.SI_annual_balance-sheet.html")
+        with open(fixture_data_filename) as f:
+            html = f.read()
+
+        result = wsj.parse_financial_data(html, "C6L.SI", "annual", "balance-sheet")
+
+        headers = result[0]
+        self.assertEqual(headers[:3], ("Date", "Cash & Short Term Investments", "Cash Only"))
+        self.assertEqual(len(result), 6)
+
+        first_row = dict(zip(headers, result[1]))
+        self.assertEqual(first_row["Date"], datetime(2010, 4, 1))
+        self.assertEqual(first_row["Cash & Short Term Investments"], 4612000000)
+        self.assertTrue(math.isnan(first_row["Cash & Short Term Investments Growth"]))
+
     def test_get_financial_data_ScrapingError_handling(self):
         with patch("fa.miner.wsj._get_report_url", MagicMock(return_value="http://foo")), \
              patch("fa.miner.wsj.strict_get", MagicMock(return_value="html")):
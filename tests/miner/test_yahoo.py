@@ -8,33 +8,53 @@ from fa.miner.exceptions import GetError
 
 class TestYahoo(unittest.TestCase):
     def test_get_historical_data(self):
-        def fake_get(url):
+        def fake_get(url, *args):
             symbol = url[36:39]
             return symbol + ".csv"
 
-        with patch("fa.miner.yahoo.strict_get", MagicMock(side_effect=fake_get)) as mock_strict_get:
+        with patch("fa.miner.http.strict_get", MagicMock(side_effect=fake_get)) as mock_strict_get:
             result = yahoo.get_historical_data(("C6L.SI", "ZZZ"), datetime(2004, 3, 1), datetime(2014, 3, 1))
 
-            mock_strict_get.assert_has_calls([
-                call("http://ichart.yahoo.com/table.csv?s=C6L.SI&a=2&b=1&c=2004&d=2&e=1&f=2014&g=d&ignore=.csv"),
-                call("http://ichart.yahoo.com/table.csv?s=ZZZ&a=2&b=1&c=2004&d=2&e=1&f=2014&g=d&ignore=.csv"),
+            called_urls = [c[0][0] for c in mock_strict_get.call_args_list]
+            self.assertCountEqual(called_urls, [
+                "http://ichart.yahoo.com/table.csv?s=C6L.SI&a=2&b=1&c=2004&d=2&e=1&f=2014&g=d&ignore=.csv",
+                "http://ichart.yahoo.com/table.csv?s=ZZZ&a=2&b=1&c=2004&d=2&e=1&f=2014&g=d&ignore=.csv",
             ])
 
         self.assertEqual(result, {"C6L.SI": "C6L.csv", "ZZZ": "ZZZ.csv"})
 
     def test_get_historical_data_exception_handling(self):
-        def fake_get(url):
+        def fake_get(url, *args):
             symbol = url[36:39]
             if symbol == "ZZZ":
                 raise GetError()
             else:
                 return symbol + ".csv"
 
-        with patch("fa.miner.yahoo.strict_get", MagicMock(side_effect=fake_get)):
+        with patch("fa.miner.http.strict_get", MagicMock(side_effect=fake_get)):
             result = yahoo.get_historical_data(("C6L.SI", "ZZZ"), datetime(2004, 3, 1), datetime(2014, 3, 1))
 
         self.assertEqual(result, {"C6L.SI": "C6L.csv", "ZZZ": ''})
 
+    def test_get_historical_data_concurrent_get_options(self):
+        with patch("fa.miner.yahoo.concurrent_get") as mock_concurrent_get:
+            yahoo.get_historical_data(("C6L.SI",), datetime(2004, 3, 1), datetime(2014, 3, 1), max_workers=2, rate_limit=5)
+
+        self.assertEqual(mock_concurrent_get.call_args[1], {"max_workers": 2, "rate_limit": 5})
+
+    def test_stream_historical_data(self):
+        session = object()
+
+        with patch("fa.miner.yahoo.strict_get_lines", MagicMock(return_value=iter(["Date,Close"]))) as mock_strict_get_lines:
+            lines = yahoo.stream_historical_data("C6L.SI", datetime(2004, 3, 1), datetime(2014, 3, 1), session=session)
+
+            mock_strict_get_lines.assert_called_once_with(
+                "http://ichart.yahoo.com/table.csv?s=C6L.SI&a=2&b=1&c=2004&d=2&e=1&f=2014&g=d&ignore=.csv",
+                session=session
+            )
+
+        self.assertEqual(list(lines), ["Date,Close"])
+
     def test_constuct_yql(self):
         yql = yahoo._construct_yql(("C6L.SI", "ZZZ"), "yahoo.finance.balancesheet", "annual")
         self.assertEqual(yql, "SELECT * FROM yahoo.finance.balancesheet WHERE symbol IN ('C6L.SI','ZZZ') AND timeframe='annual'")
@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from fa import backtest
+from tests.util import PandasTestCase
+
+
+class TestBacktest(PandasTestCase):
+    def setUp(self):
+        # 2 symbols, B has no price on the second date
+        self.prices = pd.DataFrame(
+            {"A": [1.0, 2.0, 4.0], "B": [10.0, np.nan, 20.0]},
+            index=pd.to_datetime(["2010-01-01", "2011-01-01", "2012-01-01"]),
+            columns=["A", "B"]
+        )
+
+    def test_load_prices(self):
+        df = pd.DataFrame(
+            {"Close": [54.4, 100.4, 99.9]},
+            index=pd.MultiIndex.from_tuples([
+                ("ABC.SI", datetime(2012, 12, 21)),
+                ("C6L.SI", datetime(2012, 12, 20)),
+                ("C6L.SI", datetime(2012, 12, 21)),
+            ], names=["Symbol", "Date"]),
+        )
+
+        with patch("fa.backtest.load_fundamental_data_of_symbols", MagicMock(return_value=df)):
+            prices = backtest.load_prices(["C6L.SI", "ABC.SI"])
+
+        self.assertEqual(list(prices.columns), ["C6L.SI", "ABC.SI"])
+        self.assertEqual(list(prices.index), [datetime(2012, 12, 20), datetime(2012, 12, 21)])
+        np.testing.assert_array_equal(prices.values, [[100.4, np.nan], [99.9, 54.4]])
+
+    def test_calc_future_returns(self):
+        result = backtest.calc_future_returns(self.prices, 366)
+
+        # sold at the last price at or before the sell date
+        np.testing.assert_array_equal(result.values, [[1, np.nan], [np.nan, np.nan], [np.nan, np.nan]])
+
+    def test_run_backtest(self):
+        result = backtest.run_backtest(self.prices, np.ones((3, 2)), distribution_yield=0.1)
+
+        # A: 1 bought at each price, held 2 years, 1 year, 0 year
+        self.assertAlmostEqual(result.amount_invested["A"], 3)
+        self.assertAlmostEqual(result.units_bought["A"], 1 + 0.5 + 0.25)
+        self.assertAlmostEqual(result.average_hold_period["A"], (730 + 365) / 365 / 3)
+        self.assertAlmostEqual(result.dividend_payout["A"], 0.1 * (730 + 365) / 365)
+        self.assertAlmostEqual(result.capital_gain["A"], 1.75 * 4 - 3)
+        self.assertAlmostEqual(result.total_return["A"], (4 + 0.3) / 3)
+
+        # not defined for the purchase on sell date
+        annual_returns = [(4 + 2 * 0.1 - 1) / 2, (2 + 0.1 - 1) / 1]
+        self.assertAlmostEqual(result.annual_return["A"], np.mean(annual_returns))
+
+        # B: no purchase without price
+        self.assertAlmostEqual(result.amount_invested["B"], 2)
+        self.assertAlmostEqual(result.capital_gain["B"], (0.1 + 0.05) * 20 - 2)
+
+    def test_run_backtest_broadcast_amounts(self):
+        expected = backtest.run_backtest(self.prices, np.ones((3, 2)))
+
+        for amounts in (1, np.ones(2), np.ones((3, 1))):
+            result = backtest.run_backtest(self.prices, amounts)
+
+            for field in backtest.BacktestResult._fields:
+                self.assertFrameEqual(getattr(result, field), getattr(expected, field))
+
+    def test_run_backtest_sell_date_before_prices(self):
+        self.assertRaises(ValueError, backtest.run_backtest, self.prices, 1, sell_date="2009-12-31")
+
+    def test_run_backtest_strategies(self):
+        amounts = np.array([
+            [[1, 1], [1, 1], [0, 0]],
+            [[0, 2], [1, 0], [0, 0]],
+        ])
+
+        result = backtest.run_backtest(self.prices, amounts, sell_date="2011-06-01", strategies=["dca", "other"])
+
+        # sold at the last price before sell date
+        self.assertFrameEqual(result.units_bought, pd.DataFrame(
+            {"A": [1.5, 0.5], "B": [0.1, 0.2]},
+            index=["dca", "other"]
+        ))
+        self.assertFrameEqual(result.capital_gain, pd.DataFrame(
+            {"A": [1.5 * 2 - 2, 0.5 * 2 - 1], "B": [0, 0]},
+            index=["dca", "other"]
+        ), check_dtype=False)
+
+        # the same as running each strategy alone
+        single_result = backtest.run_backtest(self.prices, amounts[1], sell_date="2011-06-01")
+        for field in backtest.BacktestResult._fields:
+            self.assertFrameEqual(getattr(result, field).loc["other"], getattr(single_result, field), check_names=False)
+
+    def test_study_valuation(self):
+        arrays = backtest.to_arrays(self.prices)
+
+        result = backtest.study_valuation(arrays, valuation_threshold=0.5, horizon=366)
+
+        # only A on the first date returns at least 50% in 366 days
+        self.assertEqual(list(result.index), ["A", "B"])
+        self.assertEqual(list(result["amount_invested"].fillna(0)), [1, 0])
+        self.assertAlmostEqual(result.at["A", "capital_gain"], 4 - 1)
+
+    def test_study_pe_ratio(self):
+        income_statement = pd.DataFrame(
+            {"EPS (Basic)": [0.5, 0.1, 1.0]},
+            index=pd.MultiIndex.from_tuples([
+                ("A", datetime(2009, 12, 1)),
+                ("A", datetime(2010, 12, 1)),
+                ("B", datetime(2009, 12, 31)),
+            ], names=["Symbol", "Date"])
+        )
+        arrays = backtest.to_arrays(self.prices, income_statement)
+
+        # P/E ratios: A: 2, 20, 40, B: 10, -, 20
+        result = backtest.study_pe_ratio(arrays, pe_threshold=10, financial_report_preparation_lag=np.timedelta64(0, 'D'))
+        self.assertEqual(list(result["amount_invested"]), [1, 1])
+
+        # the report of B is not available yet on 2010-01-01 with a lag
+        result = backtest.study_pe_ratio(arrays, pe_threshold=10, financial_report_preparation_lag=np.timedelta64(30, 'D'))
+        self.assertEqual(list(result["amount_invested"].fillna(0)), [1, 0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 
 from fa import calculator
@@ -49,5 +50,71 @@ class TestCalculator(PandasTestCase):
         result = calculator.get_deviations(pd.DataFrame({'a': [1, 3, 5], 'b': [5, 3, 1]}))
         self.assertFrameEqual(result, pd.DataFrame({'a': [-1, 0, 1], 'b': [1, 0, -1]}), check_dtype=False)
 
+    def test_get_rolling_deviations(self):
+        result = calculator.get_rolling_deviations(pd.Series([1, 3, 1, 3, 9]), 3)
+        self.assertFrameEqual(result, pd.Series([np.nan, np.nan, -1 / np.sqrt(2), 2 / np.sqrt(3), 10 / np.sqrt(3)]))
+
+    def test_get_rolling_deviations__DataFrame(self):
+        # the same as the deviations from mean and standard deviation of each window, NaNs ignored
+        df = pd.DataFrame({'a': np.arange(20.0) ** 2, 'b': np.sin(np.arange(20.0))})
+        df.iloc[5, 1] = np.nan
+
+        result = calculator.get_rolling_deviations(df, 4, min_periods=3)
+
+        for i in range(20):
+            window = df.iloc[max(i - 4, 0) : i]
+            expected = (df.iloc[i] - window.mean()) / window.std()
+            expected[window.count() < 3] = np.nan
+            np.testing.assert_allclose(result.iloc[i].values, expected.values)
+
+    def test_get_robust_deviations(self):
+        # window of [1, 3, 1]: median 1, MAD 0, mean absolute deviation 2/3
+        result = calculator.get_robust_deviations(pd.Series([1, 3, 1, 3, 9]), 3)
+        self.assertFrameEqual(result, pd.Series([np.nan, np.nan, -1 / 1.4826, 2 / (1.2533 * 2 / 3), 6 / (1.2533 * 2 / 3)]))
+
+    def test_get_robust_deviations__blocks(self):
+        df = pd.DataFrame({'a': np.random.randn(100), 'b': np.random.randn(100)})
+        self.assertFrameEqual(calculator.get_robust_deviations(df, 10, block_size=7), calculator.get_robust_deviations(df, 10))
+
+    def test_fill_indexer(self):
+        index = pd.to_datetime(["2012-01-02", "2012-01-03", "2012-01-06", "2012-01-09"])
+        dates = pd.date_range("2012-01-01", "2012-01-10")
+        values = pd.Series(np.arange(len(index)), index=index)
+
+        for method in ("ffill", "bfill"):
+            positions = calculator.fill_indexer(index, dates, method)
+            resampled = getattr(values.resample('1D'), method)()
+
+            # the same values as looked up in the resampled data, -1 if the date is not there
+            expected = [resampled[d] if d in resampled.index else -1 for d in dates]
+            self.assertEqual(list(positions), expected)
+
+    def test_fill_indexer__empty(self):
+        positions = calculator.fill_indexer(pd.DatetimeIndex([]), pd.to_datetime(["2012-01-02"]), "bfill")
+        self.assertEqual(list(positions), [-1])
+
+    def test_fill_indexer__unknown_method(self):
+        self.assertRaises(ValueError, calculator.fill_indexer, pd.DatetimeIndex([]), [], "nearest")
+
+    def test_asof_indexer(self):
+        index = pd.to_datetime(["2012-01-05", "2012-01-01", "2012-01-03"])
+        dates = pd.to_datetime(["2011-12-31", "2012-01-01", "2012-01-02", "2012-01-05", "2012-01-09"])
+
+        positions = calculator.asof_indexer(index, dates)
+        self.assertEqual(list(positions), [-1, 1, 1, 0, 0])
+
+    def test_asof_indexer__groups(self):
+        index = pd.to_datetime(["2012-01-01", "2012-01-03", "2012-01-02", "2012-01-04"])
+        index_groups = ["A", "A", "B", "B"]
+        dates = pd.to_datetime(["2012-01-02", "2012-01-02", "2012-01-03", "2012-01-09", "2012-01-09"])
+        date_groups = ["A", "B", "A", "B", "C"]
+
+        positions = calculator.asof_indexer(index, dates, index_groups, date_groups)
+        self.assertEqual(list(positions), [0, 2, 1, 3, -1])
+
+    def test_asof_indexer__empty(self):
+        self.assertEqual(list(calculator.asof_indexer([], pd.to_datetime(["2012-01-02"]))), [-1])
+        self.assertEqual(list(calculator.asof_indexer(pd.to_datetime(["2012-01-02"]), [])), [])
+
 if __name__ == "__main__":
     unittest.main()
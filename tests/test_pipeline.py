@@ -0,0 +1,121 @@
+from concurrent.futures import Future
+import threading
+import unittest
+from unittest.mock import patch
+
+from fa import pipeline
+
+
+def fake_fetch(symbol, report_type):
+    if symbol == "ZZZ":
+        raise KeyError(symbol)
+    return "{0} {1} html".format(symbol, report_type)
+
+def fake_parse(html, symbol, report_type):
+    if symbol == "YYY":
+        raise ValueError(symbol)
+    return html.upper()
+
+class TestPipeline(unittest.TestCase):
+    def test_run_pipeline(self):
+        args_list = [(s, r) for s in ("C6L.SI", "J7X.SI", "S53.SI") for r in ("balance-sheet", "cash-flow")]
+        stored = []
+
+        pipeline.run_pipeline(
+            args_list,
+            fake_fetch,
+            fake_parse,
+            lambda parsed, *args: stored.append((args, parsed)),
+            fetch_workers=3,
+            parse_workers=2,
+            queue_size=2
+        )
+
+        self.assertCountEqual(stored, [(args, "{0} {1} HTML".format(*args).upper()) for args in args_list])
+
+    def test_run_pipeline_skipped_exceptions(self):
+        args_list = [("C6L.SI", "cash-flow"), ("ZZZ", "cash-flow"), ("YYY", "cash-flow")]
+        stored = []
+
+        pipeline.run_pipeline(
+            args_list,
+            fake_fetch,
+            fake_parse,
+            lambda parsed, *args: stored.append(args),
+            skipped_exceptions=(KeyError, ValueError),
+            parse_workers=1
+        )
+
+        self.assertEqual(stored, [("C6L.SI", "cash-flow")])
+
+    def test_run_pipeline_exception(self):
+        args_list = [(str(i), "cash-flow") for i in range(10)] + [("ZZZ", "cash-flow")]
+
+        self.assertRaises(
+            KeyError,
+            pipeline.run_pipeline, args_list, fake_fetch, fake_parse, lambda parsed, *args: None,
+            skipped_exceptions=(ValueError,), fetch_workers=2, parse_workers=1, queue_size=1
+        )
+
+    def test_run_pipeline_store_exception(self):
+        def store(parsed, *args):
+            raise RuntimeError()
+
+        args_list = [(str(i), "cash-flow") for i in range(10)]
+
+        self.assertRaises(
+            RuntimeError,
+            pipeline.run_pipeline, args_list, fake_fetch, fake_parse, store, fetch_workers=2, parse_workers=1, queue_size=1
+        )
+
+    def test_run_pipeline_store_exception__no_hang(self):
+        def store(parsed, *args):
+            raise RuntimeError()
+
+        def run():
+            for _ in range(50):
+                try:
+                    pipeline.run_pipeline(args_list, fake_fetch, fake_parse, store, fetch_workers=2, parse_workers=1, queue_size=1)
+                except RuntimeError as e:
+                    errors.append(e)
+
+        args_list = [(str(i), "cash-flow") for i in range(10)]
+        errors = []
+
+        # run in a thread so that a hang fails the test instead of blocking it
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(60)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 50)
+
+    def test_run_pipeline_dispatcher_exception(self):
+        class BrokenExecutor(object):
+            """ a pool that breaks once its processes are started """
+            def __init__(self, max_workers):
+                self.no_of_submits = 0
+
+            def submit(self, fn, *args):
+                self.no_of_submits += 1
+                if self.no_of_submits > 1:
+                    raise RuntimeError("broken pool")
+
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+            def shutdown(self, wait=True):
+                pass
+
+        args_list = [(str(i), "cash-flow") for i in range(10)]
+
+        with patch("fa.pipeline.ProcessPoolExecutor", BrokenExecutor):
+            self.assertRaises(
+                RuntimeError,
+                pipeline.run_pipeline, args_list, fake_fetch, fake_parse, lambda parsed, *args: None,
+                fetch_workers=2, queue_size=1
+            )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,5 +27,18 @@ class TestPiping(unittest.TestCase):
             {"symbol_obj": "C6L.SI", "operating_income_loss": "300.0", "revenue": "400.0"},
         ])
 
+    def test_csv_lines_to_column_chunks(self):
+        lines = iter(["Date,Adj Close", "2014-12-12,1.0", "2014-12-11,2.0", "2014-12-10,3.0"])
+        chunks = piping.csv_lines_to_column_chunks(lines, chunk_size=2)
+
+        self.assertEqual(list(chunks), [
+            {"date": ["2014-12-12", "2014-12-11"], "adj_close": ["1.0", "2.0"]},
+            {"date": ["2014-12-10"], "adj_close": ["3.0"]},
+        ])
+
+    def test_csv_lines_to_column_chunks_empty(self):
+        self.assertEqual(list(piping.csv_lines_to_column_chunks(iter([]))), [])
+        self.assertEqual(list(piping.csv_lines_to_column_chunks(iter(["Date,Adj Close"]))), [])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from fa import sweep
+from tests.util import PandasTestCase
+
+
+def study_sum(arrays, a, b):
+    """ a study returning one row """
+    return {"total": arrays["x"].sum() * a + b, "writeable": arrays["x"].flags.writeable}
+
+def study_rows(arrays, a):
+    """ a study returning rows indexed by Symbol """
+    return pd.DataFrame({"value": arrays["x"] * a}, index=pd.Index(arrays["symbols"], name="Symbol"))
+
+class TestSweep(PandasTestCase):
+    def test_get_grid(self):
+        self.assertEqual(sweep.get_grid({"a": [1, 2], "b": [3, 4]}), [
+            {"a": 1, "b": 3},
+            {"a": 1, "b": 4},
+            {"a": 2, "b": 3},
+            {"a": 2, "b": 4},
+        ])
+
+    def test_run_sweep(self):
+        arrays = {"x": np.arange(4.0)}
+
+        result = sweep.run_sweep(study_sum, {"a": [1, 2, 3], "b": [0, 10]}, arrays, max_workers=2, batch_size=4)
+
+        self.assertFrameEqual(result, pd.DataFrame({
+            "a": [1, 1, 2, 2, 3, 3],
+            "b": [0, 10, 0, 10, 0, 10],
+            "total": [6.0, 16.0, 12.0, 22.0, 18.0, 28.0],
+            "writeable": [False] * 6,     # shared, not copied
+        }, columns=["a", "b", "total", "writeable"]))
+
+    def test_run_sweep_rows(self):
+        arrays = {"x": np.array([1.0, 2.0]), "symbols": np.array(["A", "B"])}
+
+        result = sweep.run_sweep(study_rows, {"a": [1, 10]}, arrays, max_workers=1)
+
+        self.assertFrameEqual(result, pd.DataFrame({
+            "a": [1, 1, 10, 10],
+            "Symbol": ["A", "B", "A", "B"],
+            "value": [1.0, 2.0, 10.0, 20.0],
+        }, columns=["a", "Symbol", "value"]), check_dtype=False)
+
+if __name__ == "__main__":
+    unittest.main()
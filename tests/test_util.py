@@ -2,6 +2,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 from io import StringIO
 
+import numpy as np
 import pandas as pd
 import peewee as pw
 
@@ -109,6 +110,10 @@ class TestFAUtil(unittest.TestCase):
         transposed = fa_util.transpose_items((("foo", [1, 2, 3]), ("bar", [4, 5, 6])))
         self.assertEqual(list(transposed), [("foo", "bar"), (1, 4), (2, 5), (3, 6)])
 
+    def test_transpose_items__array(self):
+        transposed = fa_util.transpose_items((("foo", np.array([1.0, 2.0])), ("bar", [4, 5])))
+        self.assertEqual(list(transposed), [("foo", "bar"), (1.0, 4), (2.0, 5)])
+
     def test_to_pythonic_name(self):
         name = fa_util.to_pythonic_name("Cash & ST Investments / Total Assets")
         self.assertEqual(name, "cash_st_investments_total_assets")